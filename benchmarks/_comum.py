@@ -0,0 +1,58 @@
+# benchmarks/_comum.py
+# -*- coding: utf-8 -*-
+
+"""
+Apoio compartilhado pelos scripts de benchmark
+- Coloca a pasta 'ibex/' no sys.path (os módulos usam imports planos)
+- Cria um banco temporário e aponta o pool para ele
+- Vocabulário dos nomes de produto sintéticos (MATERIAIS, DETALHES, MARCAS)
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA_IBEX = os.path.join(RAIZ, "ibex")
+if PASTA_IBEX not in sys.path:
+    sys.path.insert(0, PASTA_IBEX)
+
+# Vocabulário dos nomes de produto sintéticos (bench_busca.py e gerador.py).
+# Variações de grafia de propósito ("Tijólo", maiúsculas) para exercitar a
+# busca sem acento/caixa.
+MATERIAIS = ["Cimento", "Argamassa", "Tijolo", "Tijólo", "Bloco", "Areia", "Brita", "Cal",
+             "Tubo", "Conexão", "Registro", "Torneira", "Telha", "Viga", "Vergalhão",
+             "Piso", "Azulejo", "Rejunte", "Tinta", "Massa", "Prego", "Parafuso", "Cabo", "Disjuntor"]
+DETALHES = ["CP-II", "CP-V", "AC-I", "AC-III", "PVC", "cerâmico", "baiano", "estrutural",
+            "acrílica", "corrida", "branco", "cinza", "50kg", "20kg", "18L", "3/4", "1/2",
+            "CA-50", "8 furos", "esmaltado", "porcelanato", "galvanizado", "flexível", "bipolar"]
+MARCAS = ["Votoran", "Quartzolit", "Tigre", "Amanco", "Eliane", "Portobello", "Suvinil",
+          "Coral", "Gerdau", "Belgo", "Tramontina", "Pial", "Ibex", "Cauê", "Itambé"]
+
+def banco_temporario(nome="bench.db"):
+    """Cria um diretório temporário e configura IBEX_DB e o pool para ele."""
+    from database import conexao
+
+    pasta = tempfile.mkdtemp(prefix="ibex-bench-")
+    caminho = os.path.join(pasta, nome)
+    os.environ["IBEX_DB"] = caminho
+    conexao.configurar(caminho)
+    return caminho
+
+def cronometrar(funcao, repeticoes):
+    """Executa 'funcao' N vezes e devolve a lista de latências (s)."""
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - t0)
+    return tempos
+
+def percentil(valores, p):
+    """Percentil simples (vizinho mais próximo) de uma lista de números."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    idx = min(len(ordenados) - 1, max(0, int(round(p / 100.0 * len(ordenados))) - 1))
+    return ordenados[idx]
@@ -0,0 +1,92 @@
+# benchmarks/bench_busca.py
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark: busca de produtos por nome, LIKE '%termo%' x FTS5
+- Gera um catálogo determinístico (padrão: 1 milhão de produtos) com
+  nomes de materiais, parte deles acentuados/maiúsculos
+- Mede o custo de carga com os gatilhos do índice FTS5 ligados
+- Para cada termo: LIKE (primeiros 20 e contagem total) contra
+  api.buscar_produtos (20 mais relevantes) e contagem no FTS5
+- LIKE não ignora acentos: a coluna "achados" mostra a diferença
+
+Uso:
+    python benchmarks/bench_busca.py [--linhas 1000000] [--repeticoes 20]
+"""
+
+import argparse
+import random
+import time
+
+from _comum import DETALHES, MARCAS, MATERIAIS, banco_temporario, cronometrar, percentil
+
+TERMOS = ["cimento", "argamassa", "tijolo", "cim", "tubo pvc", "vergalhao", "conexao", "porcelanato eliane"]
+
+def _nomes(n, semente=42):
+    rnd = random.Random(semente)
+    for i in range(n):
+        nome = f"{rnd.choice(MATERIAIS)} {rnd.choice(DETALHES)} {rnd.choice(MARCAS)} {i:07d}"
+        # ~10% em maiúsculas, como vem de planilha de fornecedor
+        yield nome.upper() if rnd.random() < 0.1 else nome
+
+def _carregar(n, lote=50_000):
+    from database.conexao import transacao
+
+    nomes = _nomes(n)
+    t0 = time.perf_counter()
+    with transacao() as con:
+        while True:
+            bloco = [(i % 50 + 1, nome) for i, nome in zip(range(lote), nomes)]
+            if not bloco:
+                break
+            con.executemany("""
+                INSERT INTO produtos (empresa_id, nome, preco_centavos, estoque) VALUES (?, ?, 1000, 100);
+            """, bloco)
+    return time.perf_counter() - t0
+
+def _padrao_like(termo):
+    return "%" + termo.replace(" ", "%") + "%"
+
+def _medir(funcao, repeticoes):
+    funcao()  # aquecimento (cache de páginas)
+    tempos = cronometrar(funcao, repeticoes)
+    return percentil(tempos, 50) * 1000, percentil(tempos, 99) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--linhas", type=int, default=1_000_000)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    banco_temporario()
+    from database.esquema import inicializar_banco
+    from database.conexao import obter_conexao
+    import api
+
+    inicializar_banco()
+    carga = _carregar(args.linhas)
+    print(f"Catálogo: {args.linhas:,} produtos | carga com gatilhos FTS5: {carga:.1f} s "
+          f"({args.linhas / carga:,.0f} linhas/s)\n")
+
+    print(f"{'termo':<20} {'modo':<14} {'p50 (ms)':>10} {'p99 (ms)':>10} {'achados':>10}")
+    with obter_conexao() as con:
+        for termo in TERMOS:
+            like = _padrao_like(termo)
+            fts = api.consulta_fts(termo)
+            medidas = [
+                ("LIKE top 20", lambda: con.execute(
+                    "SELECT id, nome FROM produtos WHERE nome LIKE ? LIMIT 20;", (like,)).fetchall(), None),
+                ("LIKE total", lambda: con.execute(
+                    "SELECT COUNT(*) FROM produtos WHERE nome LIKE ?;", (like,)).fetchone(), "like"),
+                ("FTS5 top 20", lambda: api.buscar_produtos(termo), None),
+                ("FTS5 total", lambda: con.execute(
+                    "SELECT COUNT(*) FROM produtos_fts WHERE produtos_fts MATCH ?;", (fts,)).fetchone(), "fts"),
+            ]
+            for modo, funcao, conta in medidas:
+                p50, p99 = _medir(funcao, args.repeticoes)
+                achados = f"{funcao()[0]:,}" if conta else ""
+                print(f"{termo:<20} {modo:<14} {p50:>10.2f} {p99:>10.2f} {achados:>10}")
+            print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/bench_carrinho.py
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark: carrinho grande (obra) com gravação imediata x adiada
+- Monta carrinhos de N linhas (padrão 200): adiciona cada produto, soma
+  mais uma unidade em metade deles, consulta o carrinho a cada 10 ações,
+  tira um quarto das linhas e fecha o pedido
+- "imediata" (padrão, IBEX_CARRINHO_GRAVAR_S=0): uma transação por
+  mudança; leituras do carrinho saem da memória
+- "adiada": o checkout grava tudo de uma vez (não resiste a queda)
+- Mede ações/s, tempo do checkout e gravações avulsas de carrinho_temp
+  (fora a do checkout)
+- Reservas de estoque (reservas.py) seguem o padrão: cada adição/remoção
+  grava a reserva nos dois modos; IBEX_RESERVA_TTL=0 mede só o carrinho
+
+Uso:
+    python benchmarks/bench_carrinho.py [--linhas 200] [--carrinhos 20]
+"""
+
+import argparse
+import time
+
+from _comum import banco_temporario, percentil
+
+def _popular(linhas, carrinhos):
+    import api
+    from database.esquema import inicializar_banco
+
+    inicializar_banco()
+    eid, _ = api.registrar_empresa("Depósito", "12345678000199", "deposito@bench.ibex", "x")
+    produtos = [api.criar_produto(eid, f"Material {i:04d}", 5.0 + i % 97, 1_000_000).id
+                for i in range(linhas)]
+    clientes = [api.registrar_cliente(f"Obra {i}", f"obra{i}@bench.ibex", "x")[0]
+                for i in range(carrinhos * 2)]
+    return produtos, clientes
+
+def _rodada(clientes, produtos):
+    import api
+
+    acoes, checkouts = 0, []
+    t0 = time.perf_counter()
+    for cliente_id in clientes:
+        for i, produto_id in enumerate(produtos):
+            api.adicionar_item(cliente_id, produto_id, 1)
+            acoes += 1
+            if i % 2:
+                api.adicionar_item(cliente_id, produto_id, 1)
+                acoes += 1
+            if i % 10 == 0:
+                api.consultar_carrinho(cliente_id)
+                acoes += 1
+        for produto_id in produtos[::4]:
+            api.remover_item(cliente_id, produto_id)
+            acoes += 1
+        t = time.perf_counter()
+        api.fechar_pedido(cliente_id, "01001000", "1")
+        checkouts.append(time.perf_counter() - t)
+    total = time.perf_counter() - t0 - sum(checkouts)
+    return acoes / total, checkouts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--linhas", type=int, default=200, help="linhas por carrinho")
+    parser.add_argument("--carrinhos", type=int, default=20, help="carrinhos por modo")
+    args = parser.parse_args()
+
+    banco_temporario()
+    import carrinho_memoria
+
+    produtos, clientes = _popular(args.linhas, args.carrinhos)
+    armazem = carrinho_memoria.armazem
+    print(f"{args.carrinhos} carrinhos de {args.linhas} linhas por modo\n")
+    print(f"{'modo':<14} {'ações/s':>10} {'checkout p50':>13} {'gravações':>11}")
+    for nome, gravar_s, lote in (("imediata", 0, clientes[:args.carrinhos]),
+                                 ("adiada", 60, clientes[args.carrinhos:])):
+        armazem.gravar_s = gravar_s
+        antes = armazem.estatisticas()["gravacoes"]
+        por_segundo, checkouts = _rodada(lote, produtos)
+        transacoes = armazem.estatisticas()["gravacoes"] - antes
+        print(f"{nome:<14} {por_segundo:>10,.0f} {percentil(checkouts, 50) * 1000:>10.1f} ms "
+              f"{transacoes / len(lote):>8,.0f}/carrinho")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/bench_conexao.py
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark: conexão nova por helper x pool de conexões
+- "antes": cada consulta abre conectar() (novo sqlite3.connect + PRAGMAs) e fecha
+- "depois": cada consulta pega uma conexão do pool (obter_conexao)
+- Mede conexões físicas abertas por operação e latência (média e p99)
+
+Uso:
+    python benchmarks/bench_conexao.py [--repeticoes 2000]
+"""
+
+import argparse
+
+from _comum import banco_temporario, cronometrar, percentil
+
+# Consultas de uma tela "Finalizar Pedido" típica (ler carrinho, produto, histórico).
+CONSULTAS = [
+    ("SELECT id, nome, preco_centavos, estoque FROM produtos WHERE id = ?;", (1,)),
+    ("""
+        SELECT ct.produto_id, p.nome, p.preco_centavos, p.estoque, ct.qtd, (p.preco_centavos * ct.qtd)
+        FROM carrinho_temp ct
+        JOIN produtos p ON p.id = ct.produto_id
+        WHERE ct.cliente_id = ?
+        ORDER BY p.nome;
+    """, (1,)),
+    ("""
+        SELECT pedido_codigo, MAX(criado_em), SUM(qtd), SUM(total_item_centavos)
+        FROM carrinho WHERE cliente_id = ? GROUP BY pedido_codigo;
+    """, (1,)),
+    ("SELECT produto_id, qtd FROM carrinho_temp WHERE cliente_id = ?;", (1,)),
+]
+
+def _popular():
+    from database.conexao import obter_conexao
+    from database.esquema import inicializar_banco
+
+    inicializar_banco()
+    with obter_conexao() as con:
+        con.executemany("INSERT INTO produtos (empresa_id, nome, preco_centavos, estoque) VALUES (1, ?, ?, 100);",
+                        [(f"Produto {i}", 1000 + 100 * i) for i in range(200)])
+        con.executemany("INSERT INTO carrinho_temp (cliente_id, produto_id, qtd) VALUES (1, ?, 2);", [(i,) for i in range(1, 11)])
+        con.executemany("""
+            INSERT INTO carrinho (cliente_id, produto_id, qtd, preco_unit_centavos, total_item_centavos, cep, numero,
+                                  pedido_codigo)
+            VALUES (1, ?, 1, 1000, 1000, '01001000', '1', ?);
+        """, [(i % 200 + 1, f"P{i // 5}") for i in range(500)])
+        con.commit()
+
+def _operacao_antes():
+    from database.conexao import conectar
+
+    for sql, params in CONSULTAS:
+        con = conectar()
+        con.execute(sql, params).fetchall()
+        con.close()
+
+def _operacao_depois():
+    from database.conexao import obter_conexao
+
+    for sql, params in CONSULTAS:
+        with obter_conexao() as con:
+            con.execute(sql, params).fetchall()
+
+def _medir(nome, operacao, repeticoes):
+    from database.conexao import estatisticas
+
+    operacao()  # aquecimento
+    antes = estatisticas()["abertas"]
+    tempos = cronometrar(operacao, repeticoes)
+    abertas = estatisticas()["abertas"] - antes
+    media_ms = sum(tempos) / len(tempos) * 1000
+    p99_ms = percentil(tempos, 99) * 1000
+    print(f"{nome:<8} {abertas / repeticoes:>12.2f} {media_ms:>12.3f} {p99_ms:>12.3f}")
+    return media_ms
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeticoes", type=int, default=2000)
+    args = parser.parse_args()
+
+    banco_temporario()
+    _popular()
+
+    print(f"Operação = {len(CONSULTAS)} consultas | repetições: {args.repeticoes}")
+    print(f"{'Modo':<8} {'Conexões/op':>12} {'Média (ms)':>12} {'p99 (ms)':>12}")
+    t_antes = _medir("antes", _operacao_antes, args.repeticoes)
+    t_depois = _medir("depois", _operacao_depois, args.repeticoes)
+    print(f"\nGanho: {t_antes / t_depois:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/bench_inicio.py
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark: tempo de partida do processo (quiosque, cron)
+- Mede, em processos novos, "python -c pass" (piso do interpretador), o
+  menu principal (abre e sai com 0) e um comando curto
+  (agregados verificar), sobre um banco já migrado
+- Confere que a partida não carrega os subsistemas (api, carrinho,
+  produtos, ...) antes de o menu deles ser usado
+- Confere que todos os subsistemas importam sem erro (são carregados
+  tarde, então um import quebrado só apareceria ao abrir o menu)
+- Confere, com IBEX_TRACE_SQL, que a partida não roda DDL
+- Sai com código 1 se a mediana do menu passar do orçamento, se algum
+  subsistema for carregado na partida ou não importar, ou se houver DDL
+
+Uso:
+    python benchmarks/bench_inicio.py [--repeticoes 20] [--orcamento-ms 80]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+from _comum import RAIZ, banco_temporario, percentil
+
+MAIN = os.path.join(RAIZ, "main.py")
+# Só entram quando o menu (ou o comando) que os usa é aberto.
+SUBSISTEMAS = {"api", "sessoes", "autenticacao", "produtos", "carrinho", "pedidos",
+               "relatorio", "cache", "agregados", "comandos", "carrinho_memoria",
+               "reservas", "arquivo"}
+_DDL = re.compile(r"^\s*(CREATE|ALTER|DROP)\b", re.IGNORECASE | re.MULTILINE)
+
+def _rodar(argv, entrada="", env=None):
+    t0 = time.perf_counter()
+    saida = subprocess.run(argv, input=entrada, capture_output=True, text=True,
+                           env=env or os.environ, cwd=RAIZ)
+    segundos = time.perf_counter() - t0
+    if saida.returncode != 0:
+        raise SystemExit(f"{' '.join(argv)} falhou ({saida.returncode}):\n{saida.stderr}")
+    return segundos, saida
+
+def _medir(nome, argv, entrada, repeticoes):
+    _rodar(argv, entrada)   # aquece o cache de disco e os .pyc
+    tempos = [_rodar(argv, entrada)[0] for _ in range(repeticoes)]
+    p50 = percentil(tempos, 50) * 1000
+    print(f"{nome:<28} p50={p50:7.1f} ms  p99={percentil(tempos, 99) * 1000:7.1f} ms")
+    return p50
+
+def _modulos_na_partida():
+    """Módulos do projeto importados até o menu principal (via -X importtime)."""
+    _, saida = _rodar([sys.executable, "-X", "importtime", MAIN], "0\n")
+    nomes = {linha.rsplit("|", 1)[-1].strip() for linha in saida.stderr.splitlines()
+             if linha.startswith("import time:")}
+    return nomes & SUBSISTEMAS
+
+def _subsistemas_com_erro():
+    """Subsistemas que falham ao importar (os menus só os importam no uso)."""
+    falhas = []
+    for nome in sorted(SUBSISTEMAS):
+        saida = subprocess.run([sys.executable, "-c", f"import {nome}"], capture_output=True, text=True,
+                               cwd=os.path.join(RAIZ, "ibex"))
+        if saida.returncode != 0:
+            falhas.append(f"{nome}: {saida.stderr.strip().splitlines()[-1]}")
+    return falhas
+
+def _ddl_na_partida():
+    """Comandos DDL executados ao abrir e fechar o menu."""
+    log = os.path.join(tempfile.mkdtemp(prefix="ibex-inicio-"), "sql.log")
+    env = dict(os.environ, IBEX_TRACE_SQL="1", IBEX_SQL_LENTO_MS="0", IBEX_SQL_LOG=log)
+    _rodar([sys.executable, MAIN], "0\n", env)
+    with open(log, encoding="utf-8") as f:
+        comandos = [linha.split(": ", 1)[-1] for linha in f if linha.startswith("[SQL lento]")]
+    return [c.strip() for c in comandos if _DDL.match(c)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--orcamento-ms", type=float, default=80.0,
+                        help="mediana máxima da partida até o menu principal")
+    args = parser.parse_args()
+
+    banco_temporario()
+    from database.esquema import inicializar_banco
+    inicializar_banco()     # a partida medida encontra o banco já migrado
+
+    piso = _medir("python -c pass", [sys.executable, "-c", "pass"], "", args.repeticoes)
+    menu = _medir("menu principal (0 = sair)", [sys.executable, MAIN], "0\n", args.repeticoes)
+    _medir("agregados verificar", [sys.executable, MAIN, "agregados", "verificar"], "", args.repeticoes)
+    print(f"\nCusto do Ibex na partida do menu: {menu - piso:.1f} ms acima do interpretador")
+
+    falhas = [f"import falhou: {erro}" for erro in _subsistemas_com_erro()]
+    carregados = _modulos_na_partida()
+    if carregados:
+        falhas.append(f"subsistemas carregados antes do uso: {', '.join(sorted(carregados))}")
+    ddl = _ddl_na_partida()
+    if ddl:
+        falhas.append("DDL na partida: " + "; ".join(c[:80] for c in ddl))
+    if menu > args.orcamento_ms:
+        falhas.append(f"menu em {menu:.1f} ms, acima do orçamento de {args.orcamento_ms:.0f} ms")
+
+    for falha in falhas:
+        print(f"⚠ {falha}")
+    if not falhas:
+        print(f"✅ Dentro do orçamento ({args.orcamento_ms:.0f} ms), sem DDL e sem subsistemas na partida.")
+    return 1 if falhas else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
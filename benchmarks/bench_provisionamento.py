@@ -0,0 +1,56 @@
+# benchmarks/bench_provisionamento.py
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark: cadastro de clientes um a um x em lote (provisionamento.py)
+- Um a um: o caminho do console (email_em_uso e depois registrar_cliente,
+  cada um com sua ida ao banco e seu commit) numa amostra de --amostra
+- Em lote: provisionar_clientes com --linhas registros, ~1% repetidos
+- Segunda passada do lote com a mesma base: tudo vira duplicado
+
+Uso:
+    python benchmarks/bench_provisionamento.py [--linhas 200000] [--amostra 5000]
+"""
+
+import argparse
+import random
+import time
+
+from _comum import banco_temporario
+
+def _registros(n, prefixo, semente=42):
+    rnd = random.Random(semente)
+    for i in range(n):
+        # ~1% repete um email já gerado (duplicado dentro do próprio arquivo)
+        j = rnd.randrange(i) if i and rnd.random() < 0.01 else i
+        yield (f"Cliente {j}", f"{prefixo}{j}@bench.ibex", "segredo")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--linhas", type=int, default=200_000)
+    parser.add_argument("--amostra", type=int, default=5_000)
+    parser.add_argument("--lote", type=int, default=5_000)
+    args = parser.parse_args()
+
+    banco_temporario()
+    from database.esquema import inicializar_banco
+    import api
+    from provisionamento import provisionar_clientes
+
+    inicializar_banco()
+
+    t0 = time.perf_counter()
+    for nome, email, senha in _registros(args.amostra, "um"):
+        if not api.email_em_uso("clientes", email):
+            api.registrar_cliente(nome, email, senha)
+    um_a_um = args.amostra / (time.perf_counter() - t0)
+    print(f"Um a um (console):  {args.amostra:>9,} registros  {um_a_um:>10,.0f} registros/s")
+
+    for passada in ("1ª passada", "2ª passada"):
+        r = provisionar_clientes(_registros(args.linhas, "lote"), args.lote)
+        print(f"Em lote ({passada}): {r.lidos:>9,} registros  {r.registros_por_segundo:>10,.0f} registros/s"
+              f"  | inseridos {r.inseridos:,}, duplicados {r.duplicados:,}, rejeitados {r.rejeitados:,}")
+    print(f"\nGanho do lote: {r.registros_por_segundo / um_a_um:,.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# benchmarks/carga_http.py
+# -*- coding: utf-8 -*-
+
+"""
+Teste de carga do servidor HTTP/JSON (python main.py serve)
+- Sem --url: cria um banco temporário com catálogo e clientes, sobe o
+  servidor num subprocesso e dispara contra ele
+- N clientes concorrentes (threads, conexões keep-alive), cada um com seu
+  carrinho e sua sessão (POST /sessoes), numa mistura de listagem,
+  consulta de produto, carrinho e checkout
+- Mostra requisições por segundo, latência p50/p99, respostas por status
+  e os contadores do cache do catálogo do servidor
+
+Uso:
+    python benchmarks/carga_http.py [--clientes 16] [--duracao 10]
+    python benchmarks/carga_http.py --url http://127.0.0.1:8000 --clientes 32
+    (com --url, os clientes cliente0@carga.ibex, cliente1@... com senha "x" precisam existir)
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from _comum import RAIZ, banco_temporario, percentil
+
+N_EMPRESAS = 10
+N_PRODUTOS = 2000
+
+# (peso, operação) — ver _requisicao().
+MISTURA = [
+    (50, "listar"),
+    (25, "produto"),
+    (12, "adicionar"),
+    (8, "carrinho"),
+    (5, "fechar"),
+]
+
+def _popular(n_clientes):
+    import api
+    from database.conexao import obter_conexao
+    from database.esquema import inicializar_banco
+
+    inicializar_banco()
+    for e in range(N_EMPRESAS):
+        api.registrar_empresa(f"Empresa {e}", f"{e:014d}", f"empresa{e}@carga.ibex", "x")
+    with obter_conexao() as con:
+        con.executemany("""
+            INSERT INTO produtos (empresa_id, nome, preco_centavos, estoque) VALUES (?, ?, ?, ?);
+        """, [(i % N_EMPRESAS + 1, f"Produto {i:05d}", 100 + 100 * (i % 97), 1_000_000)
+              for i in range(N_PRODUTOS)])
+        con.commit()
+    for c in range(n_clientes):
+        api.registrar_cliente(f"Cliente {c}", f"cliente{c}@carga.ibex", "x")
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _subir_servidor(caminho_db):
+    porta = _porta_livre()
+    env = dict(os.environ, IBEX_DB=caminho_db)
+    proc = subprocess.Popen([sys.executable, os.path.join(RAIZ, "main.py"), "serve", "--porta", str(porta)],
+                            env=env, stdout=subprocess.DEVNULL)
+    limite = time.monotonic() + 10
+    while time.monotonic() < limite:
+        try:
+            socket.create_connection(("127.0.0.1", porta), timeout=0.2).close()
+            return proc, f"http://127.0.0.1:{porta}"
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise SystemExit("Servidor não subiu em 10 s.")
+
+def _requisicao(operacao, cliente_id, rnd):
+    if operacao == "listar":
+        return "GET", f"/produtos?empresa_id={rnd.randint(1, N_EMPRESAS)}", None
+    if operacao == "produto":
+        return "GET", f"/produtos/{rnd.randint(1, N_PRODUTOS)}", None
+    if operacao == "adicionar":
+        return "POST", f"/clientes/{cliente_id}/carrinho", {"produto_id": rnd.randint(1, N_PRODUTOS), "qtd": 1}
+    if operacao == "carrinho":
+        return "GET", f"/clientes/{cliente_id}/carrinho", None
+    return "POST", f"/clientes/{cliente_id}/pedidos", {"cep": "01001000", "numero": "1"}
+
+def _entrar(con, indice):
+    """Abre a sessão do cliente 'indice'; devolve (cliente_id, token)."""
+    corpo = json.dumps({"tipo": "cliente", "email": f"cliente{indice}@carga.ibex", "senha": "x"})
+    con.request("POST", "/sessoes", body=corpo.encode(), headers={"Content-Type": "application/json"})
+    resposta = con.getresponse()
+    sessao = json.loads(resposta.read())
+    if resposta.status != 201:
+        raise SystemExit(f"Login do cliente{indice}@carga.ibex falhou: {sessao}")
+    return sessao["usuario_id"], sessao["token"]
+
+def _trabalhador(url, indice, fim, semente, latencias, status):
+    rnd = random.Random(semente)
+    operacoes = [op for _, op in MISTURA]
+    pesos = [p for p, _ in MISTURA]
+    destino = urlsplit(url)
+    con = http.client.HTTPConnection(destino.hostname, destino.port, timeout=30)
+    cliente_id, token = _entrar(con, indice)
+    while time.monotonic() < fim:
+        metodo, caminho, corpo = _requisicao(rnd.choices(operacoes, pesos)[0], cliente_id, rnd)
+        dados = json.dumps(corpo).encode() if corpo is not None else None
+        cabecalhos = {"Authorization": f"Bearer {token}"}
+        if dados:
+            cabecalhos["Content-Type"] = "application/json"
+        t0 = time.perf_counter()
+        try:
+            con.request(metodo, caminho, body=dados, headers=cabecalhos)
+            resposta = con.getresponse()
+            resposta.read()
+            codigo = resposta.status
+        except (OSError, http.client.HTTPException):
+            con.close()
+            con = http.client.HTTPConnection(destino.hostname, destino.port, timeout=30)
+            codigo = "falha"
+        # list.append é atômico: as threads podem dividir as listas.
+        latencias.append(time.perf_counter() - t0)
+        status.append(codigo)
+    con.close()
+
+def _estatisticas_cache(url):
+    destino = urlsplit(url)
+    con = http.client.HTTPConnection(destino.hostname, destino.port, timeout=30)
+    try:
+        con.request("GET", "/estatisticas/cache")
+        return json.loads(con.getresponse().read())
+    except (OSError, http.client.HTTPException, ValueError):
+        return None
+    finally:
+        con.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clientes", type=int, default=16, help="clientes concorrentes")
+    parser.add_argument("--duracao", type=float, default=10.0, help="segundos de carga")
+    parser.add_argument("--url", help="servidor já em execução")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    proc = None
+    if args.url:
+        url = args.url
+    else:
+        caminho = banco_temporario()
+        _popular(args.clientes)
+        proc, url = _subir_servidor(caminho)
+
+    latencias = []
+    status = []
+    fim = time.monotonic() + args.duracao
+    threads = [threading.Thread(target=_trabalhador,
+                                args=(url, i, fim, args.semente + i, latencias, status))
+               for i in range(args.clientes)]
+    t0 = time.perf_counter()
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        decorrido = time.perf_counter() - t0
+        cache = _estatisticas_cache(url)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    total = len(latencias)
+    print(f"Servidor: {url} | clientes: {args.clientes} | duração: {decorrido:.1f} s")
+    print(f"Requisições: {total}  ->  {total / decorrido:,.0f} req/s")
+    print(f"Latência p50: {percentil(latencias, 50) * 1000:.2f} ms | "
+          f"p99: {percentil(latencias, 99) * 1000:.2f} ms")
+    print("Status: " + ", ".join(f"{k}={v}" for k, v in sorted(Counter(status).items(), key=str)))
+    if cache:
+        print(f"Cache do catálogo: {cache['entradas']}/{cache['capacidade']} entradas, "
+              f"acerto {cache['taxa_acerto']:.1%}, {cache['despejos']} despejos, "
+              f"{cache['invalidacoes']} invalidações")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# benchmarks/corrida_checkout.py
+# -*- coding: utf-8 -*-
+
+"""
+Checkouts concorrentes em vários processos sobre o mesmo produto
+- Um produto com estoque pequeno; todos os clientes têm o produto no
+  carrinho e fecham o pedido ao mesmo tempo
+- Os carrinhos vão direto para carrinho_temp, sem reservas (reservas.py):
+  pela api, a reserva já barraria na adição os carrinhos além do estoque,
+  e a corrida do checkout não seria testada
+- N processos, cada um com seus clientes, liberados juntos por um Event
+- Confere: estoque nunca negativo, estoque final = inicial - vendido,
+  linhas em 'carrinho' = vendido e totais de vendas batendo (agregados)
+- Sai com código 1 se alguma conferência falhar
+
+Uso:
+    python benchmarks/corrida_checkout.py [--processos 8] [--clientes 10] [--estoque 50] [--qtd 3]
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+
+from _comum import banco_temporario
+
+def _preparar(args):
+    import api
+    from database.conexao import transacao
+    from database.esquema import inicializar_banco
+
+    inicializar_banco()
+    empresa_id, _ = api.registrar_empresa("Corrida", "11222333000181", "corrida@ibex", "x")
+    produto = api.criar_produto(empresa_id, "Cimento CP-II 50kg", 32.9, args.estoque)
+    clientes = []
+    for i in range(args.processos * args.clientes):
+        cid, _ = api.registrar_cliente(f"Cliente {i}", f"c{i}@corrida.ibex", "x")
+        clientes.append(cid)
+    with transacao() as con:
+        con.executemany("INSERT INTO carrinho_temp (cliente_id, produto_id, qtd) VALUES (?, ?, ?);",
+                        [(cid, produto.id, args.qtd) for cid in clientes])
+    return produto.id, clientes
+
+def _comprador(caminho, clientes, largada, resultados):
+    from database import conexao
+    import api
+
+    conexao.configurar(caminho)
+    vendidos, recusados, erros = 0, 0, []
+    largada.wait()
+    for cid in clientes:
+        try:
+            api.fechar_pedido(cid, "01001000", "1")
+            vendidos += 1
+        except api.EstoqueInsuficiente:
+            recusados += 1
+        except Exception as e:
+            erros.append(f"{type(e).__name__}: {e}")
+    resultados.put((os.getpid(), vendidos, recusados, erros))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--processos", type=int, default=8)
+    parser.add_argument("--clientes", type=int, default=10, help="clientes por processo")
+    parser.add_argument("--estoque", type=int, default=50)
+    parser.add_argument("--qtd", type=int, default=3, help="unidades por pedido")
+    args = parser.parse_args()
+
+    caminho = banco_temporario()
+    produto_id, clientes = _preparar(args)
+
+    ctx = multiprocessing.get_context("spawn")
+    largada = ctx.Event()
+    resultados = ctx.Queue()
+    procs = [ctx.Process(target=_comprador,
+                         args=(caminho, clientes[i::args.processos], largada, resultados))
+             for i in range(args.processos)]
+    for p in procs:
+        p.start()
+    time.sleep(0.5)  # deixa todos chegarem ao wait()
+    t0 = time.perf_counter()
+    largada.set()
+    parciais = [resultados.get() for _ in procs]
+    for p in procs:
+        p.join()
+    decorrido = time.perf_counter() - t0
+
+    import agregados
+    from database.conexao import obter_conexao
+
+    vendidos = sum(v for _, v, _, _ in parciais)
+    recusados = sum(r for _, _, r, _ in parciais)
+    erros = [e for _, _, _, lista in parciais for e in lista]
+    with obter_conexao() as con:
+        estoque = con.execute("SELECT estoque FROM produtos WHERE id = ?;", (produto_id,)).fetchone()[0]
+        unidades = con.execute("SELECT COALESCE(SUM(qtd), 0) FROM carrinho WHERE produto_id = ?;",
+                               (produto_id,)).fetchone()[0]
+        n_pedidos = con.execute("SELECT COUNT(*) FROM pedidos;").fetchone()[0]
+
+    print(f"{args.processos} processos x {args.clientes} clientes | estoque {args.estoque}, "
+          f"{args.qtd} un./pedido | {decorrido * 1000:.0f} ms")
+    print(f"Pedidos aceitos: {vendidos} | recusados por estoque: {recusados} | erros: {len(erros)}")
+    print(f"Estoque final: {estoque} | unidades vendidas: {unidades}")
+
+    falhas = []
+    if estoque < 0:
+        falhas.append(f"estoque negativo ({estoque})")
+    if estoque != args.estoque - vendidos * args.qtd:
+        falhas.append(f"estoque {estoque} != {args.estoque} - {vendidos} x {args.qtd}")
+    if unidades != vendidos * args.qtd or n_pedidos != vendidos:
+        falhas.append(f"linhas gravadas ({n_pedidos} pedidos, {unidades} un.) não batem com {vendidos} aceitos")
+    if vendidos != min(len(clientes), args.estoque // args.qtd):
+        falhas.append(f"esperado vender {min(len(clientes), args.estoque // args.qtd)} pedidos")
+    falhas += erros
+    falhas += [f"agregados: {d}" for d in agregados.verificar()]
+
+    for f in falhas:
+        print("❌", f)
+    if not falhas:
+        print("✅ Sem venda acima do estoque.")
+    return 1 if falhas else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
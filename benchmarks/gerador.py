@@ -0,0 +1,153 @@
+# benchmarks/gerador.py
+# -*- coding: utf-8 -*-
+
+"""
+Gerador determinístico de dados para benchmarks
+- N empresas, M produtos, K clientes e P pedidos já fechados (cabeçalho em
+  'pedidos', itens em 'carrinho', totais por empresa e agregados de vendas)
+- Mesma semente = mesmo banco (nomes, preços, códigos e datas), então
+  medições de versões diferentes rodam sobre os mesmos dados
+- Grava direto com executemany (não passa pelo checkout): o conjunto
+  padrão (100 mil pedidos, ~300 mil itens) sai em ~20 s
+- Pode ser importado (gerar()) ou rodado para criar um banco de testes
+
+Uso:
+    python benchmarks/gerador.py --saida /tmp/ibex.db [--empresas 50] [--produtos 50000]
+        [--clientes 20000] [--pedidos 100000] [--semente 42]
+"""
+
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+
+from _comum import DETALHES, MARCAS, MATERIAIS
+
+# Pedidos espalhados pelos 365 dias anteriores a esta data (fixa: determinismo).
+DATA_FINAL = datetime(2026, 1, 1, tzinfo=timezone.utc)
+LOTE = 20_000
+
+class Parametros(NamedTuple):
+    empresas: int = 50
+    produtos: int = 50_000
+    clientes: int = 20_000
+    pedidos: int = 100_000
+    itens_max: int = 5      # itens por pedido: 1..itens_max
+    semente: int = 42
+
+def _inserir(con, sql, linhas):
+    bloco = []
+    for linha in linhas:
+        bloco.append(linha)
+        if len(bloco) >= LOTE:
+            con.executemany(sql, bloco)
+            bloco = []
+    if bloco:
+        con.executemany(sql, bloco)
+
+def _pedidos(p, rnd, precos, empresa_de):
+    """Gera (cabecalho, itens, por_empresa) de cada pedido, em ordem de data."""
+    from codigos import montar_codigo
+
+    inicio_ms = int((DATA_FINAL - timedelta(days=365)).timestamp() * 1000)
+    passo_ms = 365 * 86_400_000 // max(p.pedidos, 1)
+    for pedido_id in range(1, p.pedidos + 1):
+        ms = inicio_ms + (pedido_id - 1) * passo_ms + rnd.randrange(max(passo_ms, 1))
+        codigo = montar_codigo(ms, rnd.getrandbits(80))
+        criado_em = datetime.fromtimestamp(ms / 1000, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        cliente_id = rnd.randint(1, p.clientes)
+        itens, por_empresa = [], {}
+        for produto_id in rnd.sample(range(1, p.produtos + 1), rnd.randint(1, min(p.itens_max, p.produtos))):
+            qtd = rnd.randint(1, 5)
+            total = precos[produto_id] * qtd
+            itens.append((produto_id, qtd, precos[produto_id], total))
+            q, v = por_empresa.get(empresa_de[produto_id], (0, 0))
+            por_empresa[empresa_de[produto_id]] = (q + qtd, v + total)
+        cabecalho = (pedido_id, codigo, cliente_id, sum(i[1] for i in itens),
+                     sum(i[3] for i in itens), f"{rnd.randint(1000000, 99999999):08d}",
+                     str(rnd.randint(1, 2000)), criado_em)
+        yield cabecalho, itens, por_empresa
+
+def gerar(p=Parametros()):
+    """
+    Popula o banco atual (já migrado e vazio). Devolve o tempo gasto (s).
+    Produto i pertence à empresa (i % empresas) + 1; ids começam em 1.
+    """
+    import agregados
+    from database.conexao import transacao
+
+    rnd = random.Random(p.semente)
+    t0 = time.perf_counter()
+    # Preços em centavos (R$ 1,00 a R$ 500,00).
+    precos = [0] + [round(rnd.uniform(1, 500) * 100) for _ in range(p.produtos)]
+    empresa_de = [0] + [i % p.empresas + 1 for i in range(p.produtos)]
+
+    with transacao() as con:
+        _inserir(con, "INSERT INTO empresas (id, razao_social, cnpj, email, senha) VALUES (?, ?, ?, ?, 'x');",
+                 ((e, f"Empresa {e}", f"{e:014d}", f"empresa{e}@gerador.ibex") for e in range(1, p.empresas + 1)))
+        _inserir(con, "INSERT INTO produtos (id, empresa_id, nome, preco_centavos, estoque) VALUES (?, ?, ?, ?, ?);",
+                 ((i, empresa_de[i],
+                   f"{rnd.choice(MATERIAIS)} {rnd.choice(DETALHES)} {rnd.choice(MARCAS)} {i:07d}",
+                   precos[i], rnd.randint(100, 100_000))
+                  for i in range(1, p.produtos + 1)))
+        _inserir(con, "INSERT INTO clientes (id, nome, email, senha) VALUES (?, ?, ?, 'x');",
+                 ((c, f"Cliente {c}", f"cliente{c}@gerador.ibex") for c in range(1, p.clientes + 1)))
+
+        cabecalhos, linhas, por_empresa = [], [], []
+
+        def descarregar():
+            con.executemany("""
+                INSERT INTO pedidos (id, codigo, cliente_id, total_itens, total_valor_centavos, cep, numero, criado_em)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?);
+            """, cabecalhos)
+            con.executemany("""
+                INSERT INTO carrinho (cliente_id, produto_id, qtd, preco_unit_centavos, total_item_centavos, cep, numero,
+                                      pedido_codigo, pedido_id, criado_em)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+            """, linhas)
+            con.executemany("""
+                INSERT INTO pedidos_empresas (empresa_id, pedido_id, total_itens, total_valor_centavos)
+                VALUES (?, ?, ?, ?);
+            """, por_empresa)
+            cabecalhos.clear()
+            linhas.clear()
+            por_empresa.clear()
+
+        for cab, itens, empresas in _pedidos(p, rnd, precos, empresa_de):
+            pedido_id, codigo, cliente_id, _, _, cep, numero, criado_em = cab
+            cabecalhos.append(cab)
+            linhas.extend((cliente_id, pid, qtd, preco, total, cep, numero, codigo, pedido_id, criado_em)
+                          for pid, qtd, preco, total in itens)
+            por_empresa.extend((emp, pedido_id, q, round(v, 2)) for emp, (q, v) in empresas.items())
+            if len(cabecalhos) >= LOTE:
+                descarregar()
+        descarregar()
+
+    agregados.reconstruir()
+    with transacao() as con:
+        con.execute("ANALYZE;")
+    return time.perf_counter() - t0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--saida", required=True, help="arquivo do banco (não pode existir)")
+    for campo, padrao in Parametros._field_defaults.items():
+        parser.add_argument(f"--{campo.replace('_', '-')}", type=int, default=padrao)
+    args = parser.parse_args()
+    if os.path.exists(args.saida):
+        raise SystemExit(f"{args.saida} já existe.")
+
+    from database import conexao
+    from database.esquema import inicializar_banco
+
+    conexao.configurar(args.saida)
+    inicializar_banco()
+    p = Parametros(*(getattr(args, c) for c in Parametros._fields))
+    segundos = gerar(p)
+    print(f"✅ {args.saida}: {p.empresas:,} empresas, {p.produtos:,} produtos, "
+          f"{p.clientes:,} clientes, {p.pedidos:,} pedidos em {segundos:.1f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+# benchmarks/suite.py
+# -*- coding: utf-8 -*-
+
+"""
+Suíte de benchmarks: cada caminho de dados sobre um banco gerado
+- Gera o banco com gerador.py (ou copia um pronto com --banco) e mede,
+  com entradas sorteadas pela mesma semente:
+    * pedidos.py: resumo/detalhes de pedidos do cliente e da empresa
+    * relatorio.py: relatório de estoque e de vendas (linhas completas) e
+      vendas por semana + mais vendidos no ano dos dados gerados
+    * catálogo: página, produto, busca por nome
+    * carrinho: adicionar, consultar, remover; checkout (fechar_pedido)
+- Cache do catálogo desligado por padrão (mede o banco); --com-cache liga
+- Grava JSON (versão do código, ambiente, parâmetros, latências por
+  caminho) e, com --comparar, aponta regressões contra um JSON anterior
+  (sai com código 1 se alguma mediana piorar além da --tolerancia)
+
+Uso:
+    python benchmarks/suite.py --saida resultados.json
+    python benchmarks/suite.py --saida novo.json --comparar resultados.json
+    python benchmarks/suite.py --pedidos 10000 --repeticoes 50   (rodada rápida)
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from _comum import RAIZ, banco_temporario, percentil
+from gerador import Parametros, gerar
+
+TERMOS_BUSCA = ["cimento", "argamassa ac", "tubo pvc", "tijolo baiano", "vergalhao", "tinta coral"]
+
+# ============================== Entradas ======================================
+
+def _amostras(rnd, n):
+    """Sorteia do banco as entradas de cada caminho (ids e códigos existentes)."""
+    from database.conexao import obter_conexao
+
+    with obter_conexao() as con:
+        def maximo(tabela):
+            return con.execute(f"SELECT MAX(id) FROM {tabela};").fetchone()[0] or 0
+
+        n_clientes, n_empresas, n_produtos, n_pedidos = (
+            maximo("clientes"), maximo("empresas"), maximo("produtos"), maximo("pedidos"))
+        if not (n_clientes and n_empresas and n_produtos and n_pedidos):
+            raise SystemExit("Banco sem clientes, empresas, produtos ou pedidos.")
+        pedidos = [con.execute("SELECT cliente_id, codigo FROM pedidos WHERE id = ?;",
+                               (rnd.randint(1, n_pedidos),)).fetchone() for _ in range(n)]
+        pedidos_empresa = [con.execute("""
+            SELECT pem.empresa_id, pe.codigo
+            FROM pedidos_empresas pem JOIN pedidos pe ON pe.id = pem.pedido_id
+            WHERE pem.pedido_id = ? LIMIT 1;
+        """, (rnd.randint(1, n_pedidos),)).fetchone() for _ in range(n)]
+    return {
+        "clientes": [rnd.randint(1, n_clientes) for _ in range(n)],
+        "empresas": [rnd.randint(1, n_empresas) for _ in range(n)],
+        "produtos": [rnd.randint(1, n_produtos) for _ in range(n)],
+        "pedidos": [tuple(p) for p in pedidos],
+        "pedidos_empresa": [tuple(p) for p in pedidos_empresa if p],
+        "termos": [rnd.choice(TERMOS_BUSCA) for _ in range(n)],
+    }
+
+# ============================== Caminhos ======================================
+
+def _caminhos(a):
+    """
+    (nome, preparar, medir): preparar(i) roda fora do cronômetro (pode ser
+    None); medir(i) é a operação medida, com a i-ésima entrada sorteada.
+    """
+    import api
+    import pedidos
+    import relatorio
+
+    carrinho = list(zip(a["clientes"], a["produtos"]))
+    checkout = [(a["clientes"][-1 - i], [a["produtos"][(i + k) % len(a["produtos"])] for k in range(3)])
+                for i in range(len(a["clientes"]))]
+
+    def preparar_checkout(i):
+        cliente_id, produtos = checkout[i]
+        for produto_id in produtos:
+            api.adicionar_item(cliente_id, produto_id, 1)
+
+    return [
+        ("pedidos.resumo_cliente", None,
+         lambda i: pedidos._listar_resumo_pedidos_cliente(a["pedidos"][i][0])),
+        ("pedidos.detalhes_cliente", None,
+         lambda i: pedidos._listar_detalhes_pedido_cliente(*a["pedidos"][i])),
+        ("pedidos.resumo_empresa", None,
+         lambda i: pedidos._listar_resumo_pedidos_empresa(a["empresas"][i])),
+        ("pedidos.detalhes_empresa", None,
+         lambda i: pedidos._listar_detalhes_pedido_empresa(*a["pedidos_empresa"][i % len(a["pedidos_empresa"])])),
+        ("relatorio.estoque", None,
+         lambda i: list(relatorio.linhas_estoque(a["empresas"][i]))),
+        ("relatorio.vendas", None,
+         lambda i: (relatorio.resumo_vendas(a["empresas"][i]), list(relatorio.linhas_vendas(a["empresas"][i])))),
+        ("relatorio.periodo", None,
+         lambda i: api.vendas_por_periodo(a["empresas"][i], "2025-01-01", "2025-12-31", "semana")),
+        ("catalogo.pagina", None,
+         lambda i: api.pagina_produtos(a["empresas"][i])),
+        ("catalogo.produto", None,
+         lambda i: api.obter_produto(a["produtos"][i])),
+        ("catalogo.busca", None,
+         lambda i: api.buscar_produtos(a["termos"][i])),
+        ("carrinho.adicionar", None,
+         lambda i: api.adicionar_item(*carrinho[i], 1)),
+        ("carrinho.consultar", None,
+         lambda i: api.consultar_carrinho(carrinho[i][0])),
+        # O item é (re)posto antes de cada remoção, fora do cronômetro.
+        ("carrinho.remover", lambda i: api.adicionar_item(*carrinho[i], 1),
+         lambda i: api.remover_item(*carrinho[i])),
+        ("checkout.fechar_pedido", preparar_checkout,
+         lambda i: api.fechar_pedido(checkout[i][0], "01001000", "1")),
+    ]
+
+def medir(preparar, operacao, repeticoes, aquecimento=3):
+    """
+    Latências (s) de operacao(i) para i em 0..repeticoes-1. Caminhos com
+    preparar (que mudam estado) não têm aquecimento.
+    """
+    if preparar is None:
+        for i in range(min(aquecimento, repeticoes)):
+            operacao(i)
+    tempos = []
+    for i in range(repeticoes):
+        if preparar is not None:
+            preparar(i)
+        t0 = time.perf_counter()
+        operacao(i)
+        tempos.append(time.perf_counter() - t0)
+    return tempos
+
+def resumo(tempos):
+    total = sum(tempos)
+    return {
+        "n": len(tempos),
+        "media_ms": round(total / len(tempos) * 1000, 4),
+        "p50_ms": round(percentil(tempos, 50) * 1000, 4),
+        "p95_ms": round(percentil(tempos, 95) * 1000, 4),
+        "p99_ms": round(percentil(tempos, 99) * 1000, 4),
+        "ops_s": round(len(tempos) / total, 1) if total else None,
+    }
+
+# ============================== Resultado =====================================
+
+def _versao_codigo():
+    try:
+        saida = subprocess.run(["git", "-C", RAIZ, "describe", "--always", "--dirty"],
+                               capture_output=True, text=True, timeout=10)
+        return saida.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def comparar(atual, anterior, tolerancia):
+    """Imprime a variação da mediana por caminho; devolve os que regrediram."""
+    regressoes = []
+    print(f"\n{'caminho':<28} {'antes p50':>10} {'agora p50':>10} {'variação':>9}")
+    for nome, medida in atual["caminhos"].items():
+        antes = anterior.get("caminhos", {}).get(nome)
+        if not antes or not antes["p50_ms"]:
+            print(f"{nome:<28} {'-':>10} {medida['p50_ms']:>10.3f} {'novo':>9}")
+            continue
+        variacao = medida["p50_ms"] / antes["p50_ms"] - 1
+        marca = ""
+        if variacao > tolerancia:
+            regressoes.append(nome)
+            marca = "  ⚠ regressão"
+        print(f"{nome:<28} {antes['p50_ms']:>10.3f} {medida['p50_ms']:>10.3f} {variacao:>+8.0%}{marca}")
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    for campo, padrao in Parametros._field_defaults.items():
+        parser.add_argument(f"--{campo.replace('_', '-')}", type=int, default=padrao)
+    parser.add_argument("--banco", help="usa uma cópia deste banco (de gerador.py) em vez de gerar")
+    parser.add_argument("--repeticoes", type=int, default=200, help="medições por caminho")
+    parser.add_argument("--com-cache", action="store_true", help="liga o cache do catálogo")
+    parser.add_argument("--saida", help="arquivo JSON com os resultados")
+    parser.add_argument("--comparar", help="JSON de uma rodada anterior")
+    parser.add_argument("--tolerancia", type=float, default=0.25,
+                        help="piora aceita na mediana antes de acusar regressão (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    if not args.com_cache:
+        os.environ["IBEX_CACHE_CATALOGO"] = "0"
+    caminho = banco_temporario()
+    from database.esquema import inicializar_banco
+
+    p = Parametros(*(getattr(args, c) for c in Parametros._fields))
+    if args.banco:
+        shutil.copyfile(args.banco, caminho)
+        inicializar_banco()
+        carga = None
+        print(f"Banco: cópia de {args.banco}")
+    else:
+        inicializar_banco()
+        carga = gerar(p)
+        print(f"Banco gerado em {carga:.1f} s: {p.empresas:,} empresas, {p.produtos:,} produtos, "
+              f"{p.clientes:,} clientes, {p.pedidos:,} pedidos")
+
+    amostras = _amostras(random.Random(p.semente), args.repeticoes)
+    caminhos = {}
+    print(f"\n{'caminho':<28} {'p50 (ms)':>10} {'p99 (ms)':>10} {'ops/s':>10}")
+    for nome, preparar, operacao in _caminhos(amostras):
+        caminhos[nome] = resumo(medir(preparar, operacao, args.repeticoes))
+        m = caminhos[nome]
+        print(f"{nome:<28} {m['p50_ms']:>10.3f} {m['p99_ms']:>10.3f} {m['ops_s']:>10,.0f}")
+
+    resultado = {
+        "versao": _versao_codigo(),
+        "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "ambiente": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "plataforma": platform.platform(),
+        },
+        "parametros": None if args.banco else p._asdict(),
+        "banco": args.banco,
+        "repeticoes": args.repeticoes,
+        "cache_catalogo": args.com_cache,
+        "carga_s": round(carga, 3) if carga is not None else None,
+        "caminhos": caminhos,
+    }
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+        print(f"\nResultados em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = json.load(f)
+        if anterior.get("parametros") != resultado["parametros"] or anterior.get("banco") != args.banco:
+            print("\n⚠ Rodadas com dados diferentes: a comparação é só indicativa.")
+        regressoes = comparar(resultado, anterior, args.tolerancia)
+        if regressoes:
+            print(f"\n{len(regressoes)} regressão(ões): {', '.join(regressoes)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# benchmarks/verificar_planos.py
+# -*- coding: utf-8 -*-
+
+"""
+Regressão de planos de consulta
+- Roda EXPLAIN QUERY PLAN em cada consulta nomeada (CONSULTAS) de
+  api.py, pedidos.py, relatorio.py, ajustes.py, carrinho_memoria.py e reservas.py sobre um
+  banco com o esquema atual
+- Falha (código de saída 1) se alguma delas fizer varredura completa de
+  tabela ou de índice inteiro ("SCAN <tabela>")
+
+Uso:
+    python benchmarks/verificar_planos.py [-v]
+"""
+
+import argparse
+import re
+import sys
+
+from _comum import banco_temporario
+
+# "SCAN c", "SCAN produtos" ou "SCAN c USING COVERING INDEX ..." percorrem a
+# tabela (ou o índice) inteira; só "SEARCH ..." limita as linhas lidas.
+# Exceções: "SCAN f VIRTUAL TABLE INDEX n:M..." é um MATCH no índice FTS5 e
+# "SCAN json_each ..." percorre a lista de ids passada como parâmetro.
+_VARREDURA = re.compile(r"^SCAN (?!CONSTANT ROW|json_each\b)\w+\b(?! VIRTUAL TABLE INDEX \d+:M)")
+
+def _modulos():
+    import ajustes
+    import api
+    import arquivo
+    import carrinho_memoria
+    import pedidos
+    import relatorio
+    import reservas
+
+    return [api, pedidos, relatorio, ajustes, carrinho_memoria, reservas, arquivo]
+
+def plano(con, sql):
+    """Retorna as linhas 'detail' do EXPLAIN QUERY PLAN de 'sql'."""
+    params = (None,) * sql.count("?")
+    return [linha[3] for linha in con.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+def varreduras(detalhes):
+    """Filtra as linhas do plano que representam varredura completa de tabela."""
+    return [d for d in detalhes if _VARREDURA.match(d)]
+
+def verificar(verboso=False):
+    from database.conexao import obter_conexao
+    from database.esquema import inicializar_banco
+
+    inicializar_banco()
+    falhas = []
+    with obter_conexao() as con:
+        # Estatísticas vazias fazem o planejador tratar toda tabela como enorme.
+        con.execute("ANALYZE;")
+        for modulo in _modulos():
+            for nome, sql in modulo.CONSULTAS.items():
+                detalhes = plano(con, sql)
+                ruins = varreduras(detalhes)
+                rotulo = f"{modulo.__name__}.{nome}"
+                print(f"{'FALHA' if ruins else 'ok':<6} {rotulo}")
+                if verboso or ruins:
+                    for d in detalhes:
+                        print(f"         {d}")
+                if ruins:
+                    falhas.append(rotulo)
+    return falhas
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-v", "--verboso", action="store_true", help="mostra o plano completo")
+    args = parser.parse_args()
+
+    banco_temporario()
+    falhas = verificar(args.verboso)
+    if falhas:
+        print(f"\n{len(falhas)} consulta(s) com varredura completa: {', '.join(falhas)}")
+        sys.exit(1)
+    print("\nNenhuma varredura completa de tabela.")
+
+if __name__ == "__main__":
+    main()
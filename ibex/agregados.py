@@ -0,0 +1,147 @@
+# ibex/agregados.py
+# -*- coding: utf-8 -*-
+
+"""
+Totais de vendas mantidos incrementalmente
+- vendas_produto(produto_id, empresa_id, qtd_total, receita_centavos)
+- vendas_empresa(empresa_id, total_pedidos, receita_total_centavos)
+- vendas_dia(empresa_id, produto_id, dia, qtd, receita_centavos): base dos
+  relatórios por período (relatorio.py); dia = date(carrinho.criado_em), UTC
+- registrar_venda(): chamado DENTRO da transação do checkout
+- reconstruir()/verificar(): recalculam os totais a partir das linhas brutas
+  de 'carrinho' (mesma regra do relatório antigo: carrinho JOIN produtos)
+- As linhas brutas incluem as arquivadas: o recálculo lê a view
+  'carrinho_todos' numa conexão de arquivo.py
+"""
+
+import arquivo
+
+# ============================ cálculo a partir do bruto =======================
+
+_SQL_BRUTO_PRODUTO = """
+    SELECT c.produto_id, p.empresa_id, SUM(c.qtd), SUM(c.total_item_centavos)
+    FROM carrinho_todos c
+    JOIN produtos p ON p.id = c.produto_id
+    GROUP BY c.produto_id
+"""
+
+_SQL_BRUTO_EMPRESA = """
+    SELECT p.empresa_id, COUNT(DISTINCT c.pedido_codigo), SUM(c.total_item_centavos)
+    FROM carrinho_todos c
+    JOIN produtos p ON p.id = c.produto_id
+    WHERE p.empresa_id IS NOT NULL
+    GROUP BY p.empresa_id
+"""
+
+_SQL_BRUTO_DIA = """
+    SELECT p.empresa_id, c.produto_id, date(c.criado_em), SUM(c.qtd), SUM(c.total_item_centavos)
+    FROM carrinho_todos c
+    JOIN produtos p ON p.id = c.produto_id
+    WHERE p.empresa_id IS NOT NULL
+    GROUP BY p.empresa_id, c.produto_id, date(c.criado_em)
+"""
+
+# ============================ manutenção incremental ==========================
+
+def registrar_venda(cur, itens, por_empresa, pedido_id):
+    """
+    Soma uma venda aos totais. Deve rodar na mesma transação que grava as
+    linhas em 'carrinho'.
+    - itens: [(produto_id, empresa_id, qtd, total_item_centavos), ...]
+    - por_empresa: {empresa_id: (qtd, valor_centavos)} das empresas presentes no pedido
+    - pedido_id: as linhas do pedido dão o dia de vendas_dia (mesmo
+      criado_em que o recálculo usa)
+    """
+    cur.executemany("""
+        INSERT INTO vendas_produto (produto_id, empresa_id, qtd_total, receita_centavos)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(produto_id) DO UPDATE SET
+            qtd_total = qtd_total + excluded.qtd_total,
+            receita_centavos = receita_centavos + excluded.receita_centavos;
+    """, itens)
+    cur.executemany("""
+        INSERT INTO vendas_empresa (empresa_id, total_pedidos, receita_total_centavos)
+        VALUES (?, 1, ?)
+        ON CONFLICT(empresa_id) DO UPDATE SET
+            total_pedidos = total_pedidos + 1,
+            receita_total_centavos = receita_total_centavos + excluded.receita_total_centavos;
+    """, [(emp, valor) for emp, (_, valor) in por_empresa.items()])
+    cur.execute("""
+        INSERT INTO vendas_dia (empresa_id, produto_id, dia, qtd, receita_centavos)
+        SELECT p.empresa_id, c.produto_id, date(c.criado_em), SUM(c.qtd), SUM(c.total_item_centavos)
+        FROM carrinho c
+        JOIN produtos p ON p.id = c.produto_id
+        WHERE c.pedido_id = ? AND p.empresa_id IS NOT NULL
+        GROUP BY c.produto_id, date(c.criado_em)
+        ON CONFLICT(empresa_id, produto_id, dia) DO UPDATE SET
+            qtd = qtd + excluded.qtd,
+            receita_centavos = receita_centavos + excluded.receita_centavos;
+    """, (pedido_id,))
+
+def ao_remover_produto(cur, empresa_id, produto_id):
+    """
+    Mantém a regra do relatório (só conta itens de produtos existentes):
+    tira o produto dos totais e recalcula a linha da empresa.
+    'cur' precisa ser de uma conexão de arquivo.transacao() (view carrinho_todos).
+    """
+    cur.execute("DELETE FROM vendas_produto WHERE produto_id = ?;", (produto_id,))
+    cur.execute("DELETE FROM vendas_dia WHERE empresa_id = ? AND produto_id = ?;", (empresa_id, produto_id))
+    cur.execute("DELETE FROM vendas_empresa WHERE empresa_id = ?;", (empresa_id,))
+    cur.execute("""
+        INSERT INTO vendas_empresa (empresa_id, total_pedidos, receita_total_centavos)
+        SELECT p.empresa_id, COUNT(DISTINCT c.pedido_codigo), SUM(c.total_item_centavos)
+        FROM produtos p
+        JOIN carrinho_todos c ON c.produto_id = p.id
+        WHERE p.empresa_id = ?
+        GROUP BY p.empresa_id;
+    """, (empresa_id,))
+
+# ========================== reconstrução / verificação ========================
+
+def reconstruir():
+    """Apaga e recalcula todos os totais a partir de 'carrinho' (e do arquivo)."""
+    with arquivo.transacao() as con:
+        con.execute("DELETE FROM vendas_produto;")
+        con.execute("DELETE FROM vendas_empresa;")
+        con.execute("DELETE FROM vendas_dia;")
+        con.execute(f"""
+            INSERT INTO vendas_produto (produto_id, empresa_id, qtd_total, receita_centavos)
+            {_SQL_BRUTO_PRODUTO};
+        """)
+        con.execute(f"""
+            INSERT INTO vendas_empresa (empresa_id, total_pedidos, receita_total_centavos)
+            {_SQL_BRUTO_EMPRESA};
+        """)
+        con.execute(f"""
+            INSERT INTO vendas_dia (empresa_id, produto_id, dia, qtd, receita_centavos)
+            {_SQL_BRUTO_DIA};
+        """)
+
+def _comparar(esperado, atual, rotulo):
+    divergencias = []
+    for chave in sorted(set(esperado) | set(atual), key=lambda k: (k is None, k)):
+        e, a = esperado.get(chave), atual.get(chave)
+        # Receitas em centavos inteiros: a soma é exata em qualquer ordem.
+        if e is None or a is None or e != a:
+            divergencias.append((rotulo, chave, e, a))
+    return divergencias
+
+def verificar():
+    """
+    Compara os totais mantidos com o recálculo a partir de 'carrinho'.
+    Retorna a lista de divergências (tabela, chave, esperado, atual);
+    lista vazia = tudo certo.
+    """
+    with arquivo.conexao() as con:
+        bruto_prod = {r[0]: (r[2], r[3]) for r in con.execute(_SQL_BRUTO_PRODUTO)}
+        bruto_emp = {r[0]: (r[1], r[2]) for r in con.execute(_SQL_BRUTO_EMPRESA)}
+        prod = {r[0]: (r[1], r[2]) for r in con.execute(
+            "SELECT produto_id, qtd_total, receita_centavos FROM vendas_produto;")}
+        emp = {r[0]: (r[1], r[2]) for r in con.execute(
+            "SELECT empresa_id, total_pedidos, receita_total_centavos FROM vendas_empresa;")}
+        bruto_dia = {tuple(r[:3]): (r[3], r[4]) for r in con.execute(_SQL_BRUTO_DIA)}
+        dia = {tuple(r[:3]): (r[3], r[4]) for r in con.execute(
+            "SELECT empresa_id, produto_id, dia, qtd, receita_centavos FROM vendas_dia;")}
+    return (_comparar(bruto_prod, prod, "vendas_produto")
+            + _comparar(bruto_emp, emp, "vendas_empresa")
+            + _comparar(bruto_dia, dia, "vendas_dia"))
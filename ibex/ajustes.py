@@ -0,0 +1,305 @@
+# ibex/ajustes.py
+# -*- coding: utf-8 -*-
+
+"""
+Ajustes em lote no catálogo de uma empresa
+- reajustar_precos: regra de preço (+8%, -5%, +R$ 2,00) sobre todos os
+  produtos da empresa, os que casam com uma busca por nome (FTS5) ou uma
+  lista de ids
+- ajustar_estoque: CSV de inventário com "id;estoque" (definir) ou
+  "id;quantidade" (somar ao estoque atual)
+- Cada ajuste é UMA transação: ou tudo é gravado, ou nada
+- simular=True devolve o mesmo relatório (antes -> depois de cada produto)
+  e desfaz a transação no fim
+- O relatório traz linhas analisadas, alteradas e linhas/s
+
+Uso:
+    python main.py reajustar 3 --percentual 8 --busca cimento --simular
+    python main.py estoque 3 inventario.csv --diff diferencas.csv
+"""
+
+import csv
+import json
+import time
+from decimal import Decimal, InvalidOperation
+from typing import NamedTuple
+
+from database.conexao import obter_conexao, transacao
+from api import DadosInvalidos, NaoEncontrado, consulta_fts
+from cache import catalogo as _catalogo, versao_catalogo
+from dinheiro import Dinheiro
+
+# Linhas do CSV de estoque processadas por vez (mesma transação).
+TAMANHO_LOTE = 5_000
+# Quantas alterações/rejeições ficam no resultado (o arquivo 'diff' tem todas).
+AMOSTRA = 20
+
+_COLUNAS_ID = ("id", "produto_id", "produto")
+_COLUNAS_ESTOQUE = ("estoque", "quantidade", "qtd")
+
+# ============================== Consultas =====================================
+
+SQL_PRECOS_EMPRESA = """
+    SELECT id, nome, preco_centavos FROM produtos WHERE empresa_id = ?;
+"""
+
+# CROSS JOIN fixa a ordem: parte dos produtos que casam com o termo. Com
+# JOIN o planejador pode percorrer a empresa inteira e testar o MATCH
+# produto a produto.
+SQL_PRECOS_BUSCA = """
+    SELECT p.id, p.nome, p.preco_centavos
+    FROM produtos_fts f
+    CROSS JOIN produtos p ON p.id = f.rowid
+    WHERE f.produtos_fts MATCH ? AND p.empresa_id = ?;
+"""
+
+# ids em uma lista JSON: um parâmetro só, qualquer quantidade de ids.
+SQL_PRECOS_IDS = """
+    SELECT id, nome, preco_centavos FROM produtos
+    WHERE empresa_id = ? AND id IN (SELECT value FROM json_each(?));
+"""
+
+SQL_ESTOQUE_IDS = """
+    SELECT id, nome, estoque FROM produtos
+    WHERE empresa_id = ? AND id IN (SELECT value FROM json_each(?));
+"""
+
+CONSULTAS = {
+    "precos_empresa": SQL_PRECOS_EMPRESA,
+    "precos_busca": SQL_PRECOS_BUSCA,
+    "precos_ids": SQL_PRECOS_IDS,
+    "estoque_ids": SQL_ESTOQUE_IDS,
+}
+
+# ================================ Tipos =======================================
+
+class Alteracao(NamedTuple):
+    produto_id: int
+    nome: str
+    antes: object
+    depois: object
+
+class Rejeicao(NamedTuple):
+    linha: int
+    motivo: str
+    dados: list
+
+class ResultadoAjuste(NamedTuple):
+    analisadas: int     # produtos (preço) ou linhas do arquivo (estoque)
+    alteradas: int
+    rejeitadas: int
+    simulado: bool
+    segundos: float
+    alteracoes: list    # amostra (até AMOSTRA)
+    rejeicoes: list     # amostra (até AMOSTRA)
+
+    @property
+    def linhas_por_segundo(self):
+        return self.analisadas / self.segundos if self.segundos else 0.0
+
+class _Simulacao(Exception):
+    """Desfaz a transação de um ajuste simulado (ver _executar)."""
+
+# =============================== Execução =====================================
+
+class _Relatorio:
+    """Acumula contagens e amostras; grava todas as diferenças em 'diff'."""
+
+    def __init__(self, diff, campo):
+        self.analisadas = self.alteradas = self.rejeitadas = 0
+        self.alteracoes, self.rejeicoes = [], []
+        self._diff = csv.writer(diff) if diff is not None else None
+        if self._diff is not None:
+            self._diff.writerow(["produto_id", "nome", f"{campo}_antes", f"{campo}_depois"])
+
+    def alterou(self, alteracao):
+        self.alteradas += 1
+        if len(self.alteracoes) < AMOSTRA:
+            self.alteracoes.append(alteracao)
+        if self._diff is not None:
+            self._diff.writerow(alteracao)
+
+    def rejeitou(self, rejeicao):
+        self.rejeitadas += 1
+        if len(self.rejeicoes) < AMOSTRA:
+            self.rejeicoes.append(rejeicao)
+
+def _verificar_empresa(empresa_id):
+    with obter_conexao() as con:
+        if con.execute("SELECT 1 FROM empresas WHERE id = ?;", (empresa_id,)).fetchone() is None:
+            raise NaoEncontrado("Empresa não encontrada.")
+
+def _executar(empresa_id, simular, aplicar, relatorio):
+    """
+    Roda aplicar(con) numa transação; registra no cache o que mudou.
+    aplicar devolve os ids alterados.
+    """
+    t0 = time.perf_counter()
+    try:
+        with transacao() as con:
+            v0 = versao_catalogo(con)
+            ids = aplicar(con)
+            v1 = versao_catalogo(con)
+            if simular:
+                raise _Simulacao
+    except _Simulacao:
+        pass
+    else:
+        # Preço e estoque não mudam nome nem ordem: só as entradas com
+        # esses produtos saem do cache.
+        _catalogo.registrar_escrita(v0, v1, ids, [empresa_id])
+    segundos = time.perf_counter() - t0
+    return ResultadoAjuste(relatorio.analisadas, relatorio.alteradas, relatorio.rejeitadas,
+                           simular, segundos, relatorio.alteracoes, relatorio.rejeicoes)
+
+# ================================ Preços ======================================
+
+def _para_decimal(valor, campo):
+    try:
+        numero = Decimal(str(valor).replace(",", "."))
+    except InvalidOperation:
+        raise DadosInvalidos(f"{campo} inválido.")
+    if not numero.is_finite():
+        raise DadosInvalidos(f"{campo} inválido.")
+    return numero
+
+def _para_ids(ids):
+    try:
+        return [int(i) for i in ids]
+    except (TypeError, ValueError):
+        raise DadosInvalidos("Ids de produto devem ser números inteiros.")
+
+def reajustar_precos(empresa_id, percentual=None, valor=None, busca=None, ids=None,
+                     simular=False, diff=None):
+    """
+    Aplica a regra de preço aos produtos da empresa:
+    - percentual: +8 = 8% mais caro, -5 = 5% mais barato
+    - valor: soma (ou, negativo, subtrai) um valor fixo
+    Só um dos dois. Filtro opcional: 'busca' (termo, como na busca por nome)
+    ou 'ids' (lista de ids). Preços arredondados para centavos.
+    Se algum preço ficar negativo, nada é gravado (DadosInvalidos).
+    'diff': arquivo texto aberto para o CSV com todas as alterações.
+    """
+    if (percentual is None) == (valor is None):
+        raise DadosInvalidos("Informe o percentual OU o valor do reajuste.")
+    if busca is not None and ids is not None:
+        raise DadosInvalidos("Filtre por busca OU por ids, não pelos dois.")
+    if percentual is not None:
+        fator = 1 + _para_decimal(percentual, "Percentual") / 100
+        regra = lambda preco: preco * fator
+    else:
+        delta = Dinheiro.de_reais(_para_decimal(valor, "Valor"))
+        regra = lambda preco: preco + delta
+
+    if busca is not None:
+        consulta = consulta_fts(busca)
+        if not consulta:
+            raise DadosInvalidos("Termo de busca vazio.")
+        sql, params = SQL_PRECOS_BUSCA, (consulta, empresa_id)
+    elif ids is not None:
+        sql, params = SQL_PRECOS_IDS, (empresa_id, json.dumps(_para_ids(ids)))
+    else:
+        sql, params = SQL_PRECOS_EMPRESA, (empresa_id,)
+
+    _verificar_empresa(empresa_id)
+    relatorio = _Relatorio(diff, "preco")
+
+    def aplicar(con):
+        novos = []
+        for produto_id, nome, preco in con.execute(sql, params):
+            relatorio.analisadas += 1
+            # Dinheiro × Decimal arredonda ao centavo (meio para cima).
+            antes = Dinheiro(preco)
+            depois = regra(antes)
+            if depois < 0:
+                raise DadosInvalidos(f"O preço de '{nome}' (id {produto_id}) ficaria negativo "
+                                     f"({depois}); nenhum preço foi alterado.")
+            if depois != antes:
+                novos.append((depois, produto_id))
+                relatorio.alterou(Alteracao(produto_id, nome, antes, depois))
+        con.executemany("UPDATE produtos SET preco_centavos = ? WHERE id = ?;", novos)
+        return [produto_id for _, produto_id in novos]
+
+    return _executar(empresa_id, simular, aplicar, relatorio)
+
+# ================================ Estoque =====================================
+
+def _mapear_cabecalho(campos):
+    nomes = [c.strip().lower() for c in campos]
+    coluna_id = next((nomes.index(c) for c in _COLUNAS_ID if c in nomes), None)
+    coluna_qtd = next((nomes.index(c) for c in _COLUNAS_ESTOQUE if c in nomes), None)
+    if coluna_id is None or coluna_qtd is None:
+        raise DadosInvalidos("Cabeçalho precisa das colunas 'id' e 'estoque' (ou 'quantidade').")
+    return coluna_id, coluna_qtd
+
+def _ler_inventario(arquivo, separador, relatorio):
+    """Gera (linha, produto_id, quantidade, campos) das linhas válidas."""
+    primeira = arquivo.readline()
+    if not primeira.strip():
+        raise DadosInvalidos("Arquivo vazio (esperado um cabeçalho).")
+    separador = separador or (";" if primeira.count(";") > primeira.count(",") else ",")
+    coluna_id, coluna_qtd = _mapear_cabecalho(next(csv.reader([primeira], delimiter=separador)))
+
+    leitor = csv.reader(arquivo, delimiter=separador)
+    for campos in leitor:
+        numero = leitor.line_num + 1
+        if not any(c.strip() for c in campos):
+            continue
+        relatorio.analisadas += 1
+        try:
+            produto_id = int(campos[coluna_id])
+            quantidade = int(campos[coluna_qtd])
+        except (IndexError, ValueError):
+            relatorio.rejeitou(Rejeicao(numero, "id ou quantidade inválidos", campos))
+            continue
+        yield numero, produto_id, quantidade, campos
+
+def _lotes(linhas, tamanho):
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+def ajustar_estoque(empresa_id, arquivo, somar=False, separador=None, simular=False,
+                    diff=None, lote=TAMANHO_LOTE):
+    """
+    Ajusta o estoque a partir do CSV 'arquivo' (aberto em modo texto):
+    - somar=False: a coluna é o estoque contado (inventário)
+    - somar=True: a coluna é somada ao estoque atual (entrada/saída)
+    Linhas com id de outra empresa, inexistente ou que deixariam o
+    estoque negativo são rejeitadas; as demais são gravadas juntas.
+    Um id repetido é aplicado na ordem do arquivo.
+    """
+    _verificar_empresa(empresa_id)
+    relatorio = _Relatorio(diff, "estoque")
+
+    def aplicar(con):
+        alterados = set()
+        for bloco in _lotes(_ler_inventario(arquivo, separador, relatorio), lote):
+            ids = sorted({produto_id for _, produto_id, _, _ in bloco})
+            atuais = {pid: [nome, estoque] for pid, nome, estoque
+                      in con.execute(SQL_ESTOQUE_IDS, (empresa_id, json.dumps(ids)))}
+            novos = {}
+            for numero, produto_id, quantidade, campos in bloco:
+                atual = atuais.get(produto_id)
+                if atual is None:
+                    relatorio.rejeitou(Rejeicao(numero, "produto não encontrado nesta empresa", campos))
+                    continue
+                nome, antes = atual
+                depois = antes + quantidade if somar else quantidade
+                if depois < 0:
+                    relatorio.rejeitou(Rejeicao(numero, f"estoque ficaria negativo ({depois})", campos))
+                    continue
+                if depois != antes:
+                    atual[1] = novos[produto_id] = depois
+                    relatorio.alterou(Alteracao(produto_id, nome, antes, depois))
+            con.executemany("UPDATE produtos SET estoque = ? WHERE id = ?;",
+                            [(estoque, produto_id) for produto_id, estoque in novos.items()])
+            alterados.update(novos)
+        return alterados
+
+    return _executar(empresa_id, simular, aplicar, relatorio)
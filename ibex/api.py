@@ -0,0 +1,727 @@
+# ibex/api.py
+# -*- coding: utf-8 -*-
+
+"""
+Camada de serviço do Ibex (sem input/print)
+- Funções puras sobre o banco: recebem parâmetros, devolvem resultados
+  tipados (NamedTuple) e sinalizam problemas com exceções de ErroIbex
+- Os módulos de console (autenticacao, produtos, carrinho, pedidos,
+  relatorio) só fazem perguntas, chamam estas funções e imprimem
+- Outros clientes (scripts, benchmarks, servidor) usam o mesmo caminho
+
+Exemplo:
+    cid, _ = registrar_cliente("Ana", "ana@ex.com", "segredo")
+    adicionar_item(cid, produto_id=7, qtd=3)
+    pedido = fechar_pedido(cid, cep="01001-000", numero="10")
+"""
+
+import base64
+import json
+import re
+import sqlite3
+import time
+from datetime import date
+from typing import NamedTuple
+
+from database.conexao import obter_conexao, transacao
+import agregados
+import arquivo
+from cache import catalogo as _catalogo, versao_catalogo
+from carrinho_memoria import armazem as _carrinhos
+from codigos import normalizar_codigo, novo_codigo_pedido
+from dinheiro import Dinheiro
+import pedidos as _pedidos
+import reservas as _reservas
+import relatorio as _relatorio
+from relatorio import TOP_PADRAO, linhas_estoque, linhas_vendas, resumo_vendas  # noqa: F401 (reexport)
+
+# ================================== Erros =====================================
+
+class ErroIbex(Exception):
+    """Base dos erros de regra de negócio da camada de serviço."""
+
+class DadosInvalidos(ErroIbex):
+    """Parâmetro fora do formato ou da faixa aceita."""
+
+class NaoEncontrado(ErroIbex):
+    """Registro inexistente (ou que não pertence a quem pediu)."""
+
+class JaExiste(ErroIbex):
+    """Violação de unicidade (email, CNPJ...)."""
+
+class CredenciaisInvalidas(ErroIbex):
+    """Email/senha não conferem."""
+
+class SessaoInvalida(CredenciaisInvalidas):
+    """Token de sessão ausente, desconhecido ou expirado (ver sessoes.py)."""
+
+class AcessoNegado(ErroIbex):
+    """Sessão válida, mas de outro usuário ou de outro tipo de conta."""
+
+class CarrinhoVazio(ErroIbex):
+    """Checkout sem itens no carrinho."""
+
+class EstoqueInsuficiente(ErroIbex):
+    """
+    Um ou mais itens sem estoque. 'itens' traz um ItemEmFalta
+    (produto_id, nome, disponivel, solicitado) para cada um.
+    """
+
+    def __init__(self, itens):
+        self.itens = list(itens)
+        nomes = ", ".join(f"'{nome}' (disponível: {disp}, solicitado: {sol})"
+                          for _, nome, disp, sol in self.itens)
+        super().__init__(f"Estoque insuficiente para {nomes}.")
+
+# ================================== Tipos =====================================
+
+class Produto(NamedTuple):
+    id: int
+    empresa_id: int
+    nome: str
+    preco: Dinheiro
+    estoque: int
+
+class PaginaProdutos(NamedTuple):
+    itens: list
+    proximo: str     # cursor para pagina_produtos(apos=...); None = última página
+    anterior: str    # cursor para pagina_produtos(antes=...); None = primeira página
+
+class PaginaBusca(NamedTuple):
+    itens: list
+    pagina: int
+    tem_mais: bool
+
+class ItemCarrinho(NamedTuple):
+    produto_id: int
+    nome: str
+    preco: Dinheiro
+    qtd: int
+    subtotal: Dinheiro
+    estoque: int
+
+class Carrinho(NamedTuple):
+    itens: list
+    total: Dinheiro
+
+class ItemEmFalta(NamedTuple):
+    produto_id: int
+    nome: str
+    disponivel: int
+    solicitado: int
+
+class PedidoConfirmado(NamedTuple):
+    pedido_id: int
+    codigo: str
+    itens: int
+    total: Dinheiro
+    cep: str
+    numero: str
+
+class ResumoPedido(NamedTuple):
+    codigo: str
+    criado_em: str
+    itens: int
+    total: Dinheiro
+    cep: str
+    numero: str
+
+class ItemPedido(NamedTuple):
+    produto_id: int
+    nome: str
+    qtd: int
+    preco_unit: Dinheiro
+    total_item: Dinheiro
+
+# ================================ Validação ===================================
+
+def _so_texto(valor, campo):
+    # Vem de JSON: 5, [] ou {} no lugar de um texto é erro de dados.
+    if valor is not None and not isinstance(valor, str):
+        raise DadosInvalidos(f"{campo} deve ser um texto.")
+    return valor
+
+def _texto(valor, campo):
+    valor = (_so_texto(valor, campo) or "").strip()
+    if not valor:
+        raise DadosInvalidos(f"{campo} não pode ser vazio.")
+    return valor
+
+def _inteiro(valor, campo, minimo=None):
+    if isinstance(valor, bool) or not isinstance(valor, int):
+        raise DadosInvalidos(f"{campo} deve ser um número inteiro.")
+    if minimo is not None and valor < minimo:
+        raise DadosInvalidos(f"{campo}: valor mínimo {minimo}.")
+    return valor
+
+def _data(valor, campo):
+    """Texto "AAAA-MM-DD" -> o mesmo texto, normalizado."""
+    try:
+        return date.fromisoformat((valor or "").strip()).isoformat()
+    except ValueError:
+        raise DadosInvalidos(f"{campo} deve ser uma data AAAA-MM-DD.")
+
+def _dinheiro(valor, campo, minimo=None):
+    """Reais (19.90, "19,90", Decimal...) -> Dinheiro; 'minimo' em reais."""
+    try:
+        valor = Dinheiro.de_reais(valor)
+    except ValueError:
+        raise DadosInvalidos(f"{campo} deve ser um número (ex.: 19.90).")
+    if minimo is not None and valor < Dinheiro.de_reais(minimo):
+        raise DadosInvalidos(f"{campo}: valor mínimo {minimo}.")
+    return valor
+
+def normalizar_email(email: str) -> str:
+    return _texto(email, "Email").lower()
+
+def apenas_digitos(txt: str) -> str:
+    return re.sub(r"\D", "", txt or "")
+
+# ============================== Autenticação ==================================
+
+def email_em_uso(tabela: str, email: str) -> bool:
+    """True se 'email' já está cadastrado em 'clientes' ou 'empresas'."""
+    if tabela not in ("clientes", "empresas"):
+        raise DadosInvalidos(f"Tabela inválida: {tabela}")
+    with obter_conexao() as con:
+        return con.execute(f"SELECT 1 FROM {tabela} WHERE email = ? LIMIT 1;",
+                           (normalizar_email(email),)).fetchone() is not None
+
+def cnpj_em_uso(cnpj: str) -> bool:
+    with obter_conexao() as con:
+        return con.execute("SELECT 1 FROM empresas WHERE cnpj = ? LIMIT 1;",
+                           (apenas_digitos(cnpj),)).fetchone() is not None
+
+def registrar_cliente(nome, email, senha):
+    """Cria um cliente. Retorna (id, nome)."""
+    nome = _texto(nome, "Nome")
+    email = normalizar_email(email)
+    senha = _texto(senha, "Senha")
+    with obter_conexao() as con:
+        try:
+            cur = con.execute("""
+                INSERT INTO clientes (nome, email, senha)
+                VALUES (?, ?, ?);
+            """, (nome, email, senha))
+            con.commit()
+        except sqlite3.IntegrityError:
+            con.rollback()
+            raise JaExiste("Já existe um cliente com este email.")
+    return (cur.lastrowid, nome)
+
+def autenticar_cliente(email, senha):
+    """Confere as credenciais do cliente. Retorna (id, nome)."""
+    with obter_conexao() as con:
+        row = con.execute("""
+            SELECT id, nome FROM clientes
+            WHERE email = ? AND senha = ?
+            LIMIT 1;
+        """, (normalizar_email(email), _so_texto(senha, "Senha"))).fetchone()
+    if not row:
+        raise CredenciaisInvalidas("Credenciais inválidas.")
+    return (row[0], row[1])
+
+def registrar_empresa(razao_social, cnpj, email, senha):
+    """Cria uma empresa. Retorna (id, razao_social)."""
+    razao_social = _texto(razao_social, "Razão social")
+    cnpj = apenas_digitos(cnpj)
+    if len(cnpj) != 14:
+        raise DadosInvalidos("CNPJ inválido (esperado 14 dígitos).")
+    email = normalizar_email(email)
+    senha = _texto(senha, "Senha")
+    with obter_conexao() as con:
+        try:
+            cur = con.execute("""
+                INSERT INTO empresas (razao_social, cnpj, email, senha)
+                VALUES (?, ?, ?, ?);
+            """, (razao_social, cnpj, email, senha))
+            con.commit()
+        except sqlite3.IntegrityError:
+            con.rollback()
+            raise JaExiste("Já existe uma empresa com este CNPJ ou email.")
+    return (cur.lastrowid, razao_social)
+
+def autenticar_empresa(email, senha):
+    """Confere as credenciais da empresa. Retorna (id, razao_social)."""
+    with obter_conexao() as con:
+        row = con.execute("""
+            SELECT id, razao_social FROM empresas
+            WHERE email = ? AND senha = ?
+            LIMIT 1;
+        """, (normalizar_email(email), _so_texto(senha, "Senha"))).fetchone()
+    if not row:
+        raise CredenciaisInvalidas("Credenciais inválidas.")
+    return (row[0], row[1])
+
+# ================================ Produtos ====================================
+
+def _produto(row):
+    """(id, empresa_id, nome, preco_centavos, estoque) -> Produto."""
+    pid, empresa_id, nome, preco, estoque = row
+    return Produto(pid, empresa_id, nome, Dinheiro(preco), estoque)
+
+def listar_produtos(empresa_id=None):
+    """Produtos em ordem de nome; só os da empresa se 'empresa_id' vier."""
+    with obter_conexao() as con:
+        if empresa_id is None:
+            rows = con.execute("""
+                SELECT id, empresa_id, nome, preco_centavos, estoque
+                FROM produtos ORDER BY nome;
+            """).fetchall()
+        else:
+            rows = con.execute("""
+                SELECT id, empresa_id, nome, preco_centavos, estoque
+                FROM produtos
+                WHERE empresa_id = ?
+                ORDER BY nome;
+            """, (empresa_id,)).fetchall()
+    return [_produto(r) for r in rows]
+
+# Paginação por chave (keyset) em (nome, id): cada página parte da última
+# chave vista, então o custo não cresce com o número da página e não há
+# OFFSET. Índices: idx_produtos_nome e idx_produtos_empresa_nome (o id é o
+# rowid, que já vai no fim de toda entrada de índice).
+TAMANHO_PAGINA = 20
+
+SQL_PAGINA_PRODUTOS_APOS = """
+    SELECT id, empresa_id, nome, preco_centavos, estoque
+    FROM produtos
+    WHERE (nome, id) > (?, ?)
+    ORDER BY nome, id
+    LIMIT ?;
+"""
+
+SQL_PAGINA_PRODUTOS_ANTES = """
+    SELECT id, empresa_id, nome, preco_centavos, estoque
+    FROM produtos
+    WHERE (nome, id) < (?, ?)
+    ORDER BY nome DESC, id DESC
+    LIMIT ?;
+"""
+
+SQL_PAGINA_PRODUTOS_EMPRESA_APOS = """
+    SELECT id, empresa_id, nome, preco_centavos, estoque
+    FROM produtos
+    WHERE empresa_id = ? AND (nome, id) > (?, ?)
+    ORDER BY nome, id
+    LIMIT ?;
+"""
+
+SQL_PAGINA_PRODUTOS_EMPRESA_ANTES = """
+    SELECT id, empresa_id, nome, preco_centavos, estoque
+    FROM produtos
+    WHERE empresa_id = ? AND (nome, id) < (?, ?)
+    ORDER BY nome DESC, id DESC
+    LIMIT ?;
+"""
+
+# Busca por nome no índice FTS5 (migração 6), da melhor para a pior
+# correspondência (bm25). Resultados de busca são curtos: página por OFFSET.
+SQL_BUSCA_PRODUTOS = """
+    SELECT p.id, p.empresa_id, p.nome, p.preco_centavos, p.estoque
+    FROM produtos_fts f
+    JOIN produtos p ON p.id = f.rowid
+    WHERE f.produtos_fts MATCH ?
+    ORDER BY rank
+    LIMIT ? OFFSET ?;
+"""
+
+SQL_BUSCA_PRODUTOS_EMPRESA = """
+    SELECT p.id, p.empresa_id, p.nome, p.preco_centavos, p.estoque
+    FROM produtos_fts f
+    JOIN produtos p ON p.id = f.rowid
+    WHERE f.produtos_fts MATCH ? AND p.empresa_id = ?
+    ORDER BY rank
+    LIMIT ? OFFSET ?;
+"""
+
+# Conferidas por benchmarks/verificar_planos.py.
+CONSULTAS = {
+    "pagina_produtos_apos": SQL_PAGINA_PRODUTOS_APOS,
+    "pagina_produtos_antes": SQL_PAGINA_PRODUTOS_ANTES,
+    "pagina_produtos_empresa_apos": SQL_PAGINA_PRODUTOS_EMPRESA_APOS,
+    "pagina_produtos_empresa_antes": SQL_PAGINA_PRODUTOS_EMPRESA_ANTES,
+    "busca_produtos": SQL_BUSCA_PRODUTOS,
+    "busca_produtos_empresa": SQL_BUSCA_PRODUTOS_EMPRESA,
+}
+
+def _ids_da_pagina(pagina):
+    return (p.id for p in pagina.itens)
+
+def _codificar_cursor(prod):
+    bruto = json.dumps([prod.nome, prod.id], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(bruto).decode("ascii").rstrip("=")
+
+def _decodificar_cursor(cursor):
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        nome, pid = json.loads(bruto)
+        if not isinstance(nome, str) or not isinstance(pid, int):
+            raise ValueError
+    except (ValueError, TypeError):
+        raise DadosInvalidos("Cursor de página inválido.")
+    return nome, pid
+
+def pagina_produtos(empresa_id=None, apos=None, antes=None, tamanho=TAMANHO_PAGINA):
+    """
+    Uma página de produtos em ordem de (nome, id).
+    - sem cursor: primeira página
+    - apos=pagina.proximo: página seguinte; antes=pagina.anterior: anterior
+    Os cursores são strings opacas (podem ir numa URL).
+    """
+    if apos is not None and antes is not None:
+        raise DadosInvalidos("Informe 'apos' ou 'antes', não os dois.")
+    tamanho = _inteiro(tamanho, "Tamanho da página", minimo=1)
+    voltando = antes is not None
+    # '' é o menor texto possível: (nome, id) > ('', 0) = desde o início.
+    nome, pid = _decodificar_cursor(antes if voltando else apos) if (apos or antes) else ("", 0)
+
+    if empresa_id is None:
+        sql = SQL_PAGINA_PRODUTOS_ANTES if voltando else SQL_PAGINA_PRODUTOS_APOS
+        params = (nome, pid, tamanho + 1)
+    else:
+        sql = SQL_PAGINA_PRODUTOS_EMPRESA_ANTES if voltando else SQL_PAGINA_PRODUTOS_EMPRESA_APOS
+        params = (empresa_id, nome, pid, tamanho + 1)
+
+    def carregar():
+        with obter_conexao() as con:
+            rows = con.execute(sql, params).fetchall()
+        # Uma linha a mais que o tamanho indica que há página além desta.
+        tem_mais = len(rows) > tamanho
+        itens = [_produto(r) for r in rows[:tamanho]]
+        if voltando:
+            itens.reverse()
+            tem_anterior, tem_proxima = tem_mais, True
+        else:
+            tem_anterior, tem_proxima = apos is not None, tem_mais
+        return PaginaProdutos(
+            itens,
+            _codificar_cursor(itens[-1]) if itens and tem_proxima else None,
+            _codificar_cursor(itens[0]) if itens and tem_anterior else None,
+        )
+
+    return _catalogo.obter(("pagina", empresa_id, apos, antes, tamanho), carregar,
+                           lista=True, empresa_id=empresa_id, ids=_ids_da_pagina)
+
+def consulta_fts(termo):
+    """
+    Texto digitado -> consulta FTS5: cada palavra vira um prefixo entre aspas
+    ("cim arg" -> "cim"* "arg"*), todas obrigatórias. As aspas impedem que
+    AND/OR/NOT/* digitados sejam lidos como operadores.
+    """
+    palavras = re.findall(r"\w+", termo or "")
+    if not palavras:
+        raise DadosInvalidos("Digite ao menos uma palavra para buscar.")
+    return " ".join(f'"{p}"*' for p in palavras)
+
+def buscar_produtos(termo, empresa_id=None, pagina=1, tamanho=TAMANHO_PAGINA):
+    """
+    Produtos cujo nome tem palavras começando com as do termo, sem
+    diferenciar maiúsculas nem acentos, mais relevantes primeiro.
+    'pagina' começa em 1. Retorna PaginaBusca.
+    """
+    consulta = consulta_fts(termo)
+    pagina = _inteiro(pagina, "Página", minimo=1)
+    tamanho = _inteiro(tamanho, "Tamanho da página", minimo=1)
+    inicio = (pagina - 1) * tamanho
+
+    def carregar():
+        with obter_conexao() as con:
+            if empresa_id is None:
+                rows = con.execute(SQL_BUSCA_PRODUTOS, (consulta, tamanho + 1, inicio)).fetchall()
+            else:
+                rows = con.execute(SQL_BUSCA_PRODUTOS_EMPRESA,
+                                   (consulta, empresa_id, tamanho + 1, inicio)).fetchall()
+        return PaginaBusca([_produto(r) for r in rows[:tamanho]], pagina, len(rows) > tamanho)
+
+    return _catalogo.obter(("busca", consulta, empresa_id, pagina, tamanho), carregar,
+                           lista=True, empresa_id=empresa_id, ids=_ids_da_pagina)
+
+def _carregar_produto(produto_id):
+    with obter_conexao() as con:
+        row = con.execute("""
+            SELECT id, empresa_id, nome, preco_centavos, estoque
+            FROM produtos WHERE id = ?;
+        """, (produto_id,)).fetchone()
+    if not row:
+        raise NaoEncontrado("Produto não encontrado ou não pertence a esta empresa.")
+    return _produto(row)
+
+def obter_produto(produto_id, empresa_id=None):
+    """Um produto pelo id (e da empresa, se 'empresa_id' vier). Usa o cache."""
+    prod = _catalogo.obter(("produto", produto_id), lambda: _carregar_produto(produto_id),
+                           ids=lambda p: (p.id,))
+    if empresa_id is not None and prod.empresa_id != empresa_id:
+        raise NaoEncontrado("Produto não encontrado ou não pertence a esta empresa.")
+    return prod
+
+def criar_produto(empresa_id, nome, preco, estoque):
+    nome = _texto(nome, "Nome")
+    preco = _dinheiro(preco, "Preço", minimo=0)
+    estoque = _inteiro(estoque, "Estoque", minimo=0)
+    with transacao() as con:
+        v0 = versao_catalogo(con)
+        cur = con.execute("""
+            INSERT INTO produtos (empresa_id, nome, preco_centavos, estoque)
+            VALUES (?, ?, ?, ?);
+        """, (empresa_id, nome, preco, estoque))
+        v1 = versao_catalogo(con)
+    _catalogo.registrar_escrita(v0, v1, [cur.lastrowid], [empresa_id], estrutura=True)
+    return Produto(cur.lastrowid, empresa_id, nome, preco, estoque)
+
+def atualizar_produto(empresa_id, produto_id, nome=None, preco=None, estoque=None):
+    """Altera os campos informados (None = mantém). Retorna o produto atualizado."""
+    atual = obter_produto(produto_id, empresa_id)
+    novo = atual._replace(
+        nome=atual.nome if nome is None else _texto(nome, "Nome"),
+        preco=atual.preco if preco is None else _dinheiro(preco, "Preço", minimo=0),
+        estoque=atual.estoque if estoque is None else _inteiro(estoque, "Estoque", minimo=0),
+    )
+    with transacao() as con:
+        v0 = versao_catalogo(con)
+        con.execute("""
+            UPDATE produtos
+            SET nome = ?, preco_centavos = ?, estoque = ?
+            WHERE id = ? AND empresa_id = ?;
+        """, (novo.nome, novo.preco, novo.estoque, produto_id, empresa_id))
+        v1 = versao_catalogo(con)
+    _catalogo.registrar_escrita(v0, v1, [produto_id], [empresa_id], estrutura=novo.nome != atual.nome)
+    return novo
+
+def excluir_produto(empresa_id, produto_id):
+    """
+    Remove o produto da empresa e ajusta os totais de vendas. A recontagem
+    da empresa inclui os itens arquivados, por isso a conexão de arquivo.py.
+    """
+    with arquivo.transacao() as con:
+        cur = con.cursor()
+        v0 = versao_catalogo(con)
+        cur.execute("DELETE FROM produtos WHERE id = ? AND empresa_id = ?;", (produto_id, empresa_id))
+        if cur.rowcount == 0:
+            raise NaoEncontrado("Produto não encontrado ou não pertence a esta empresa.")
+        agregados.ao_remover_produto(cur, empresa_id, produto_id)
+        v1 = versao_catalogo(con)
+    _catalogo.registrar_escrita(v0, v1, [produto_id], [empresa_id], estrutura=True)
+
+# ================================ Carrinho ====================================
+
+def _reservar(cliente_id, prod, qtd):
+    """Reserva 'qtd' (total do item no carrinho) ou levanta EstoqueInsuficiente."""
+    with transacao() as con:
+        if _reservas.reservar(con, cliente_id, prod.id, qtd):
+            return
+        disponivel = _reservas.disponivel(con, cliente_id, prod.id)
+    raise EstoqueInsuficiente([ItemEmFalta(prod.id, prod.nome, disponivel, qtd)])
+
+def adicionar_item(cliente_id, produto_id, qtd):
+    """
+    Soma 'qtd' do produto ao carrinho do cliente.
+    Retorna (produto, quantidade_total_no_carrinho).
+    O carrinho fica em memória; carrinho_memoria.py grava em carrinho_temp.
+    A quantidade total do item fica reservada (reservas.py); sem estoque
+    livre para ela, EstoqueInsuficiente aqui, antes do checkout.
+    """
+    produto_id = _inteiro(produto_id, "Produto")
+    qtd = _inteiro(qtd, "Quantidade", minimo=1)
+    prod = obter_produto(produto_id)
+    if prod.estoque <= 0 or qtd > prod.estoque:
+        raise EstoqueInsuficiente([ItemEmFalta(prod.id, prod.nome, prod.estoque, qtd)])
+    carrinho = _carrinhos.obter(cliente_id)
+    with carrinho.lock:
+        total = carrinho.quantidade(prod.id) + qtd
+        if _reservas.ativo():
+            _reservar(cliente_id, prod, total)
+        carrinho.definir(prod.id, total, prod.preco)
+    _carrinhos.alterado(carrinho)
+    return (prod, total)
+
+def consultar_carrinho(cliente_id):
+    """
+    Itens do carrinho (rascunho) do cliente, em ordem de nome, e o total.
+    Quantidades e total vêm do carrinho em memória; nome/preço/estoque vêm
+    do cache do catálogo. Produtos removidos do catálogo somem do carrinho,
+    como no JOIN; preço alterado corrige o total.
+    """
+    carrinho = _carrinhos.obter(cliente_id)
+    itens = []
+    with carrinho.lock:
+        for produto_id, (qtd, preco) in list(carrinho.itens.items()):
+            try:
+                prod = obter_produto(produto_id)
+            except NaoEncontrado:
+                carrinho.descartar(produto_id)
+                continue
+            if prod.preco != preco:
+                carrinho.atualizar_preco(produto_id, prod.preco)
+            itens.append(ItemCarrinho(prod.id, prod.nome, prod.preco, qtd, prod.preco * qtd, prod.estoque))
+        total = Dinheiro(carrinho.total_valor)
+    itens.sort(key=lambda i: i.nome)
+    return Carrinho(itens, total)
+
+def remover_item(cliente_id, produto_id, qtd=None):
+    """
+    Tira 'qtd' unidades do item (None ou >= quantidade atual = remove a linha).
+    Retorna a quantidade que sobrou no carrinho (0 se o item saiu).
+    """
+    carrinho = _carrinhos.obter(cliente_id)
+    with carrinho.lock:
+        atual = carrinho.quantidade(produto_id)
+        if not atual:
+            raise NaoEncontrado("Produto não está no carrinho.")
+        retirar = atual if qtd is None else _inteiro(qtd, "Quantidade", minimo=1)
+        restante = max(atual - retirar, 0)
+        if _reservas.ativo():
+            with transacao() as con:
+                _reservas.ajustar(con, cliente_id, produto_id, restante)
+        carrinho.definir(produto_id, restante, carrinho.itens[produto_id][1])
+    _carrinhos.alterado(carrinho)
+    return restante
+
+def _inserir_cabecalho(cur, cliente_id, total_itens, total_valor, cep, numero, tentativas=3):
+    """
+    Grava a linha em 'pedidos' com um código novo (codigos.py).
+    Se o código já existir (UNIQUE), só o INSERT falha: tenta outro código.
+    Retorna (pedido_id, codigo).
+    """
+    for tentativa in range(tentativas):
+        codigo = novo_codigo_pedido()
+        try:
+            cur.execute("""
+                INSERT INTO pedidos (codigo, cliente_id, total_itens, total_valor_centavos, cep, numero)
+                VALUES (?, ?, ?, ?, ?, ?);
+            """, (codigo, cliente_id, total_itens, total_valor, cep, numero))
+            return cur.lastrowid, codigo
+        except sqlite3.IntegrityError:
+            if tentativa == tentativas - 1:
+                raise
+
+def fechar_pedido(cliente_id, cep, numero):
+    """
+    Checkout: grava cabeçalho, itens e resumos por empresa, baixa o estoque,
+    atualiza os totais de vendas e limpa o carrinho, tudo numa transação.
+
+    Pendências do carrinho em memória são gravadas em carrinho_temp nessa
+    mesma transação, antes de lê-lo.
+    A transação começa com BEGIN IMMEDIATE, antes de ler o carrinho: outro
+    checkout espera o lock aqui em vez de falhar com SQLITE_BUSY no meio.
+    Cada baixa de estoque é condicional (estoque menos as reservas válidas
+    de outros clientes >= qtd); se algum item não couber, nada é gravado e
+    EstoqueInsuficiente traz todos os que faltaram. As reservas do cliente
+    saem junto com o carrinho: viraram venda.
+    Retorna PedidoConfirmado.
+    """
+    cep = _texto(cep, "CEP")
+    numero = _texto(numero, "Número")
+
+    # O carrinho em memória fica travado até o fim; sai vazio se o pedido gravar.
+    with _carrinhos.pedido(cliente_id) as gravar_carrinho:
+        with transacao() as con:
+            cur = con.cursor()
+            v0 = versao_catalogo(con)
+            # O que o carrinho em memória ainda não gravou entra aqui.
+            gravar_carrinho(con)
+            rows = cur.execute("""
+                SELECT ct.produto_id, p.nome, p.preco_centavos, ct.qtd, p.empresa_id
+                FROM carrinho_temp ct
+                JOIN produtos p ON p.id = ct.produto_id
+                WHERE ct.cliente_id = ?
+                ORDER BY p.nome;
+            """, (cliente_id,)).fetchall()
+            itens = [(pid, nome, Dinheiro(preco), qtd, emp) for pid, nome, preco, qtd, emp in rows]
+            if not itens:
+                raise CarrinhoVazio("Seu carrinho está vazio.")
+
+            # Baixa condicional: o UPDATE só acontece se ainda houver estoque
+            # livre (descontadas as reservas válidas dos outros clientes).
+            agora = time.time()
+            faltando = []
+            for pid, nome, _, qtd, _ in itens:
+                if not _reservas.baixar_estoque(cur, cliente_id, pid, qtd, agora):
+                    disponivel = _reservas.disponivel(cur, cliente_id, pid, agora)
+                    faltando.append(ItemEmFalta(pid, nome, disponivel, qtd))
+            if faltando:
+                # Sai pela exceção: transacao() desfaz as baixas já feitas.
+                raise EstoqueInsuficiente(faltando)
+
+            # Cabeçalho do pedido (totais calculados uma única vez, aqui, em centavos)
+            total_itens = sum(qtd for _, _, _, qtd, _ in itens)
+            total_valor = sum((preco * qtd for _, _, preco, qtd, _ in itens), Dinheiro(0))
+            pedido_id, pedido_codigo = _inserir_cabecalho(cur, cliente_id, total_itens, total_valor, cep, numero)
+
+            # Inserir cada item no 'carrinho' final
+            por_empresa = {}
+            for pid, _, preco, qtd, empresa_id in itens:
+                cur.execute("""
+                    INSERT INTO carrinho
+                    (cliente_id, produto_id, qtd, preco_unit_centavos, total_item_centavos, cep, numero,
+                     pedido_codigo, pedido_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+                """, (cliente_id, pid, qtd, preco, preco * qtd, cep, numero, pedido_codigo, pedido_id))
+
+                if empresa_id is not None:
+                    itens_emp, valor_emp = por_empresa.get(empresa_id, (0, 0))
+                    por_empresa[empresa_id] = (itens_emp + qtd, valor_emp + preco * qtd)
+
+            # Resumo do pedido por empresa (tela "Pedidos da Minha Empresa")
+            cur.executemany("""
+                INSERT INTO pedidos_empresas (empresa_id, pedido_id, total_itens, total_valor_centavos)
+                VALUES (?, ?, ?, ?);
+            """, [(emp, pedido_id, q, v) for emp, (q, v) in por_empresa.items()])
+
+            # Totais do relatório de vendas, na mesma transação
+            agregados.registrar_venda(
+                cur,
+                [(pid, empresa_id, qtd, preco * qtd)
+                 for pid, _, preco, qtd, empresa_id in itens],
+                por_empresa,
+                pedido_id,
+            )
+
+            # Limpar carrinho_temp e as reservas do cliente
+            cur.execute("DELETE FROM carrinho_temp WHERE cliente_id = ?;", (cliente_id,))
+            _reservas.liberar_cliente(cur, cliente_id)
+            v1 = versao_catalogo(con)
+
+    # Estoque mudou: só as linhas e páginas desses produtos saem do cache.
+    _catalogo.registrar_escrita(v0, v1, [pid for pid, *_ in itens])
+    return PedidoConfirmado(pedido_id, pedido_codigo, len(itens), total_valor, cep, numero)
+
+# ================================= Pedidos ====================================
+
+def pedidos_do_cliente(cliente_id):
+    """Resumo dos pedidos do cliente, do mais recente para o mais antigo."""
+    return [ResumoPedido(*r) for r in _pedidos._listar_resumo_pedidos_cliente(cliente_id)]
+
+def itens_do_pedido_cliente(cliente_id, codigo):
+    itens = [ItemPedido(*r) for r in _pedidos._listar_detalhes_pedido_cliente(cliente_id, normalizar_codigo(codigo))]
+    if not itens:
+        raise NaoEncontrado("Pedido não encontrado (ou não pertence a este cliente).")
+    return itens
+
+def pedidos_da_empresa(empresa_id):
+    """Pedidos com itens da empresa (itens/valor só da empresa)."""
+    return [ResumoPedido(*r) for r in _pedidos._listar_resumo_pedidos_empresa(empresa_id)]
+
+def itens_do_pedido_empresa(empresa_id, codigo):
+    itens = [ItemPedido(*r) for r in _pedidos._listar_detalhes_pedido_empresa(empresa_id, normalizar_codigo(codigo))]
+    if not itens:
+        raise NaoEncontrado("Pedido não encontrado ou sem itens desta empresa.")
+    return itens
+
+# ================================ Relatórios ==================================
+
+def vendas_por_periodo(empresa_id, inicio, fim, granularidade="dia", limite=TOP_PADRAO):
+    """
+    Vendas da empresa entre 'inicio' e 'fim' (datas AAAA-MM-DD, inclusive,
+    em UTC). Retorna ([LinhaPeriodo por dia/semana/mês], [LinhaVenda dos
+    'limite' produtos de maior receita]).
+    """
+    inicio = _data(inicio, "Data inicial")
+    fim = _data(fim, "Data final")
+    if inicio > fim:
+        raise DadosInvalidos("Data inicial depois da data final.")
+    if granularidade not in _relatorio.GRANULARIDADES:
+        raise DadosInvalidos(f"Agrupamento inválido: use {', '.join(_relatorio.GRANULARIDADES)}.")
+    limite = _inteiro(limite, "Limite", minimo=1)
+    return (list(_relatorio.linhas_periodo(empresa_id, inicio, fim, granularidade)),
+            _relatorio.top_produtos(empresa_id, inicio, fim, limite))
@@ -0,0 +1,270 @@
+# ibex/arquivo.py
+# -*- coding: utf-8 -*-
+
+"""
+Arquivo morto dos itens de pedidos antigos
+- arquivar(antes): move as linhas de 'carrinho' dos pedidos criados antes
+  da data de corte para outro arquivo SQLite (IBEX_ARQUIVO; padrão:
+  <banco>-arquivo.db ao lado do banco), um lote de pedidos por transação
+- Só as linhas saem: cabeçalhos (pedidos), resumos por empresa
+  (pedidos_empresas) e totais de vendas ficam no banco, então listas de
+  pedidos e relatórios não mudam nem abrem o arquivo
+- comprimir=True grava as linhas de cada pedido num só BLOB (JSON + zlib)
+  em vez de uma linha por item: bem menor, mais caro de ler
+- Quem precisa de pedido antigo (detalhes de um pedido, agregados
+  verificar/reconstruir, exclusão de produto) usa conexao()/transacao():
+  conexão à parte com o arquivo anexado (ATTACH) e a view temporária
+  'carrinho_todos' (carrinho do banco UNION ALL o do arquivo). O pool
+  nunca anexa o arquivo
+- Cada lote grava no arquivo e apaga do banco numa transação, mas com o
+  banco em WAL o commit não é atômico entre os dois arquivos: uma queda no
+  meio pode deixar o lote nos dois. Rodar arquivar() de novo resolve
+  (o que já está no arquivo é ignorado e sai do banco)
+
+Uso:
+    python main.py arquivar 2024-01-01 --comprimir
+"""
+
+import json
+import os
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import date
+from typing import NamedTuple
+
+from database.conexao import conectar, pool
+
+# Pedidos movidos por transação.
+TAMANHO_LOTE = 1_000
+
+# Colunas de 'carrinho' (e do arquivo), na ordem do JSON comprimido.
+COLUNAS = ("id", "cliente_id", "produto_id", "qtd", "preco_unit_centavos", "total_item_centavos",
+           "cep", "numero", "pedido_codigo", "pedido_id", "criado_em")
+_LISTA = ", ".join(COLUNAS)
+
+# ============================== Consultas =====================================
+# Leem a view 'carrinho_todos': só existem nas conexões de conexao().
+
+SQL_PEDIDO_CLIENTE = """
+    SELECT id FROM pedidos WHERE cliente_id = ? AND codigo = ?;
+"""
+
+SQL_PEDIDO = """
+    SELECT id FROM pedidos WHERE codigo = ?;
+"""
+
+# O filtro por pedido_id desce para cada parte da view (chave do arquivo).
+SQL_ITENS_PEDIDO = """
+    SELECT c.produto_id, p.nome, c.qtd, c.preco_unit_centavos, c.total_item_centavos
+    FROM carrinho_todos c
+    JOIN produtos p ON p.id = c.produto_id
+    WHERE c.pedido_id = ?
+    ORDER BY p.nome;
+"""
+
+SQL_ITENS_PEDIDO_EMPRESA = """
+    SELECT c.produto_id, p.nome, c.qtd, c.preco_unit_centavos, c.total_item_centavos
+    FROM carrinho_todos c
+    JOIN produtos p ON p.id = c.produto_id
+    WHERE c.pedido_id = ? AND p.empresa_id = ?
+    ORDER BY p.nome;
+"""
+
+# Lote seguinte de pedidos antigos ainda com itens no banco, em ordem de
+# (criado_em, id): SEARCH em idx_pedidos_criado (migração 12), sem reler os
+# lotes já movidos.
+SQL_LOTE_PEDIDOS = """
+    SELECT id, criado_em FROM pedidos
+    WHERE criado_em < ? AND (criado_em, id) > (?, ?)
+      AND EXISTS (SELECT 1 FROM main.carrinho c WHERE c.pedido_id = pedidos.id)
+    ORDER BY criado_em, id
+    LIMIT ?;
+"""
+
+CONSULTAS = {
+    "pedido_cliente": SQL_PEDIDO_CLIENTE,
+    "pedido": SQL_PEDIDO,
+    "lote_pedidos": SQL_LOTE_PEDIDOS,
+}
+
+class ResultadoArquivamento(NamedTuple):
+    pedidos: int
+    linhas: int
+    comprimido: bool
+    segundos: float
+    arquivo: str
+    bytes_arquivo: int
+
+# ================================ Conexão =====================================
+
+def caminho():
+    """Arquivo morto do banco configurado no pool."""
+    if os.environ.get("IBEX_ARQUIVO"):
+        return os.path.abspath(os.environ["IBEX_ARQUIVO"])
+    base, _ = os.path.splitext(pool().caminho)
+    return base + "-arquivo.db"
+
+def existe():
+    return os.path.exists(caminho())
+
+def _descomprimir(blob):
+    return zlib.decompress(blob).decode("utf-8")
+
+def _preparar_arquivo(con):
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS arq.carrinho (
+            id INTEGER PRIMARY KEY,
+            cliente_id INTEGER NOT NULL,
+            produto_id INTEGER NOT NULL,
+            qtd INTEGER NOT NULL,
+            preco_unit_centavos INTEGER NOT NULL,
+            total_item_centavos INTEGER NOT NULL,
+            cep TEXT NOT NULL,
+            numero TEXT NOT NULL,
+            pedido_codigo TEXT NOT NULL,
+            pedido_id INTEGER,
+            criado_em TEXT
+        );
+    """)
+    con.execute("CREATE INDEX IF NOT EXISTS arq.idx_carrinho_pedido_id ON carrinho (pedido_id);")
+    # Modo comprimido: as linhas de um pedido, JSON (listas em COLUNAS) + zlib.
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS arq.carrinho_comprimido (
+            pedido_id INTEGER PRIMARY KEY,
+            linhas BLOB NOT NULL
+        );
+    """)
+
+def _criar_view(con, com_arquivo):
+    partes = [f"SELECT {_LISTA} FROM main.carrinho"]
+    if com_arquivo:
+        extraidas = ", ".join(f"json_extract(j.value, '$[{i}]') AS {c}" if c != "pedido_id" else "z.pedido_id"
+                              for i, c in enumerate(COLUNAS))
+        partes.append(f"SELECT {_LISTA} FROM arq.carrinho")
+        partes.append(f"SELECT {extraidas} FROM arq.carrinho_comprimido z, "
+                      f"json_each(ibex_descomprimir(z.linhas)) j")
+    con.execute(f"CREATE TEMP VIEW carrinho_todos AS {' UNION ALL '.join(partes)};")
+
+def abrir(criar=False):
+    """
+    Conexão nova (fora do pool) com o arquivo anexado como 'arq' e a view
+    'carrinho_todos'. Sem arquivo (e sem criar=True), a view é só o
+    carrinho do banco. Quem abre fecha.
+    """
+    con = conectar(pool().caminho)
+    try:
+        com_arquivo = criar or existe()
+        if com_arquivo:
+            con.create_function("ibex_descomprimir", 1, _descomprimir, deterministic=True)
+            con.execute("ATTACH DATABASE ? AS arq;", (caminho(),))
+            if criar:
+                _preparar_arquivo(con)
+        _criar_view(con, com_arquivo)
+    except BaseException:
+        con.close()
+        raise
+    return con
+
+@contextmanager
+def conexao():
+    """with conexao() as con: leitura com o arquivo (ver abrir())."""
+    con = abrir()
+    try:
+        yield con
+    finally:
+        con.close()
+
+@contextmanager
+def transacao():
+    """Como database.conexao.transacao(), numa conexão de conexao()."""
+    with conexao() as con:
+        con.execute("BEGIN IMMEDIATE;")
+        try:
+            yield con
+        except BaseException:
+            con.rollback()
+            raise
+        else:
+            con.commit()
+
+# ============================ Pedidos antigos =================================
+
+def itens_pedido_cliente(cliente_id, codigo):
+    """Itens de um pedido do cliente lidos com o arquivo ([] se não houver)."""
+    if not existe():
+        return []
+    with conexao() as con:
+        row = con.execute(SQL_PEDIDO_CLIENTE, (cliente_id, codigo)).fetchone()
+        return con.execute(SQL_ITENS_PEDIDO, (row[0],)).fetchall() if row else []
+
+def itens_pedido_empresa(empresa_id, codigo):
+    """Itens da empresa num pedido, lidos com o arquivo ([] se não houver)."""
+    if not existe():
+        return []
+    with conexao() as con:
+        row = con.execute(SQL_PEDIDO, (codigo,)).fetchone()
+        return con.execute(SQL_ITENS_PEDIDO_EMPRESA, (row[0], empresa_id)).fetchall() if row else []
+
+# ============================== Arquivamento ==================================
+
+def _mover_lote(con, ids, comprimir):
+    """Copia as linhas dos pedidos 'ids' para o arquivo e as apaga do banco."""
+    lista = json.dumps(ids)
+    if comprimir:
+        por_pedido = {}
+        for row in con.execute(f"""
+            SELECT {_LISTA} FROM main.carrinho
+            WHERE pedido_id IN (SELECT value FROM json_each(?))
+            ORDER BY pedido_id, id;
+        """, (lista,)):
+            por_pedido.setdefault(row["pedido_id"], []).append(list(row))
+        # Pedido que já estava comprimido (lote repetido após queda) é regravado.
+        con.executemany("INSERT OR REPLACE INTO arq.carrinho_comprimido (pedido_id, linhas) VALUES (?, ?);",
+                        [(pid, zlib.compress(json.dumps(linhas, separators=(",", ":")).encode("utf-8"), 9))
+                         for pid, linhas in por_pedido.items()])
+    else:
+        con.execute(f"""
+            INSERT OR IGNORE INTO arq.carrinho ({_LISTA})
+            SELECT {_LISTA} FROM main.carrinho
+            WHERE pedido_id IN (SELECT value FROM json_each(?));
+        """, (lista,))
+    return con.execute("DELETE FROM main.carrinho WHERE pedido_id IN (SELECT value FROM json_each(?));",
+                       (lista,)).rowcount
+
+def arquivar(antes, comprimir=False, lote=TAMANHO_LOTE):
+    """
+    Move para o arquivo as linhas dos pedidos criados antes de 'antes'
+    (data "AAAA-MM-DD"). Retorna ResultadoArquivamento.
+    """
+    from api import DadosInvalidos
+    try:
+        corte = date.fromisoformat(str(antes)).isoformat()
+    except ValueError:
+        raise DadosInvalidos(f"Data de corte inválida: {antes!r} (use AAAA-MM-DD).")
+    if lote < 1:
+        raise DadosInvalidos("Lote: valor mínimo 1.")
+
+    t0 = time.perf_counter()
+    pedidos = linhas = 0
+    con = abrir(criar=True)
+    try:
+        ultimo = ("", 0)
+        while True:
+            con.execute("BEGIN IMMEDIATE;")
+            try:
+                rows = con.execute(SQL_LOTE_PEDIDOS, (corte, *ultimo, lote)).fetchall()
+                if rows:
+                    linhas += _mover_lote(con, [r["id"] for r in rows], comprimir)
+            except BaseException:
+                con.rollback()
+                raise
+            con.commit()
+            if not rows:
+                break
+            pedidos += len(rows)
+            ultimo = (rows[-1]["criado_em"], rows[-1]["id"])
+    finally:
+        con.close()
+    return ResultadoArquivamento(pedidos, linhas, comprimir, time.perf_counter() - t0,
+                                 caminho(), os.path.getsize(caminho()))
@@ -0,0 +1,180 @@
+# ibex/cache.py
+# -*- coding: utf-8 -*-
+
+"""
+Cache do catálogo (produtos) dentro do processo
+- LRU limitado (IBEX_CACHE_CATALOGO entradas; 0 desliga) com linhas de
+  produto e páginas de listagem/busca
+- Escrita pelo próprio processo (criar/editar/remover produto, checkout):
+  api.py chama registrar_escrita() depois do commit e só as entradas
+  afetadas saem:
+    * produto alterado -> a linha dele e as páginas que o contêm;
+    * produto novo, removido ou renomeado -> também as páginas da empresa
+      e as do catálogo geral (a ordem/membros da página mudam)
+- Escrita de outro processo: uma conexão dedicada lê PRAGMA data_version
+  (muda a cada commit de outra conexão); se mudou, confere
+  versao_catalogo (migração 7) e, se o catálogo mudou, esvazia o cache.
+  A conferência roda no máximo a cada INTERVALO_CONFERENCIA_S e só numa
+  thread por vez: um acerto no meio do intervalo não toca no banco nem
+  espera o lock do monitor (escrita de outro processo aparece em até
+  INTERVALO_CONFERENCIA_S)
+- estatisticas(): acertos, faltas, despejos e invalidações para dimensionar
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from database.conexao import conectar, pool
+
+CAPACIDADE_PADRAO = 4096
+# Idade máxima (s) da última leitura de PRAGMA data_version.
+INTERVALO_CONFERENCIA_S = 0.005
+
+def versao_catalogo(con):
+    """Versão atual do catálogo (soma 1 a cada alteração em produtos)."""
+    return con.execute("SELECT versao FROM versao_catalogo WHERE id = 1;").fetchone()[0]
+
+class CacheCatalogo:
+    """
+    LRU de entradas (valor, lista, empresa_id, ids):
+    - lista=False: uma linha de produto; ids = {id}
+    - lista=True: uma página; empresa_id = filtro (None = catálogo geral)
+      e ids = produtos presentes na página
+    """
+
+    def __init__(self, capacidade=CAPACIDADE_PADRAO):
+        self.capacidade = capacidade
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+        # Sobe a cada invalidação: uma carga iniciada antes dela não é guardada.
+        self._geracao = 0
+        self._versao = None
+        self._lock_monitor = threading.Lock()
+        self._monitor = None
+        self._caminho_monitor = None
+        self._data_version = None
+        self._conferido_em = 0.0
+        self.acertos = self.faltas = self.despejos = self.invalidacoes = 0
+
+    # ------------------------------------------------------------ leitura
+
+    def obter(self, chave, carregar, lista=False, empresa_id=None, ids=None):
+        """
+        Valor de 'chave'; na falta, chama carregar() e guarda o resultado.
+        'ids(valor)' diz quais produtos o valor contém.
+        """
+        if self.capacidade <= 0:
+            return carregar()
+        self._conferir_outros_processos()
+        with self._lock:
+            entrada = self._dados.get(chave)
+            if entrada is not None:
+                self._dados.move_to_end(chave)
+                self.acertos += 1
+                return entrada[0]
+            self.faltas += 1
+            geracao = self._geracao
+
+        valor = carregar()
+        contidos = frozenset(ids(valor)) if ids else frozenset()
+        with self._lock:
+            if geracao == self._geracao:
+                self._dados[chave] = (valor, lista, empresa_id, contidos)
+                self._dados.move_to_end(chave)
+                while len(self._dados) > self.capacidade:
+                    self._dados.popitem(last=False)
+                    self.despejos += 1
+        return valor
+
+    # ------------------------------------------------------- invalidação
+
+    def registrar_escrita(self, versao_antes, versao_depois, ids=(), empresas=(), estrutura=False):
+        """
+        Chamado depois do commit de uma escrita no catálogo feita por este
+        processo. 'versao_antes'/'versao_depois' são versao_catalogo() lidas
+        dentro da transação, antes e depois da escrita.
+        - ids: produtos alterados; empresas: empresas desses produtos
+        - estrutura=True: inclusão, remoção ou mudança de nome
+        """
+        ids, empresas = frozenset(ids), frozenset(empresas)
+        with self._lock:
+            self._geracao += 1
+            if self._versao is not None and self._versao < versao_antes:
+                # Houve escrita de outro processo ainda não vista: não dá
+                # para saber o que mudou.
+                self._limpar()
+            else:
+                for chave in [c for c, (_, lista, emp, contidos) in self._dados.items()
+                              if contidos & ids
+                              or (lista and estrutura and (emp is None or emp in empresas))]:
+                    del self._dados[chave]
+                    self.invalidacoes += 1
+            self._versao = max(self._versao or 0, versao_depois)
+
+    def limpar(self):
+        with self._lock:
+            self._geracao += 1
+            self._limpar()
+
+    def _limpar(self):
+        self.invalidacoes += len(self._dados)
+        self._dados.clear()
+
+    def _conferir_outros_processos(self):
+        caminho = pool().caminho
+        if (caminho == self._caminho_monitor
+                and time.monotonic() - self._conferido_em < INTERVALO_CONFERENCIA_S):
+            return
+        # Outra thread já está conferindo (mesmo banco): não espera por ela.
+        if not self._lock_monitor.acquire(blocking=caminho != self._caminho_monitor):
+            return
+        try:
+            self._conferir(caminho)
+        finally:
+            self._lock_monitor.release()
+
+    def _conferir(self, caminho):
+        """Lê data_version (e a versão do catálogo). Chamado com _lock_monitor."""
+        trocou_banco = False
+        if self._monitor is None or self._caminho_monitor != caminho:
+            if self._monitor is not None:
+                self._monitor.close()
+                trocou_banco = True
+            self._monitor = conectar(caminho)
+            self._caminho_monitor = caminho
+            self._data_version = None
+        data_version = self._monitor.execute("PRAGMA data_version;").fetchone()[0]
+        self._conferido_em = time.monotonic()
+        if data_version == self._data_version:
+            return
+        self._data_version = data_version
+        versao = versao_catalogo(self._monitor)
+        with self._lock:
+            if trocou_banco or (self._versao is not None and versao > self._versao):
+                self._geracao += 1
+                self._limpar()
+            if trocou_banco or self._versao is None or versao > self._versao:
+                self._versao = versao
+
+    # ------------------------------------------------------- estatísticas
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos + self.faltas
+            return {
+                "capacidade": self.capacidade,
+                "entradas": len(self._dados),
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+                "taxa_acerto": round(self.acertos / consultas, 4) if consultas else 0.0,
+                "despejos": self.despejos,
+                "invalidacoes": self.invalidacoes,
+            }
+
+catalogo = CacheCatalogo(int(os.environ.get("IBEX_CACHE_CATALOGO", CAPACIDADE_PADRAO)))
+
+def estatisticas():
+    """Contadores do cache do catálogo deste processo."""
+    return catalogo.estatisticas()
@@ -0,0 +1,338 @@
+# ibex/carrinho_memoria.py
+# -*- coding: utf-8 -*-
+
+"""
+Carrinho (rascunho) do cliente em memória, gravado em 'carrinho_temp'
+- Cada cliente ativo tem um CarrinhoMemoria: {produto_id: [qtd, preço em
+  centavos]} e os totais (itens, valor em centavos), ajustados a cada
+  ação. Ver o carrinho e calcular totais não releem carrinho_temp JOIN
+  produtos: só conferem a versão do carrinho (uma linha pela chave)
+- Gravação imediata (padrão): cada ação grava a linha que mudou (UPSERT
+  da quantidade ou DELETE) na sua transação. Uma queda do processo não
+  perde nada do que já foi respondido ao cliente
+- IBEX_CARRINHO_GRAVAR_S > 0 liga a gravação adiada: o que mudou vai
+  numa transação só, em lote, no checkout (dentro da transação do
+  pedido), quando o carrinho fica esse tempo sem mudar (ou após
+  FATOR_ESPERA_MAXIMA vezes isso sob uso contínuo), no logout e ao sair
+  do processo. Mais rápido, mas uma queda perde até
+  FATOR_ESPERA_MAXIMA × IBEX_CARRINHO_GRAVAR_S s de mudanças (o banco
+  fica com o último carrinho inteiro gravado)
+- Outros processos: gatilhos em carrinho_temp somam a versão do carrinho
+  do cliente (carrinho_versao, migração 14). Se ela mudou desde a carga,
+  o carrinho é relido; pendências de gravação adiada são gravadas antes
+  (a quantidade deste processo vence naquele item)
+- O pedido nunca depende de estado não gravado: o checkout lê carrinho_temp
+- Carrinhos já gravados e parados há OCIOSO_S segundos saem da memória
+"""
+
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from database.conexao import conectar, obter_conexao, pool, transacao
+
+# 0 = grava a cada ação; > 0 = gravação adiada (ver acima).
+GRAVAR_S_PADRAO = 0.0
+# Sob uso contínuo, grava no máximo após FATOR × GRAVAR_S da primeira pendência.
+FATOR_ESPERA_MAXIMA = 5
+OCIOSO_S = 30 * 60
+
+# ============================== Consultas =====================================
+
+SQL_CARREGAR = """
+    SELECT ct.produto_id, ct.qtd, p.preco_centavos
+    FROM carrinho_temp ct
+    JOIN produtos p ON p.id = ct.produto_id
+    WHERE ct.cliente_id = ?;
+"""
+
+SQL_GRAVAR_ITEM = """
+    INSERT INTO carrinho_temp (cliente_id, produto_id, qtd)
+    VALUES (?, ?, ?)
+    ON CONFLICT(cliente_id, produto_id) DO UPDATE SET qtd = excluded.qtd;
+"""
+
+SQL_APAGAR_ITEM = """
+    DELETE FROM carrinho_temp WHERE cliente_id = ? AND produto_id = ?;
+"""
+
+SQL_VERSAO = """
+    SELECT versao FROM carrinho_versao WHERE cliente_id = ?;
+"""
+
+CONSULTAS = {
+    "carregar": SQL_CARREGAR,
+    "gravar_item": SQL_GRAVAR_ITEM,
+    "apagar_item": SQL_APAGAR_ITEM,
+    "versao": SQL_VERSAO,
+}
+
+def _versao(con, cliente_id):
+    """Versão do carrinho no banco (0 = nunca gravado)."""
+    row = con.execute(SQL_VERSAO, (cliente_id,)).fetchone()
+    return row[0] if row else 0
+
+def _escrever(con, cliente_id, pendentes):
+    """Grava as quantidades pendentes {produto_id: qtd} (0 = tirar a linha)."""
+    con.executemany(SQL_GRAVAR_ITEM, [(cliente_id, pid, qtd) for pid, qtd in pendentes.items() if qtd > 0])
+    con.executemany(SQL_APAGAR_ITEM, [(cliente_id, pid) for pid, qtd in pendentes.items() if qtd <= 0])
+
+def _gravar_em(con, carrinho, pendentes):
+    """Grava 'pendentes' na transação de 'con'. Devolve a versão nova do carrinho."""
+    antes = _versao(con, carrinho.cliente_id)
+    _escrever(con, carrinho.cliente_id, pendentes)
+    if antes != carrinho.versao:
+        carrinho._carregar(con.execute(SQL_CARREGAR, (carrinho.cliente_id,)).fetchall())
+    return _versao(con, carrinho.cliente_id)
+
+# ================================ Carrinho ====================================
+
+class CarrinhoMemoria:
+    """
+    Itens e totais de um cliente. Quem altera segura 'lock' e depois chama
+    ArmazemCarrinhos.alterado().
+    """
+
+    def __init__(self, banco, cliente_id, linhas=(), versao=0):
+        self.banco = banco
+        self.cliente_id = cliente_id
+        self.lock = threading.RLock()
+        self._carregar(linhas)
+        # Versão de carrinho_versao que os itens em memória refletem.
+        self.versao = versao
+        # produto_id -> quantidade ainda não gravada em carrinho_temp
+        self._pendentes = {}
+        self.alterado_em = None
+        self.primeira_pendencia = None
+        self.usado_em = time.monotonic()
+
+    def _carregar(self, linhas):
+        self.itens = {pid: [qtd, int(preco)] for pid, qtd, preco in linhas}
+        self.total_itens = sum(qtd for qtd, _ in self.itens.values())
+        self.total_valor = sum(qtd * preco for qtd, preco in self.itens.values())
+
+    def quantidade(self, produto_id):
+        item = self.itens.get(produto_id)
+        return item[0] if item else 0
+
+    def definir(self, produto_id, qtd, preco):
+        """Quantidade nova do item (0 tira o item); ajusta os totais."""
+        qtd_antes, preco_antes = self.itens.get(produto_id, (0, 0))
+        preco = int(preco)
+        self.total_itens += qtd - qtd_antes
+        self.total_valor += qtd * preco - qtd_antes * preco_antes
+        if qtd > 0:
+            self.itens[produto_id] = [qtd, preco]
+        else:
+            self.itens.pop(produto_id, None)
+        self._pendentes[produto_id] = qtd
+        agora = time.monotonic()
+        self.alterado_em = self.usado_em = agora
+        if self.primeira_pendencia is None:
+            self.primeira_pendencia = agora
+
+    def atualizar_preco(self, produto_id, preco):
+        """O preço do catálogo mudou: só o total em memória muda."""
+        item = self.itens.get(produto_id)
+        if item is not None and item[1] != preco:
+            self.total_valor += item[0] * (int(preco) - item[1])
+            item[1] = int(preco)
+
+    def descartar(self, produto_id):
+        """Produto saiu do catálogo: some do carrinho (no banco, o JOIN já o esconde)."""
+        item = self.itens.pop(produto_id, None)
+        if item is not None:
+            self.total_itens -= item[0]
+            self.total_valor -= item[0] * item[1]
+
+    @property
+    def pendente(self):
+        return bool(self._pendentes)
+
+    def _retirar_pendentes(self):
+        pendentes, self._pendentes = self._pendentes, {}
+        self.primeira_pendencia = None
+        return pendentes
+
+    def _devolver_pendentes(self, pendentes):
+        # A gravação falhou: o que não mudou de novo nesse meio-tempo volta.
+        for pid, qtd in pendentes.items():
+            self._pendentes.setdefault(pid, qtd)
+        if self._pendentes and self.primeira_pendencia is None:
+            self.primeira_pendencia = time.monotonic()
+
+    def _esvaziar(self):
+        self.itens.clear()
+        self.total_itens = self.total_valor = 0
+        self._pendentes.clear()
+        self.primeira_pendencia = None
+
+# ================================ Armazém =====================================
+
+class ArmazemCarrinhos:
+    """Carrinhos em memória deste processo e a thread que os grava."""
+
+    def __init__(self, gravar_s=GRAVAR_S_PADRAO):
+        self.gravar_s = gravar_s
+        # (caminho do banco, cliente_id) -> CarrinhoMemoria
+        self._carrinhos = {}
+        self._lock = threading.Lock()
+        self._gravador = None
+        self.gravacoes = self.linhas_gravadas = self.falhas = 0
+
+    # ------------------------------------------------------------ acesso
+
+    def obter(self, cliente_id):
+        """
+        Carrinho do cliente, carregado de carrinho_temp na primeira vez e
+        relido se outro processo o alterou desde então.
+        """
+        cliente_id = int(cliente_id)
+        chave = (pool().caminho, cliente_id)
+        with self._lock:
+            carrinho = self._carrinhos.get(chave)
+        if carrinho is not None:
+            with carrinho.lock:
+                with obter_conexao() as con:
+                    versao = _versao(con, cliente_id)
+                if versao != carrinho.versao:
+                    if carrinho.pendente:
+                        self.gravar(carrinho)    # grava e relê na mesma transação
+                    else:
+                        with obter_conexao() as con:
+                            carrinho._carregar(con.execute(SQL_CARREGAR, (cliente_id,)).fetchall())
+                        carrinho.versao = versao
+                carrinho.usado_em = time.monotonic()
+            return carrinho
+        with obter_conexao() as con:
+            # Versão antes das linhas: uma mudança no meio só causa uma releitura.
+            versao = _versao(con, cliente_id)
+            linhas = con.execute(SQL_CARREGAR, (cliente_id,)).fetchall()
+        with self._lock:
+            # Outra thread pode ter carregado antes: vale o primeiro.
+            return self._carrinhos.setdefault(chave, CarrinhoMemoria(chave[0], cliente_id, linhas, versao))
+
+    def alterado(self, carrinho):
+        """Chamado depois de cada ação que mudou o carrinho."""
+        if self.gravar_s <= 0:
+            self.gravar(carrinho)
+        else:
+            self._iniciar_gravador()
+
+    @contextmanager
+    def pedido(self, cliente_id):
+        """
+        Para o checkout. Dentro do bloco, gravar(con) põe as pendências do
+        cliente na transação do pedido; se o bloco termina sem exceção (o
+        pedido foi gravado), o carrinho em memória fica vazio. O lock do
+        carrinho fica preso até lá: nenhuma ação entra no meio do checkout.
+        """
+        carrinho = self._carrinhos.get((pool().caminho, int(cliente_id)))
+        if carrinho is None:
+            yield lambda con: None
+            return
+        with carrinho.lock:
+            yield lambda con: _escrever(con, carrinho.cliente_id, carrinho._pendentes)
+            carrinho._esvaziar()
+
+    def liberar(self, cliente_id):
+        """Logout: grava as pendências do cliente e tira o carrinho da memória."""
+        chave = (pool().caminho, int(cliente_id))
+        carrinho = self._carrinhos.get(chave)
+        if carrinho is None:
+            return
+        self.gravar(carrinho)
+        with carrinho.lock, self._lock:
+            if not carrinho.pendente:
+                self._carrinhos.pop(chave, None)
+
+    # ----------------------------------------------------------- gravação
+
+    def gravar(self, carrinho):
+        """
+        Grava as pendências do carrinho numa transação. Se outro processo
+        mexeu no carrinho desde a carga, relê os itens na mesma transação.
+        Devolve as linhas gravadas.
+        """
+        with carrinho.lock:
+            pendentes = carrinho._retirar_pendentes()
+            if not pendentes:
+                return 0
+            try:
+                if carrinho.banco == pool().caminho:
+                    with transacao() as con:
+                        versao = _gravar_em(con, carrinho, pendentes)
+                else:
+                    # O pool foi apontado para outro banco (benchmarks).
+                    con = conectar(carrinho.banco)
+                    try:
+                        with con:
+                            versao = _gravar_em(con, carrinho, pendentes)
+                    finally:
+                        con.close()
+            except BaseException:
+                carrinho._devolver_pendentes(pendentes)
+                raise
+            carrinho.versao = versao
+        with self._lock:
+            self.gravacoes += 1
+            self.linhas_gravadas += len(pendentes)
+        return len(pendentes)
+
+    def gravar_tudo(self):
+        """Grava todos os carrinhos com pendências (saída do processo)."""
+        with self._lock:
+            carrinhos = list(self._carrinhos.values())
+        return sum(self.gravar(c) for c in carrinhos if c.pendente)
+
+    def _vencidos(self, agora):
+        espera_maxima = self.gravar_s * FATOR_ESPERA_MAXIMA
+        with self._lock:
+            carrinhos = list(self._carrinhos.items())
+        for chave, c in carrinhos:
+            if c.primeira_pendencia is not None:
+                if agora - c.alterado_em >= self.gravar_s or agora - c.primeira_pendencia >= espera_maxima:
+                    yield c
+            elif agora - c.usado_em >= OCIOSO_S:
+                with self._lock:
+                    if not c.pendente and self._carrinhos.get(chave) is c:
+                        del self._carrinhos[chave]
+
+    def _laco_gravador(self):
+        intervalo = min(self.gravar_s / 2, 1.0)
+        while True:
+            time.sleep(intervalo)
+            for carrinho in list(self._vencidos(time.monotonic())):
+                try:
+                    self.gravar(carrinho)
+                except Exception:
+                    # Banco ocupado/indisponível: as pendências voltaram ao
+                    # carrinho e a próxima volta tenta de novo.
+                    with self._lock:
+                        self.falhas += 1
+
+    def _iniciar_gravador(self):
+        if self._gravador is not None:
+            return
+        with self._lock:
+            if self._gravador is None:
+                self._gravador = threading.Thread(target=self._laco_gravador, name="ibex-carrinhos",
+                                                  daemon=True)
+                self._gravador.start()
+
+    # -------------------------------------------------------- estatísticas
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "carrinhos": len(self._carrinhos),
+                "pendentes": sum(1 for c in self._carrinhos.values() if c.pendente),
+                "gravacoes": self.gravacoes,
+                "linhas_gravadas": self.linhas_gravadas,
+                "falhas": self.falhas,
+            }
+
+armazem = ArmazemCarrinhos(float(os.environ.get("IBEX_CARRINHO_GRAVAR_S", GRAVAR_S_PADRAO)))
+atexit.register(armazem.gravar_tudo)
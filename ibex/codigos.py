@@ -0,0 +1,70 @@
+# ibex/codigos.py
+# -*- coding: utf-8 -*-
+
+"""
+Códigos de pedido no estilo ULID
+- "P" + 26 caracteres em base32 de Crockford: 48 bits de milissegundos
+  desde 1970 + 80 bits aleatórios (ex.: P01JA8Q9M4X3V7K2T6N0R5B8CZ)
+- Ordem alfabética = ordem de criação (o tempo vem primeiro)
+- Monotônico no processo: no mesmo milissegundo a parte aleatória é
+  incrementada, então dois pedidos nunca empatam nem saem fora de ordem
+- Entre processos a colisão exige 80 bits aleatórios iguais no mesmo
+  milissegundo; ainda assim, pedidos.codigo é UNIQUE e o checkout gera
+  outro código se o INSERT esbarrar nele
+- Códigos antigos (P20250101120000-7) continuam válidos: só os novos
+  pedidos usam este formato
+"""
+
+import os
+import threading
+import time
+
+PREFIXO = "P"
+TAMANHO = len(PREFIXO) + 26
+
+_ALFABETO = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"  # Crockford: sem I, L, O, U
+_MAX_ALEATORIO = (1 << 80) - 1
+
+_lock = threading.Lock()
+_ultimo_ms = -1
+_ultimo_aleatorio = 0
+
+def _base32(numero, digitos):
+    saida = []
+    for _ in range(digitos):
+        numero, resto = divmod(numero, 32)
+        saida.append(_ALFABETO[resto])
+    return "".join(reversed(saida))
+
+def novo_codigo_pedido():
+    """Gera um código de pedido único e crescente (ver docstring do módulo)."""
+    global _ultimo_ms, _ultimo_aleatorio
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms <= _ultimo_ms:
+            # Mesmo milissegundo (ou relógio voltou): continua a sequência.
+            ms = _ultimo_ms
+            aleatorio = _ultimo_aleatorio + 1
+            if aleatorio > _MAX_ALEATORIO:
+                ms += 1
+                aleatorio = int.from_bytes(os.urandom(10), "big")
+        else:
+            aleatorio = int.from_bytes(os.urandom(10), "big")
+        _ultimo_ms, _ultimo_aleatorio = ms, aleatorio
+    return montar_codigo(ms, aleatorio)
+
+def montar_codigo(ms, aleatorio):
+    """Código a partir das partes (ms desde 1970, inteiro de 80 bits)."""
+    return PREFIXO + _base32((ms << 80) | (aleatorio & _MAX_ALEATORIO), 26)
+
+def _reiniciar_no_filho():
+    # Processo filho de fork() herdaria a sequência do pai e repetiria códigos.
+    global _ultimo_ms, _ultimo_aleatorio
+    _ultimo_ms, _ultimo_aleatorio = -1, 0
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reiniciar_no_filho)
+
+def normalizar_codigo(codigo):
+    """Código digitado pelo usuário -> forma gravada (maiúsculas, sem espaços)."""
+    return (codigo or "").strip().upper()
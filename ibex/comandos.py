@@ -0,0 +1,284 @@
+# ibex/comandos.py
+# -*- coding: utf-8 -*-
+
+"""
+Comandos não interativos do Ibex (linha de comando)
+- python main.py                      -> menus interativos
+- python main.py agregados verificar  -> confere os totais de vendas
+- python main.py agregados reconstruir -> recalcula os totais a partir de 'carrinho'
+- python main.py exportar vendas 3 --formato ndjson --saida vendas.ndjson
+- python main.py serve --porta 8000   -> servidor HTTP/JSON (servidor.py)
+- python main.py importar 3 catalogo.csv -> importa produtos em lote (importacao.py)
+- python main.py reajustar 3 --percentual 8 --busca cimento --simular
+- python main.py estoque 3 inventario.csv -> ajusta o estoque em lote (ajustes.py)
+- python main.py provisionar clientes base.csv -> cadastro em lote (provisionamento.py)
+- python main.py reservas varrer      -> apaga as reservas de estoque vencidas (reservas.py)
+- python main.py arquivar 2024-01-01  -> move itens de pedidos antigos para o arquivo (arquivo.py)
+"""
+
+import argparse
+import sys
+
+# ================================ agregados ===================================
+
+def _cmd_agregados(args):
+    import agregados
+
+    if args.acao == "reconstruir":
+        agregados.reconstruir()
+        print("✅ Totais de vendas recalculados a partir de 'carrinho'.")
+        return 0
+
+    divergencias = agregados.verificar()
+    if not divergencias:
+        print("✅ Totais de vendas conferem com 'carrinho'.")
+        return 0
+    for tabela, chave, esperado, atual in divergencias:
+        print(f"⚠ {tabela}[{chave}]: esperado {esperado}, gravado {atual}")
+    print(f"{len(divergencias)} divergência(s). Rode 'agregados reconstruir' para corrigir.")
+    return 1
+
+# ================================ exportar ====================================
+
+def _cmd_exportar(args):
+    from contextlib import closing
+
+    import relatorio
+    from exportar import exportar
+
+    if args.relatorio == "estoque":
+        linhas = relatorio.linhas_estoque(args.empresa_id)
+        campos = relatorio.LinhaEstoque._fields
+    else:
+        linhas = relatorio.linhas_vendas(args.empresa_id)
+        campos = relatorio.LinhaVenda._fields
+
+    # closing: erro na escrita no meio do relatório fecha a conexão na hora.
+    with closing(linhas):
+        if args.saida in (None, "-"):
+            n = exportar(linhas, sys.stdout, args.formato, campos)
+        else:
+            with open(args.saida, "w", encoding="utf-8", newline="") as destino:
+                n = exportar(linhas, destino, args.formato, campos)
+    print(f"{n} linha(s) exportada(s).", file=sys.stderr)
+    return 0
+
+# ================================= importar ===================================
+
+def _cmd_importar(args):
+    from importacao import importar_produtos
+
+    def progresso(lidas):
+        print(f"... {lidas:,} linhas", file=sys.stderr)
+
+    rejeitados = open(args.rejeitados, "w", encoding="utf-8", newline="") if args.rejeitados else None
+    try:
+        with open(args.arquivo, encoding="utf-8-sig", newline="") as arquivo:
+            r = importar_produtos(args.empresa_id, arquivo, args.separador, args.lote, rejeitados, progresso)
+    finally:
+        if rejeitados is not None:
+            rejeitados.close()
+
+    print(f"✅ {r.lidas:,} linha(s) lida(s): {r.inseridas:,} inserida(s), "
+          f"{r.atualizadas:,} atualizada(s), {r.rejeitadas:,} rejeitada(s).")
+    print(f"Tempo: {r.segundos:.2f} s ({r.linhas_por_segundo:,.0f} linhas/s)")
+    for rej in r.rejeicoes:
+        print(f"⚠ linha {rej.linha}: {rej.motivo}")
+    if r.rejeitadas > len(r.rejeicoes):
+        print(f"... e mais {r.rejeitadas - len(r.rejeicoes):,}"
+              + (f" (todas em {args.rejeitados})" if args.rejeitados else ""))
+    return 0
+
+# ================================= ajustes ====================================
+
+def _imprimir_ajuste(r, campo, diff):
+    modo = "SIMULAÇÃO (nada gravado)" if r.simulado else "✅ Gravado"
+    print(f"{modo}: {r.analisadas:,} analisada(s), {r.alteradas:,} alterada(s), "
+          f"{r.rejeitadas:,} rejeitada(s).")
+    print(f"Tempo: {r.segundos:.2f} s ({r.linhas_por_segundo:,.0f} linhas/s)")
+    for a in r.alteracoes:
+        print(f"  {a.produto_id:>8}  {a.nome[:40]:<40} {campo}: {a.antes} -> {a.depois}")
+    if r.alteradas > len(r.alteracoes):
+        print(f"  ... e mais {r.alteradas - len(r.alteracoes):,}"
+              + (f" (todas em {diff})" if diff else ""))
+    for rej in r.rejeicoes:
+        print(f"⚠ linha {rej.linha}: {rej.motivo}")
+    if r.rejeitadas > len(r.rejeicoes):
+        print(f"... e mais {r.rejeitadas - len(r.rejeicoes):,} rejeitada(s)")
+
+def _abrir_diff(caminho):
+    return open(caminho, "w", encoding="utf-8", newline="") if caminho else None
+
+def _cmd_reajustar(args):
+    from ajustes import reajustar_precos
+
+    ids = [i.strip() for i in args.ids.split(",") if i.strip()] if args.ids else None
+    diff = _abrir_diff(args.diff)
+    try:
+        r = reajustar_precos(args.empresa_id, args.percentual, args.valor, args.busca, ids,
+                             args.simular, diff)
+    finally:
+        if diff is not None:
+            diff.close()
+    _imprimir_ajuste(r, "preço", args.diff)
+    return 0
+
+def _cmd_estoque(args):
+    from ajustes import ajustar_estoque
+
+    diff = _abrir_diff(args.diff)
+    try:
+        with open(args.arquivo, encoding="utf-8-sig", newline="") as arquivo:
+            r = ajustar_estoque(args.empresa_id, arquivo, args.somar, args.separador,
+                                args.simular, diff)
+    finally:
+        if diff is not None:
+            diff.close()
+    _imprimir_ajuste(r, "estoque", args.diff)
+    return 0
+
+# =============================== provisionar ==================================
+
+def _cmd_provisionar(args):
+    from provisionamento import provisionar_csv
+
+    def progresso(lidos):
+        print(f"... {lidos:,} registros", file=sys.stderr)
+
+    recusados = open(args.recusados, "w", encoding="utf-8", newline="") if args.recusados else None
+    try:
+        with open(args.arquivo, encoding="utf-8-sig", newline="") as arquivo:
+            r = provisionar_csv(args.tabela, arquivo, args.separador, args.lote, recusados, progresso)
+    finally:
+        if recusados is not None:
+            recusados.close()
+
+    print(f"✅ {r.lidos:,} registro(s) lido(s): {r.inseridos:,} inserido(s), "
+          f"{r.duplicados:,} duplicado(s), {r.rejeitados:,} rejeitado(s).")
+    print(f"Tempo: {r.segundos:.2f} s ({r.registros_por_segundo:,.0f} registros/s)")
+    for rec in r.recusados:
+        print(f"⚠ linha {rec.numero}: {rec.motivo}")
+    restantes = r.duplicados + r.rejeitados - len(r.recusados)
+    if restantes > 0:
+        print(f"... e mais {restantes:,}" + (f" (todos em {args.recusados})" if args.recusados else ""))
+    return 0
+
+# ================================= reservas ===================================
+
+def _cmd_reservas(args):
+    import reservas
+
+    if args.acao == "varrer":
+        n = reservas.varrer()
+        print(f"✅ {n} reserva(s) vencida(s) apagada(s).")
+        return 0
+
+    validas, unidades, vencidas = reservas.resumo()
+    print(f"Reservas válidas: {validas} ({unidades} unidade(s)); vencidas ainda na tabela: {vencidas}.")
+    return 0
+
+# ================================= arquivar ===================================
+
+def _cmd_arquivar(args):
+    import arquivo
+
+    r = arquivo.arquivar(args.antes, args.comprimir, args.lote)
+    modo = " (comprimidos)" if r.comprimido else ""
+    print(f"✅ {r.pedidos:,} pedido(s) anteriores a {args.antes}: {r.linhas:,} item(ns) movido(s){modo}.")
+    print(f"Arquivo: {r.arquivo} ({r.bytes_arquivo / 1_048_576:,.1f} MB). Tempo: {r.segundos:.2f} s")
+    return 0
+
+# ================================== serve =====================================
+
+def _cmd_serve(args):
+    from servidor import servir
+
+    servir(args.host, args.porta, args.verboso)
+    return 0
+
+# ================================== parser ====================================
+
+def _parser():
+    parser = argparse.ArgumentParser(prog="main.py", description="Ibex - Materiais de Construção")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("agregados", help="confere ou recalcula os totais de vendas")
+    p.add_argument("acao", choices=["verificar", "reconstruir"])
+    p.set_defaults(funcao=_cmd_agregados)
+
+    p = sub.add_parser("exportar", help="exporta um relatório da empresa em CSV ou NDJSON")
+    p.add_argument("relatorio", choices=["estoque", "vendas"])
+    p.add_argument("empresa_id", type=int)
+    p.add_argument("--formato", choices=["csv", "ndjson"], default="csv")
+    p.add_argument("--saida", help="arquivo de destino (padrão: saída padrão)")
+    p.set_defaults(funcao=_cmd_exportar)
+
+    p = sub.add_parser("importar", help="importa produtos de um CSV (nome, preco, estoque[, codigo])")
+    p.add_argument("empresa_id", type=int)
+    p.add_argument("arquivo")
+    p.add_argument("--separador", choices=[",", ";"], help="padrão: detectado pelo cabeçalho")
+    p.add_argument("--lote", type=int, default=10_000, help="linhas por transação")
+    p.add_argument("--rejeitados", help="CSV com as linhas rejeitadas e o motivo")
+    p.set_defaults(funcao=_cmd_importar)
+
+    p = sub.add_parser("reajustar", help="aplica uma regra de preço aos produtos da empresa")
+    p.add_argument("empresa_id", type=int)
+    regra = p.add_mutually_exclusive_group(required=True)
+    regra.add_argument("--percentual", help="ex.: 8 (8%% mais caro) ou -5")
+    regra.add_argument("--valor", help="valor somado a cada preço, ex.: 2.50 ou -1")
+    filtro = p.add_mutually_exclusive_group()
+    filtro.add_argument("--busca", help="só os produtos que casam com o termo (busca por nome)")
+    filtro.add_argument("--ids", help="só estes produtos, ex.: 12,15,40")
+    p.add_argument("--simular", action="store_true", help="mostra as diferenças sem gravar")
+    p.add_argument("--diff", help="CSV com todas as alterações (antes -> depois)")
+    p.set_defaults(funcao=_cmd_reajustar)
+
+    p = sub.add_parser("estoque", help="ajusta o estoque a partir de um CSV (id, estoque)")
+    p.add_argument("empresa_id", type=int)
+    p.add_argument("arquivo")
+    p.add_argument("--somar", action="store_true", help="soma a coluna ao estoque atual")
+    p.add_argument("--separador", choices=[",", ";"], help="padrão: detectado pelo cabeçalho")
+    p.add_argument("--simular", action="store_true", help="mostra as diferenças sem gravar")
+    p.add_argument("--diff", help="CSV com todas as alterações (antes -> depois)")
+    p.set_defaults(funcao=_cmd_estoque)
+
+    p = sub.add_parser("provisionar", help="cadastra clientes ou empresas em lote a partir de um CSV")
+    p.add_argument("tabela", choices=["clientes", "empresas"])
+    p.add_argument("arquivo", help="CSV com cabeçalho: nome,email,senha ou razao_social,cnpj,email,senha")
+    p.add_argument("--separador", choices=[",", ";"], help="padrão: detectado pelo cabeçalho")
+    p.add_argument("--lote", type=int, default=5_000, help="registros por transação")
+    p.add_argument("--recusados", help="CSV com duplicados e rejeitados (sem a senha)")
+    p.set_defaults(funcao=_cmd_provisionar)
+
+    p = sub.add_parser("reservas", help="resumo ou varredura das reservas de estoque")
+    p.add_argument("acao", choices=["resumo", "varrer"])
+    p.set_defaults(funcao=_cmd_reservas)
+
+    p = sub.add_parser("arquivar", help="move os itens de pedidos antigos para o arquivo morto")
+    p.add_argument("antes", help="data de corte AAAA-MM-DD (pedidos criados antes dela)")
+    p.add_argument("--comprimir", action="store_true", help="grava os itens de cada pedido comprimidos")
+    p.add_argument("--lote", type=int, default=1_000, help="pedidos por transação")
+    p.set_defaults(funcao=_cmd_arquivar)
+
+    p = sub.add_parser("serve", help="inicia o servidor HTTP/JSON")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--porta", type=int, default=8000)
+    p.add_argument("--verboso", action="store_true", help="registra cada requisição")
+    p.set_defaults(funcao=_cmd_serve)
+
+    return parser
+
+def executar(argv):
+    """Interpreta argv (sem o nome do programa) e devolve o código de saída."""
+    from api import ErroIbex
+
+    args = _parser().parse_args(argv)
+    try:
+        return args.funcao(args)
+    except ErroIbex as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 2
+    except OSError as e:
+        # Arquivo inexistente ou sem permissão (importar, estoque, provisionar...).
+        print(f"Erro: {e.filename}: {e.strerror}" if e.filename else f"Erro: {e}", file=sys.stderr)
+        return 2
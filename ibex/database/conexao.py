@@ -1,7 +1,17 @@
 # ibex/database/conexao.py
 
 import os
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
+
+from database import rastreio
+
+# Quantas conexões o pool mantém abertas, no máximo.
+TAMANHO_POOL_PADRAO = 8
+# Tempo (s) que uma conexão espera por um lock de escrita antes de SQLITE_BUSY.
+TIMEOUT_PADRAO = 5.0
 
 def _caminho_db():
     """
@@ -13,36 +23,202 @@ def _caminho_db():
       │   │   └─ conexao.py  <-- este arquivo
       │   └─ ...
       └─ ibex.db            <-- aqui ficará o banco
+    A variável de ambiente IBEX_DB, se definida, tem prioridade.
     """
+    if os.environ.get("IBEX_DB"):
+        return os.path.abspath(os.environ["IBEX_DB"])
     # __file__ -> .../ibex/database/conexao.py
     pasta_database = os.path.dirname(os.path.abspath(__file__))        # .../ibex/database
     pasta_ibex = os.path.dirname(pasta_database)                        # .../ibex
     raiz_projeto = os.path.dirname(pasta_ibex)                          # .../
     return os.path.join(raiz_projeto, "ibex.db")
 
-def conectar():
-    """
-    Abre e retorna uma conexão sqlite3 já configurada.
-    Uso típico:
-        con = conectar()
-        cur = con.cursor()
-        cur.execute("SELECT 1;")
-        con.close()
-    """
-    caminho = _caminho_db()
+# Contador de conexões físicas abertas no processo (usado nos benchmarks).
+_estatisticas = {"abertas": 0}
+_lock_estatisticas = threading.Lock()
+
+def _abrir(caminho):
+    """Abre uma conexão sqlite3 nova e aplica os PRAGMAs do projeto."""
     # Garante que a pasta de destino exista (normalmente já existe)
     os.makedirs(os.path.dirname(caminho), exist_ok=True)
 
-    con = sqlite3.connect(caminho)
+    # Com IBEX_TRACE_SQL=1, a conexão mede cada comando (ver rastreio.py).
+    fabrica = rastreio.ConexaoRastreada if rastreio.ativo() else sqlite3.Connection
+    con = sqlite3.connect(caminho, timeout=TIMEOUT_PADRAO, check_same_thread=False, factory=fabrica)
     # Opcional: acessar colunas por nome (row["coluna"])
     con.row_factory = sqlite3.Row
 
     # PRAGMAs úteis
-    cur = con.cursor()
-    cur.execute("PRAGMA foreign_keys = ON;")
-    cur.execute("PRAGMA journal_mode = WAL;")
+    con.execute("PRAGMA foreign_keys = ON;")
+    con.execute("PRAGMA journal_mode = WAL;")
     # Você pode ajustar outros PRAGMAs conforme necessidade:
-    # cur.execute("PRAGMA synchronous = NORMAL;")
+    # con.execute("PRAGMA synchronous = NORMAL;")
 
-    con.commit()
+    with _lock_estatisticas:
+        _estatisticas["abertas"] += 1
     return con
+
+def conectar(caminho=None):
+    """
+    Abre e retorna uma conexão sqlite3 já configurada (fora do pool).
+    Prefira obter_conexao(); esta função fica para scripts avulsos e para
+    conexões dedicadas (ex.: o monitor do cache do catálogo).
+    Uso típico:
+        con = conectar()
+        cur = con.cursor()
+        cur.execute("SELECT 1;")
+        con.close()
+    """
+    return _abrir(caminho or _caminho_db())
+
+def estatisticas():
+    """Retorna uma cópia dos contadores de conexões do processo."""
+    with _lock_estatisticas:
+        return dict(_estatisticas)
+
+# ================================== Pool ======================================
+
+class PoolConexoes:
+    """
+    Pool de conexões configuradas uma única vez e reaproveitadas.
+
+    - Cada conexão é emprestada a uma thread por vez.
+    - Pedidos aninhados na mesma thread recebem a MESMA conexão, então um
+      helper chamado dentro de outro não abre uma segunda conexão.
+    - Ao devolver, transações esquecidas abertas são desfeitas (rollback),
+      como acontecia antes no con.close().
+    """
+
+    def __init__(self, caminho=None, tamanho=TAMANHO_POOL_PADRAO):
+        self.caminho = caminho or _caminho_db()
+        self.tamanho = tamanho
+        self._livres = queue.LifoQueue()
+        self._criadas = 0
+        self._todas = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _pegar(self):
+        try:
+            return self._livres.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._criadas < self.tamanho:
+                self._criadas += 1
+                criar = True
+            else:
+                criar = False
+        if criar:
+            try:
+                con = _abrir(self.caminho)
+            except Exception:
+                with self._lock:
+                    self._criadas -= 1
+                raise
+            with self._lock:
+                self._todas.append(con)
+            return con
+        # Pool cheio: espera alguém devolver.
+        return self._livres.get()
+
+    def _devolver(self, con):
+        if con.in_transaction:
+            con.rollback()
+        self._livres.put(con)
+
+    @contextmanager
+    def conexao(self):
+        """
+        Empresta uma conexão do pool.
+            with pool.conexao() as con:
+                con.execute("SELECT 1;")
+        """
+        atual = getattr(self._local, "con", None)
+        if atual is not None:
+            self._local.nivel += 1
+            try:
+                yield atual
+            finally:
+                self._local.nivel -= 1
+            return
+
+        con = self._pegar()
+        self._local.con = con
+        self._local.nivel = 0
+        try:
+            yield con
+        finally:
+            self._local.con = None
+            self._devolver(con)
+
+    def fechar(self):
+        """Fecha todas as conexões criadas pelo pool."""
+        with self._lock:
+            todas, self._todas = self._todas, []
+            self._criadas = 0
+        self._livres = queue.LifoQueue()
+        for con in todas:
+            try:
+                con.close()
+            except sqlite3.Error:
+                pass
+
+_pool = None
+_lock_pool = threading.Lock()
+
+def configurar(caminho=None, tamanho=TAMANHO_POOL_PADRAO):
+    """
+    (Re)configura o pool global. Chamada uma vez na inicialização; os
+    benchmarks usam para apontar para um banco temporário.
+    """
+    global _pool
+    with _lock_pool:
+        if _pool is not None:
+            _pool.fechar()
+        _pool = PoolConexoes(caminho, tamanho)
+    return _pool
+
+def pool():
+    """Retorna o pool global, criando-o com o caminho padrão se preciso."""
+    global _pool
+    if _pool is None:
+        with _lock_pool:
+            if _pool is None:
+                _pool = PoolConexoes()
+    return _pool
+
+def obter_conexao():
+    """
+    Context manager que empresta uma conexão do pool global.
+    Uso típico:
+        with obter_conexao() as con:
+            cur = con.cursor()
+            cur.execute("SELECT 1;")
+    """
+    return pool().conexao()
+
+@contextmanager
+def transacao():
+    """
+    Abre uma transação de escrita (BEGIN IMMEDIATE) numa conexão do pool:
+    commit ao sair normalmente, rollback em caso de exceção.
+    Dentro de uma transação já aberta, apenas reaproveita a conexão.
+    """
+    with obter_conexao() as con:
+        if con.in_transaction:
+            yield con
+            return
+        con.execute("BEGIN IMMEDIATE;")
+        try:
+            yield con
+        except BaseException:
+            con.rollback()
+            raise
+        else:
+            con.commit()
+
+def fechar_conexoes():
+    """Fecha as conexões do pool global (ex.: ao sair do programa)."""
+    if _pool is not None:
+        _pool.fechar()
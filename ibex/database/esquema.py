@@ -0,0 +1,552 @@
+# ibex/database/esquema.py
+# -*- coding: utf-8 -*-
+
+"""
+Esquema do banco do Ibex
+- Um único lugar com o DDL de todas as tabelas
+- inicializar_banco(): roda UMA vez na inicialização do programa
+- A versão do esquema fica em PRAGMA user_version; cada migração numerada
+  roda na sua própria transação e só é aplicada se ainda não foi
+"""
+
+import threading
+
+from database.conexao import obter_conexao
+
+# ================================ Migrações ===================================
+# Cada migração recebe um cursor já dentro de uma transação (BEGIN IMMEDIATE).
+# Nunca edite uma migração publicada: crie a próxima.
+
+def _m001_tabelas_iniciais(cur):
+    """Tabelas originais; IF NOT EXISTS para adotar bancos já existentes."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS clientes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            senha TEXT NOT NULL,
+            criado_em TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS empresas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            razao_social TEXT NOT NULL,
+            cnpj TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            senha TEXT NOT NULL,
+            criado_em TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS produtos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            empresa_id INTEGER,
+            nome TEXT NOT NULL,
+            preco REAL NOT NULL,
+            estoque INTEGER NOT NULL DEFAULT 0,
+            criado_em TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    # carrinho_temp: rascunho por cliente
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS carrinho_temp (
+            cliente_id INTEGER NOT NULL,
+            produto_id INTEGER NOT NULL,
+            qtd INTEGER NOT NULL,
+            UNIQUE (cliente_id, produto_id)
+        );
+    """)
+    # carrinho: destino final (cada item finalizado vira uma linha)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS carrinho (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cliente_id INTEGER NOT NULL,
+            produto_id INTEGER NOT NULL,
+            qtd INTEGER NOT NULL,
+            preco_unit REAL NOT NULL,
+            total_item REAL NOT NULL,
+            cep TEXT NOT NULL,
+            numero TEXT NOT NULL,
+            pedido_codigo TEXT NOT NULL,
+            criado_em TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+
+def _m002_indices_carrinho_produtos(cur):
+    """
+    Índices para os filtros de pedidos.py e relatorio.py:
+    - carrinho por cliente (resumo/detalhes do cliente), cobrindo as colunas
+      agregadas para não voltar à tabela;
+    - carrinho por produto (junção com produtos nos relatórios e pedidos da
+      empresa), cobrindo pedido/qtd/total;
+    - carrinho por código de pedido (detalhes do pedido da empresa);
+    - produtos por empresa + nome (filtro e ORDER BY nome).
+    """
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_carrinho_cliente_pedido
+        ON carrinho (cliente_id, pedido_codigo, criado_em, qtd, total_item, cep, numero);
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_carrinho_produto
+        ON carrinho (produto_id, pedido_codigo, qtd, total_item);
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_carrinho_pedido
+        ON carrinho (pedido_codigo, produto_id);
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_produtos_empresa_nome
+        ON produtos (empresa_id, nome);
+    """)
+
+def _m003_cabecalho_pedidos(cur):
+    """
+    Pedido deixa de ser só um grupo de linhas com o mesmo 'pedido_codigo':
+    - pedidos: cabeçalho com totais, endereço e data, gravado no checkout;
+    - pedidos_empresas: itens/valor do pedido por empresa (tela da empresa);
+    - carrinho.pedido_id: chave inteira para o cabeçalho.
+    Preenche tudo a partir das linhas já existentes em 'carrinho'.
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS pedidos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            codigo TEXT NOT NULL UNIQUE,
+            cliente_id INTEGER NOT NULL,
+            total_itens INTEGER NOT NULL,
+            total_valor REAL NOT NULL,
+            cep TEXT NOT NULL,
+            numero TEXT NOT NULL,
+            criado_em TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_pedidos_cliente ON pedidos (cliente_id);")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS pedidos_empresas (
+            empresa_id INTEGER NOT NULL,
+            pedido_id INTEGER NOT NULL REFERENCES pedidos (id),
+            total_itens INTEGER NOT NULL,
+            total_valor REAL NOT NULL,
+            PRIMARY KEY (empresa_id, pedido_id)
+        ) WITHOUT ROWID;
+    """)
+    cur.execute("ALTER TABLE carrinho ADD COLUMN pedido_id INTEGER REFERENCES pedidos (id);")
+
+    # Backfill: um cabeçalho por pedido_codigo, na ordem em que foram criados.
+    cur.execute("""
+        INSERT INTO pedidos (codigo, cliente_id, total_itens, total_valor, cep, numero, criado_em)
+        SELECT pedido_codigo, MAX(cliente_id), SUM(qtd), SUM(total_item),
+               MAX(cep), MAX(numero), MAX(criado_em)
+        FROM carrinho
+        GROUP BY pedido_codigo
+        ORDER BY MIN(id);
+    """)
+    cur.execute("""
+        UPDATE carrinho
+        SET pedido_id = (SELECT id FROM pedidos WHERE codigo = carrinho.pedido_codigo);
+    """)
+    cur.execute("""
+        INSERT INTO pedidos_empresas (empresa_id, pedido_id, total_itens, total_valor)
+        SELECT p.empresa_id, c.pedido_id, SUM(c.qtd), SUM(c.total_item)
+        FROM carrinho c
+        JOIN produtos p ON p.id = c.produto_id
+        WHERE p.empresa_id IS NOT NULL
+        GROUP BY p.empresa_id, c.pedido_id;
+    """)
+
+    # Os índices por código/cliente em carrinho só serviam ao GROUP BY antigo.
+    cur.execute("DROP INDEX IF EXISTS idx_carrinho_cliente_pedido;")
+    cur.execute("DROP INDEX IF EXISTS idx_carrinho_pedido;")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_carrinho_pedido_id ON carrinho (pedido_id);")
+
+def _m004_totais_de_vendas(cur):
+    """
+    Totais de vendas por produto e por empresa, mantidos no checkout
+    (ver agregados.py) para o relatório de vendas não reagregar 'carrinho'.
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS vendas_produto (
+            produto_id INTEGER PRIMARY KEY,
+            empresa_id INTEGER,
+            qtd_total INTEGER NOT NULL DEFAULT 0,
+            receita REAL NOT NULL DEFAULT 0
+        );
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_vendas_produto_empresa
+        ON vendas_produto (empresa_id, receita);
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS vendas_empresa (
+            empresa_id INTEGER PRIMARY KEY,
+            total_pedidos INTEGER NOT NULL DEFAULT 0,
+            receita_total REAL NOT NULL DEFAULT 0
+        );
+    """)
+    cur.execute("""
+        INSERT INTO vendas_produto (produto_id, empresa_id, qtd_total, receita)
+        SELECT c.produto_id, p.empresa_id, SUM(c.qtd), SUM(c.total_item)
+        FROM carrinho c
+        JOIN produtos p ON p.id = c.produto_id
+        GROUP BY c.produto_id;
+    """)
+    cur.execute("""
+        INSERT INTO vendas_empresa (empresa_id, total_pedidos, receita_total)
+        SELECT p.empresa_id, COUNT(DISTINCT c.pedido_codigo), SUM(c.total_item)
+        FROM carrinho c
+        JOIN produtos p ON p.id = c.produto_id
+        WHERE p.empresa_id IS NOT NULL
+        GROUP BY p.empresa_id;
+    """)
+
+def _m005_indice_produtos_nome(cur):
+    """
+    Navegação do catálogo por páginas (api.pagina_produtos): chave (nome, id)
+    sem filtro de empresa. Com filtro, idx_produtos_empresa_nome já serve.
+    """
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_produtos_nome ON produtos (nome);")
+
+def _m006_busca_produtos(cur):
+    """
+    Busca por nome (api.buscar_produtos): índice FTS5 sobre produtos.nome.
+    - content='produtos': o índice não guarda cópia do texto, só os termos;
+    - unicode61 remove_diacritics 2: "tijolo" acha "Tijólo", "argamassa" acha
+      "ARGAMASSA";
+    - prefix '2 3': consultas por prefixo curto ("cim*") usam índice próprio;
+    - gatilhos mantêm o índice em dia com INSERT/UPDATE/DELETE em produtos.
+    """
+    cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS produtos_fts USING fts5(
+            nome,
+            content = 'produtos',
+            content_rowid = 'id',
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        );
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS produtos_fts_ai AFTER INSERT ON produtos BEGIN
+            INSERT INTO produtos_fts (rowid, nome) VALUES (new.id, new.nome);
+        END;
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS produtos_fts_ad AFTER DELETE ON produtos BEGIN
+            INSERT INTO produtos_fts (produtos_fts, rowid, nome) VALUES ('delete', old.id, old.nome);
+        END;
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS produtos_fts_au AFTER UPDATE OF nome ON produtos BEGIN
+            INSERT INTO produtos_fts (produtos_fts, rowid, nome) VALUES ('delete', old.id, old.nome);
+            INSERT INTO produtos_fts (rowid, nome) VALUES (new.id, new.nome);
+        END;
+    """)
+    # Indexa os produtos já cadastrados.
+    cur.execute("INSERT INTO produtos_fts (produtos_fts) VALUES ('rebuild');")
+
+def _m007_versao_catalogo(cur):
+    """
+    Contador de alterações do catálogo para o cache (cache.py): qualquer
+    INSERT/UPDATE/DELETE em produtos, de qualquer processo, soma 1.
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS versao_catalogo (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            versao INTEGER NOT NULL
+        );
+    """)
+    cur.execute("INSERT OR IGNORE INTO versao_catalogo (id, versao) VALUES (1, 0);")
+    for evento in ("INSERT", "UPDATE", "DELETE"):
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS produtos_versao_{evento.lower()}
+            AFTER {evento} ON produtos BEGIN
+                UPDATE versao_catalogo SET versao = versao + 1 WHERE id = 1;
+            END;
+        """)
+
+def _m008_codigo_produto(cur):
+    """
+    Código do produto no catálogo do fornecedor (SKU), usado pela importação
+    em lote (importacao.py) para atualizar em vez de duplicar. Opcional:
+    produtos cadastrados pelo menu continuam sem código.
+    """
+    cur.execute("ALTER TABLE produtos ADD COLUMN codigo TEXT;")
+    cur.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_produtos_empresa_codigo
+        ON produtos (empresa_id, codigo) WHERE codigo IS NOT NULL;
+    """)
+
+def _m009_sessoes(cur):
+    """
+    Sessões de login persistidas (sessoes.py com IBEX_SESSOES_PERSISTIR=1):
+    sobrevivem a reinício e valem em qualquer processo do mesmo banco.
+    Guarda o SHA-256 do token, nunca o token; expira_em indexado para a
+    limpeza das vencidas.
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS sessoes (
+            token_hash TEXT PRIMARY KEY,
+            tipo TEXT NOT NULL CHECK (tipo IN ('cliente', 'empresa')),
+            usuario_id INTEGER NOT NULL,
+            nome TEXT,
+            expira_em REAL NOT NULL
+        ) WITHOUT ROWID;
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sessoes_expira ON sessoes (expira_em);")
+
+def _definicoes(corpo):
+    """Corpo de um CREATE TABLE -> definições de coluna/restrição (vírgulas do nível de cima)."""
+    partes, atual, nivel, aspas = [], [], 0, None
+    for ch in corpo:
+        if aspas:
+            aspas = None if ch == aspas else aspas
+        elif ch in "'\"":
+            aspas = ch
+        elif ch == "(":
+            nivel += 1
+        elif ch == ")":
+            nivel -= 1
+        elif ch == "," and nivel == 0:
+            partes.append("".join(atual).strip())
+            atual = []
+            continue
+        atual.append(ch)
+    partes.append("".join(atual).strip())
+    return partes
+
+def _remover_colunas(cur, tabela, colunas):
+    """
+    Tira 'colunas' de 'tabela' recriando-a, sem ALTER TABLE ... DROP COLUMN
+    (só existe no SQLite 3.35+): nova tabela sem as colunas, INSERT ...
+    SELECT, DROP da antiga, RENAME da nova e os índices/gatilhos da tabela
+    recriados. As colunas não podem estar em índice, gatilho ou restrição
+    de tabela. Precisa de foreign_keys desligado (aplicar_migracoes): o
+    DROP apagaria as linhas "pais" das chaves estrangeiras que apontam
+    para ela. As linhas voltam com os mesmos ids, então as referências
+    continuam valendo.
+    """
+    sql = cur.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?;",
+                      (tabela,)).fetchone()[0]
+    abre, fecha = sql.index("("), sql.rindex(")")
+    definicoes = [d for d in _definicoes(sql[abre + 1:fecha]) if d.split()[0].strip('"`[]') not in colunas]
+    mantidas = ", ".join(row[1] for row in cur.execute(f"PRAGMA table_info({tabela});")
+                         if row[1] not in colunas)
+    dependentes = [row[0] for row in cur.execute("""
+        SELECT sql FROM sqlite_master
+        WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL;
+    """, (tabela,))]
+    sequencia = cur.execute("SELECT seq FROM sqlite_sequence WHERE name = ?;", (tabela,)).fetchone()
+
+    # Sem isto, o RENAME confere gatilhos/visões que citam a tabela no
+    # intervalo em que ela não existe (SQLite 3.26+).
+    cur.execute("PRAGMA legacy_alter_table = ON;")
+    try:
+        cur.execute(f"CREATE TABLE {tabela}__nova ({', '.join(definicoes)}){sql[fecha + 1:]};")
+        cur.execute(f"INSERT INTO {tabela}__nova ({mantidas}) SELECT {mantidas} FROM {tabela};")
+        cur.execute(f"DROP TABLE {tabela};")
+        cur.execute(f"ALTER TABLE {tabela}__nova RENAME TO {tabela};")
+    finally:
+        cur.execute("PRAGMA legacy_alter_table = OFF;")
+    if sequencia is not None:
+        # AUTOINCREMENT: ids de linhas apagadas continuam sem reuso.
+        cur.execute("DELETE FROM sqlite_sequence WHERE name = ?;", (tabela,))
+        cur.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?);", (tabela, sequencia[0]))
+    for ddl in dependentes:
+        cur.execute(ddl)
+
+# (tabela, coluna REAL em reais) que passam a centavos inteiros em <coluna>_centavos.
+_COLUNAS_DINHEIRO = [
+    ("produtos", "preco"),
+    ("carrinho", "preco_unit"),
+    ("carrinho", "total_item"),
+    ("pedidos", "total_valor"),
+    ("pedidos_empresas", "total_valor"),
+    ("vendas_produto", "receita"),
+    ("vendas_empresa", "receita_total"),
+]
+
+def _m010_dinheiro_em_centavos(cur):
+    """
+    Preços e totais em centavos inteiros (ver dinheiro.py): cada coluna REAL
+    em reais vira <coluna>_centavos INTEGER, arredondada ao centavo, e a
+    antiga sai. O nome novo faz SQL que ainda espere reais falhar em vez de
+    somar valores 100× maiores. Os índices que cobriam as colunas antigas
+    são recriados sobre as novas. A coluna antiga sai recriando a tabela
+    (_remover_colunas), que roda em qualquer versão do SQLite.
+    """
+    cur.execute("DROP INDEX IF EXISTS idx_carrinho_produto;")
+    cur.execute("DROP INDEX IF EXISTS idx_vendas_produto_empresa;")
+    removidas = {}
+    for tabela, coluna in _COLUNAS_DINHEIRO:
+        cur.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna}_centavos INTEGER NOT NULL DEFAULT 0;")
+        cur.execute(f"UPDATE {tabela} SET {coluna}_centavos = CAST(ROUND({coluna} * 100) AS INTEGER);")
+        removidas.setdefault(tabela, []).append(coluna)
+    for tabela, colunas in removidas.items():
+        _remover_colunas(cur, tabela, colunas)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_carrinho_produto
+        ON carrinho (produto_id, pedido_codigo, qtd, total_item_centavos);
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_vendas_produto_empresa
+        ON vendas_produto (empresa_id, receita_centavos);
+    """)
+
+def _m011_reservas(cur):
+    """
+    Reservas de estoque do carrinho (reservas.py): quanto de cada produto
+    está preso no carrinho de cada cliente e até quando. O disponível de um
+    produto é estoque menos as reservas ainda válidas de outros clientes.
+    - idx_reservas_produto: soma das reservas válidas de um produto sem ler
+      a tabela (cobre produto_id, expira_em, qtd);
+    - idx_reservas_expira: a varredura das vencidas lê só o começo do índice.
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS reservas (
+            cliente_id INTEGER NOT NULL,
+            produto_id INTEGER NOT NULL,
+            qtd INTEGER NOT NULL CHECK (qtd > 0),
+            expira_em REAL NOT NULL,
+            PRIMARY KEY (cliente_id, produto_id)
+        ) WITHOUT ROWID;
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_reservas_produto ON reservas (produto_id, expira_em, qtd);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_reservas_expira ON reservas (expira_em);")
+
+def _m012_indice_pedidos_data(cur):
+    """
+    Pedidos por data (criado_em): o arquivamento (arquivo.py) percorre os
+    pedidos anteriores a uma data de corte sem ler a tabela inteira.
+    """
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_pedidos_criado ON pedidos (criado_em);")
+
+def _m013_vendas_por_dia(cur):
+    """
+    Vendas por dia (empresa, produto, dia UTC de carrinho.criado_em), mantidas
+    no checkout (ver agregados.py) para os relatórios por período somarem no
+    máximo uma linha por produto e dia em vez de reler 'carrinho'.
+    - PK (empresa_id, produto_id, dia): série de um produto;
+    - idx_vendas_dia_periodo (empresa_id, dia, ...): faixa de datas da
+      empresa, cobrindo qtd e receita.
+    Preenche a partir de 'carrinho'. Itens já arquivados (arquivo.py) entram
+    com "python main.py agregados reconstruir".
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS vendas_dia (
+            empresa_id INTEGER NOT NULL,
+            produto_id INTEGER NOT NULL,
+            dia TEXT NOT NULL,
+            qtd INTEGER NOT NULL DEFAULT 0,
+            receita_centavos INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (empresa_id, produto_id, dia)
+        ) WITHOUT ROWID;
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_vendas_dia_periodo
+        ON vendas_dia (empresa_id, dia, produto_id, qtd, receita_centavos);
+    """)
+    cur.execute("""
+        INSERT INTO vendas_dia (empresa_id, produto_id, dia, qtd, receita_centavos)
+        SELECT p.empresa_id, c.produto_id, date(c.criado_em), SUM(c.qtd), SUM(c.total_item_centavos)
+        FROM carrinho c
+        JOIN produtos p ON p.id = c.produto_id
+        WHERE p.empresa_id IS NOT NULL
+        GROUP BY p.empresa_id, c.produto_id, date(c.criado_em);
+    """)
+
+def _m014_versao_carrinho(cur):
+    """
+    Versão do carrinho de cada cliente, somada por gatilho a cada linha
+    inserida, alterada ou apagada em carrinho_temp (por qualquer processo).
+    carrinho_memoria.py compara com a versão que carregou e relê o
+    carrinho quando outro processo mexeu nele.
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS carrinho_versao (
+            cliente_id INTEGER PRIMARY KEY,
+            versao INTEGER NOT NULL
+        );
+    """)
+    for evento, linha in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS carrinho_versao_{evento.lower()}
+            AFTER {evento} ON carrinho_temp BEGIN
+                INSERT INTO carrinho_versao (cliente_id, versao) VALUES ({linha}.cliente_id, 1)
+                ON CONFLICT(cliente_id) DO UPDATE SET versao = versao + 1;
+            END;
+        """)
+
+# (versão, função). As versões precisam ser 1, 2, 3... sem buracos.
+MIGRACOES = [
+    (1, _m001_tabelas_iniciais),
+    (2, _m002_indices_carrinho_produtos),
+    (3, _m003_cabecalho_pedidos),
+    (4, _m004_totais_de_vendas),
+    (5, _m005_indice_produtos_nome),
+    (6, _m006_busca_produtos),
+    (7, _m007_versao_catalogo),
+    (8, _m008_codigo_produto),
+    (9, _m009_sessoes),
+    (10, _m010_dinheiro_em_centavos),
+    (11, _m011_reservas),
+    (12, _m012_indice_pedidos_data),
+    (13, _m013_vendas_por_dia),
+    (14, _m014_versao_carrinho),
+]
+
+VERSAO_ATUAL = MIGRACOES[-1][0]
+
+# ============================== Aplicação =====================================
+
+def versao_banco(con):
+    """Lê a versão de esquema gravada no arquivo (PRAGMA user_version)."""
+    return con.execute("PRAGMA user_version;").fetchone()[0]
+
+def aplicar_migracoes(con):
+    """
+    Aplica, em ordem, as migrações ainda não aplicadas neste banco.
+    Retorna a lista de versões aplicadas (vazia se já estava atualizado).
+    """
+    if versao_banco(con) >= VERSAO_ATUAL:
+        return []
+
+    aplicadas = []
+    # Fora de transação (não muda dentro de uma): migrações que recriam
+    # tabelas (_remover_colunas) precisam das chaves estrangeiras desligadas.
+    con.execute("PRAGMA foreign_keys = OFF;")
+    try:
+        for versao, migracao in MIGRACOES:
+            con.execute("BEGIN IMMEDIATE;")
+            try:
+                # Relê dentro do lock: outro processo pode ter migrado antes.
+                if versao_banco(con) >= versao:
+                    con.rollback()
+                    continue
+                migracao(con.cursor())
+                con.execute(f"PRAGMA user_version = {int(versao)};")
+                con.commit()
+            except BaseException:
+                con.rollback()
+                raise
+            aplicadas.append(versao)
+    finally:
+        con.execute("PRAGMA foreign_keys = ON;")
+    return aplicadas
+
+_inicializados = set()
+_lock = threading.Lock()
+
+def inicializar_banco():
+    """
+    Garante o esquema atualizado no banco configurado. Feito uma vez por
+    processo; chamadas seguintes não tocam no banco.
+    """
+    with obter_conexao() as con:
+        chave = con.execute("PRAGMA database_list;").fetchone()[2]
+        if chave in _inicializados:
+            return []
+        with _lock:
+            if chave in _inicializados:
+                return []
+            aplicadas = aplicar_migracoes(con)
+            _inicializados.add(chave)
+    return aplicadas
@@ -0,0 +1,259 @@
+# ibex/database/rastreio.py
+# -*- coding: utf-8 -*-
+
+"""
+Rastreio de SQL para diagnóstico (desligado por padrão)
+- IBEX_TRACE_SQL=1: conectar() e o pool abrem conexões instrumentadas;
+  cada comando registra tempo, linhas (lidas no SELECT, alteradas nos
+  demais), passos da VM do SQLite (progress handler) e a função do
+  projeto que o executou (ex.: pedidos._listar_resumo_pedidos_empresa)
+- Comandos acima de IBEX_SQL_LENTO_MS (padrão 100; 0 = todos) vão para o
+  log de lentos com os parâmetros já no SQL (trace callback) — o log
+  traz emails e outros dados dos parâmetros, é só para diagnóstico
+- Ao sair do processo, imprime o resumo por (consulta, função):
+  execuções, tempo total, médio e máximo, linhas; maior total primeiro
+- IBEX_SQL_LOG=arquivo manda log e resumo para o arquivo (senão, stderr)
+- O tempo de um SELECT soma o execute e as leituras (fetch/iteração),
+  não o processamento entre elas; o comando fecha quando o cursor se
+  esgota, é reexecutado, fechado ou descartado
+"""
+
+import atexit
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+LENTO_MS_PADRAO = 100
+# O progress handler roda a cada N instruções da VM (passos ≈ chamadas × N).
+PASSOS_POR_CHAMADA = 1_000
+# Consultas no resumo (as de maior tempo total).
+LIMITE_RESUMO = 25
+TAMANHO_SQL_LOG = 500
+
+# Frames que não contam como "quem chamou" (a própria instrumentação, o
+# pool e os context managers).
+_PULAR = {os.path.abspath(__file__), os.path.join(os.path.dirname(os.path.abspath(__file__)), "conexao.py")}
+
+def _chamador():
+    frame = sys._getframe(2)
+    while frame is not None:
+        arquivo = frame.f_code.co_filename
+        if os.path.abspath(arquivo) not in _PULAR and not arquivo.endswith("contextlib.py"):
+            modulo = frame.f_globals.get("__name__", "?")
+            # co_qualname (Classe.metodo) só existe no Python 3.11+.
+            return f"{modulo}.{getattr(frame.f_code, 'co_qualname', frame.f_code.co_name)}"
+        frame = frame.f_back
+    return "?"
+
+def _normalizar(sql):
+    return " ".join(sql.split())
+
+# ================================ Coleta ======================================
+
+class Rastreador:
+    """Agrega os comandos por (consulta, função) e escreve o log de lentos."""
+
+    def __init__(self, lento_ms=LENTO_MS_PADRAO, saida=None):
+        self.lento = lento_ms / 1000
+        self._saida = saida
+        self._lock = threading.Lock()
+        # (consulta, função) -> [execuções, total_s, máximo_s, linhas, passos]
+        self._agregado = {}
+
+    def _escrever(self, texto):
+        with self._lock:
+            if self._saida:
+                with open(self._saida, "a", encoding="utf-8") as f:
+                    f.write(texto + "\n")
+            else:
+                print(texto, file=sys.stderr, flush=True)
+
+    def registrar(self, sql, chamador, segundos, linhas, passos, expandido=None):
+        chave = (_normalizar(sql), chamador)
+        with self._lock:
+            a = self._agregado.get(chave)
+            if a is None:
+                a = self._agregado[chave] = [0, 0.0, 0.0, 0, 0]
+            a[0] += 1
+            a[1] += segundos
+            a[2] = max(a[2], segundos)
+            a[3] += linhas
+            a[4] += passos
+        if segundos >= self.lento:
+            texto = _normalizar(expandido or sql)[:TAMANHO_SQL_LOG]
+            self._escrever(f"[SQL lento] {segundos * 1000:.1f} ms  linhas={linhas}  "
+                           f"passos≈{passos:,}  {chamador}: {texto}")
+
+    def resumo(self, limite=LIMITE_RESUMO):
+        """Texto do resumo por consulta, do maior tempo total para o menor."""
+        with self._lock:
+            itens = sorted(self._agregado.items(), key=lambda kv: kv[1][1], reverse=True)
+        if not itens:
+            return "== SQL: nenhum comando registrado =="
+        execucoes = sum(a[0] for _, a in itens)
+        total = sum(a[1] for _, a in itens)
+        linhas = [f"== SQL: {execucoes:,} comandos, {total * 1000:,.1f} ms "
+                  f"em {len(itens)} consultas (mais caras primeiro) ==",
+                  f"{'total ms':>10} {'execs':>7} {'média ms':>9} {'máx ms':>8} {'linhas':>9}  função | consulta"]
+        for (sql, chamador), (n, soma, maximo, qtd, _) in itens[:limite]:
+            linhas.append(f"{soma * 1000:>10.1f} {n:>7,} {soma / n * 1000:>9.3f} {maximo * 1000:>8.1f} "
+                          f"{qtd:>9,}  {chamador} | {sql[:120]}")
+        if len(itens) > limite:
+            linhas.append(f"... e mais {len(itens) - limite} consultas")
+        return "\n".join(linhas)
+
+    def limpar(self):
+        with self._lock:
+            self._agregado.clear()
+
+# ============================ Conexão e cursor ================================
+
+class _CursorRastreado(sqlite3.Cursor):
+    """Cursor que mede cada comando até o fim da leitura das linhas."""
+
+    _comando = None     # [sql, chamador, segundos, linhas_lidas, passos_inicio, expandido]
+
+    def _iniciar(self, sql):
+        self._fechar_comando()
+        con = self.connection
+        con._expandido = None
+        self._comando = [sql, _chamador(), 0.0, 0, con._passos, None]
+
+    def _medir(self, operacao, *args):
+        t0 = time.perf_counter()
+        try:
+            return operacao(*args)
+        finally:
+            if self._comando is not None:
+                self._comando[2] += time.perf_counter() - t0
+                if self._comando[5] is None:
+                    self._comando[5] = self.connection._expandido
+
+    def _fechar_comando(self):
+        comando, self._comando = self._comando, None
+        if comando is None:
+            return
+        sql, chamador, segundos, lidas, passos0, expandido = comando
+        con = self.connection
+        linhas = self.rowcount if self.rowcount >= 0 else lidas
+        con._rastreador.registrar(sql, chamador, segundos, linhas,
+                                  (con._passos - passos0) * PASSOS_POR_CHAMADA, expandido)
+
+    def _lidas(self, n):
+        if self._comando is not None:
+            self._comando[3] += n
+
+    def execute(self, sql, parameters=()):
+        self._iniciar(sql)
+        return self._medir(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._iniciar(sql)
+        return self._medir(super().executemany, sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        self._iniciar(sql_script)
+        resultado = self._medir(super().executescript, sql_script)
+        self._fechar_comando()
+        return resultado
+
+    def fetchone(self):
+        row = self._medir(super().fetchone)
+        if row is None:
+            self._fechar_comando()
+        else:
+            self._lidas(1)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._medir(super().fetchmany, size)
+        self._lidas(len(rows))
+        if len(rows) < size:
+            self._fechar_comando()
+        return rows
+
+    def fetchall(self):
+        rows = self._medir(super().fetchall)
+        self._lidas(len(rows))
+        self._fechar_comando()
+        return rows
+
+    def __next__(self):
+        try:
+            row = self._medir(super().__next__)
+        except StopIteration:
+            self._fechar_comando()
+            raise
+        self._lidas(1)
+        return row
+
+    def close(self):
+        self._fechar_comando()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._fechar_comando()
+        except Exception:
+            pass    # cursor descartado no fim do processo
+
+class ConexaoRastreada(sqlite3.Connection):
+    """
+    sqlite3.Connection cujos cursores (inclusive os de con.execute) são
+    medidos. Criada por conexao._abrir() quando o rastreio está ligado.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._rastreador = rastreador
+        self._passos = 0
+        self._expandido = None
+        self.set_trace_callback(self._trace)
+        self.set_progress_handler(self._progresso, PASSOS_POR_CHAMADA)
+
+    def _trace(self, sql):
+        # O primeiro comando de cada execute, menos o BEGIN implícito do
+        # módulo sqlite3; os disparados por triggers vêm depois.
+        if self._expandido is None and sql != "BEGIN ":
+            self._expandido = sql
+
+    def _progresso(self):
+        self._passos += 1
+        return 0
+
+    def cursor(self, factory=_CursorRastreado):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+# ================================ Ativação ====================================
+
+rastreador = None
+
+def ativar(lento_ms=LENTO_MS_PADRAO, saida=None, resumo_ao_sair=True):
+    """
+    Liga o rastreio para as conexões abertas daqui em diante (as já
+    abertas seguem sem). Devolve o Rastreador.
+    """
+    global rastreador
+    rastreador = Rastreador(lento_ms, saida)
+    if resumo_ao_sair:
+        atexit.register(lambda r=rastreador: r._escrever(r.resumo()))
+    return rastreador
+
+def ativo():
+    return rastreador is not None
+
+if os.environ.get("IBEX_TRACE_SQL") == "1":
+    ativar(float(os.environ.get("IBEX_SQL_LENTO_MS", LENTO_MS_PADRAO)),
+           os.environ.get("IBEX_SQL_LOG") or None)
@@ -0,0 +1,111 @@
+# ibex/dinheiro.py
+# -*- coding: utf-8 -*-
+
+"""
+Valores em dinheiro como centavos inteiros
+- O banco guarda preços e totais em colunas *_centavos INTEGER (migração
+  10): SUM() no SQLite é soma de inteiros, exata em qualquer volume
+- Dinheiro é um int (os centavos) que se apresenta em reais: str() dá
+  "19.90", f"{v:.2f}" formata os reais, float(v) dá 19.9. Vai direto como
+  parâmetro de SQL (é int) e sai do banco com Dinheiro(coluna)
+- Soma/subtração entre valores (um int comum conta como centavos) e
+  multiplicação por quantidade (int) ficam em centavos; multiplicar por
+  Decimal (reajuste %) arredonda meio para cima. Misturar com float é
+  TypeError: converta com Dinheiro.de_reais()
+"""
+
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+_CENTAVOS = Decimal(100)
+_UM_CENTAVO = Decimal("0.01")
+
+class Dinheiro(int):
+    """Valor em centavos. Dinheiro(1990) == R$ 19,90."""
+
+    __slots__ = ()
+
+    @classmethod
+    def de_reais(cls, valor):
+        """
+        Reais (int, float, Decimal ou texto "19.90"/"19,90") -> Dinheiro,
+        arredondando ao centavo. ValueError se não for um número finito.
+        """
+        if isinstance(valor, Dinheiro):
+            return valor
+        if isinstance(valor, bool):
+            raise ValueError(f"Valor inválido: {valor!r}")
+        try:
+            # str() no float: 19.9 vira Decimal("19.9"), não 19.899999...
+            numero = Decimal(str(valor).strip().replace(",", "."))
+        except (InvalidOperation, ValueError):
+            raise ValueError(f"Valor inválido: {valor!r}") from None
+        if not numero.is_finite():
+            raise ValueError(f"Valor inválido: {valor!r}")
+        return cls((numero * _CENTAVOS).to_integral_value(ROUND_HALF_UP))
+
+    @property
+    def reais(self):
+        """Decimal com duas casas (ex.: Decimal('19.90'))."""
+        return (Decimal(int(self)) / _CENTAVOS).quantize(_UM_CENTAVO)
+
+    # ----------------------------------------------------------- aritmética
+
+    def __add__(self, outro):
+        if isinstance(outro, int):
+            return Dinheiro(int(self) + int(outro))
+        if isinstance(outro, float):
+            raise TypeError("Dinheiro + float: converta com Dinheiro.de_reais().")
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, outro):
+        if isinstance(outro, int):
+            return Dinheiro(int(self) - int(outro))
+        if isinstance(outro, float):
+            raise TypeError("Dinheiro - float: converta com Dinheiro.de_reais().")
+        return NotImplemented
+
+    def __rsub__(self, outro):
+        if isinstance(outro, int):
+            return Dinheiro(int(outro) - int(self))
+        if isinstance(outro, float):
+            raise TypeError("float - Dinheiro: converta com Dinheiro.de_reais().")
+        return NotImplemented
+
+    def __neg__(self):
+        return Dinheiro(-int(self))
+
+    def __mul__(self, fator):
+        if isinstance(fator, Dinheiro):
+            raise TypeError("Dinheiro × Dinheiro não faz sentido.")
+        if isinstance(fator, int):
+            return Dinheiro(int(self) * fator)
+        if isinstance(fator, Decimal):
+            return Dinheiro((int(self) * fator).to_integral_value(ROUND_HALF_UP))
+        if isinstance(fator, float):
+            raise TypeError("Dinheiro × float: use int (quantidade) ou Decimal.")
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    # ---------------------------------------------------------- apresentação
+
+    def __float__(self):
+        return int(self) / 100
+
+    def __str__(self):
+        sinal = "-" if self < 0 else ""
+        reais, centavos = divmod(abs(int(self)), 100)
+        return f"{sinal}{reais}.{centavos:02d}"
+
+    def __repr__(self):
+        return f"Dinheiro('{self}')"
+
+    def __format__(self, especificacao):
+        # "d" (ou vazio) como um int daria os centavos; o resto formata reais.
+        if especificacao.endswith("d"):
+            return format(int(self), especificacao)
+        if not especificacao:
+            return str(self)
+        return format(self.reais, especificacao)
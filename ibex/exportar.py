@@ -0,0 +1,55 @@
+# ibex/exportar.py
+# -*- coding: utf-8 -*-
+
+"""
+Exportação de relatórios em streaming
+- exportar_csv(linhas, destino): CSV com cabeçalho
+- exportar_ndjson(linhas, destino): um objeto JSON por linha
+- 'linhas' é qualquer iterável de NamedTuple (ex.: relatorio.linhas_vendas);
+  cada linha é escrita assim que chega, então a memória não cresce com o
+  tamanho do relatório
+"""
+
+import csv
+import json
+
+from dinheiro import Dinheiro
+
+def exportar_csv(linhas, destino, campos=None):
+    """Escreve 'linhas' em 'destino' (arquivo texto) como CSV. Retorna quantas linhas."""
+    escritor = None
+    n = 0
+    for linha in linhas:
+        if escritor is None:
+            escritor = csv.writer(destino)
+            escritor.writerow(campos or linha._fields)
+        escritor.writerow(linha)
+        n += 1
+    if escritor is None and campos:
+        csv.writer(destino).writerow(campos)
+    return n
+
+def exportar_ndjson(linhas, destino, campos=None):
+    """Escreve 'linhas' em 'destino' como NDJSON (JSON por linha). Retorna quantas linhas."""
+    n = 0
+    for linha in linhas:
+        chaves = campos or linha._fields
+        # Dinheiro é int (centavos): no JSON vai em reais, como no CSV.
+        objeto = {k: float(v) if isinstance(v, Dinheiro) else v for k, v in zip(chaves, linha)}
+        destino.write(json.dumps(objeto, ensure_ascii=False))
+        destino.write("\n")
+        n += 1
+    return n
+
+FORMATOS = {
+    "csv": exportar_csv,
+    "ndjson": exportar_ndjson,
+}
+
+def exportar(linhas, destino, formato="csv", campos=None):
+    """Despacha para o exportador do 'formato' ('csv' ou 'ndjson')."""
+    try:
+        funcao = FORMATOS[formato]
+    except KeyError:
+        raise ValueError(f"Formato desconhecido: {formato!r} (use {', '.join(FORMATOS)})")
+    return funcao(linhas, destino, campos)
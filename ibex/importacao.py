@@ -0,0 +1,220 @@
+# ibex/importacao.py
+# -*- coding: utf-8 -*-
+
+"""
+Importação de produtos em lote a partir de CSV
+- Lê o arquivo linha a linha (nunca carrega o arquivo inteiro)
+- Colunas pelo cabeçalho: nome, preco, estoque e, opcional, codigo (SKU)
+  Separador ',' ou ';' (detectado pelo cabeçalho); preço aceita "19,90",
+  "19.90" e "1.234,56"; "1,234.56", "1.234" e "1,234" são ambíguos e a
+  linha é rejeitada
+- Linhas válidas vão em lotes de TAMANHO_LOTE por executemany, um commit
+  por lote; com código, é upsert (ON CONFLICT (empresa_id, codigo)):
+  produto já importado é atualizado em vez de duplicado
+- Linhas inválidas não param a importação: vão para o relatório de
+  rejeitadas (e para um CSV, se pedido) com o número da linha e o motivo
+
+Uso:
+    python main.py importar 3 catalogo.csv --rejeitados rejeitados.csv
+"""
+
+import csv
+import re
+import time
+from decimal import Decimal, InvalidOperation
+from typing import NamedTuple
+
+from database.conexao import obter_conexao, transacao
+from api import DadosInvalidos, NaoEncontrado
+import cache
+from dinheiro import Dinheiro
+
+TAMANHO_LOTE = 10_000
+# Quantas rejeições ficam no resultado (o arquivo de rejeitadas tem todas).
+AMOSTRA_REJEICOES = 20
+
+TAMANHO_MAXIMO_NOME = 200
+TAMANHO_MAXIMO_CODIGO = 64
+
+# Nomes de coluna aceitos no cabeçalho -> campo.
+_COLUNAS = {
+    "codigo": "codigo", "código": "codigo", "sku": "codigo",
+    "nome": "nome", "produto": "nome", "descricao": "nome", "descrição": "nome",
+    "preco": "preco", "preço": "preco", "valor": "preco",
+    "estoque": "estoque", "quantidade": "estoque", "qtd": "estoque",
+}
+_OBRIGATORIAS = ("nome", "preco", "estoque")
+# Um só separador seguido de exatamente 3 dígitos: milhar ou decimal?
+_MILHAR = re.compile(r"[.,]\d{3}$")
+
+SQL_UPSERT_PRODUTO = """
+    INSERT INTO produtos (empresa_id, codigo, nome, preco_centavos, estoque)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (empresa_id, codigo) WHERE codigo IS NOT NULL DO UPDATE SET
+        nome = excluded.nome,
+        preco_centavos = excluded.preco_centavos,
+        estoque = excluded.estoque;
+"""
+
+class Rejeicao(NamedTuple):
+    linha: int
+    motivo: str
+    dados: list
+
+class ResultadoImportacao(NamedTuple):
+    lidas: int
+    inseridas: int
+    atualizadas: int
+    rejeitadas: int
+    segundos: float
+    rejeicoes: list     # amostra (até AMOSTRA_REJEICOES)
+
+    @property
+    def linhas_por_segundo(self):
+        return self.lidas / self.segundos if self.segundos else 0.0
+
+# ================================ Leitura =====================================
+
+def _separador(cabecalho):
+    return ";" if cabecalho.count(";") > cabecalho.count(",") else ","
+
+def _mapear_cabecalho(campos):
+    """Cabeçalho -> {campo: índice da coluna}. Falta de coluna obrigatória = erro."""
+    indices = {}
+    for i, bruto in enumerate(campos):
+        campo = _COLUNAS.get(bruto.strip().lower())
+        if campo and campo not in indices:
+            indices[campo] = i
+    faltando = [c for c in _OBRIGATORIAS if c not in indices]
+    if faltando:
+        raise DadosInvalidos(f"Cabeçalho sem a(s) coluna(s): {', '.join(faltando)}.")
+    return indices
+
+def _validar(campos, indices):
+    """Linha do CSV -> (codigo, nome, preco (Dinheiro), estoque). ValueError com o motivo."""
+    def valor(campo):
+        i = indices.get(campo)
+        return campos[i].strip() if i is not None and i < len(campos) else ""
+
+    nome = valor("nome")
+    if not nome:
+        raise ValueError("nome vazio")
+    if len(nome) > TAMANHO_MAXIMO_NOME:
+        raise ValueError(f"nome com mais de {TAMANHO_MAXIMO_NOME} caracteres")
+
+    texto_preco = valor("preco").replace("R$", "").strip()
+    if "," in texto_preco and "." in texto_preco:
+        if texto_preco.rfind(".") > texto_preco.rfind(","):
+            # 1,234.56: separadores americanos, não adivinha
+            raise ValueError(f"preço ambíguo (use 1234,56): {valor('preco')!r}")
+        # 1.234,56 -> 1234.56
+        texto_preco = texto_preco.replace(".", "").replace(",", ".")
+    elif _MILHAR.search(texto_preco):
+        # 1.234 ou 1,234: mil reais ou um real e 234 milésimos?
+        raise ValueError(f"preço ambíguo (use 1234,00 ou 1,23): {valor('preco')!r}")
+    else:
+        texto_preco = texto_preco.replace(",", ".")
+    try:
+        preco = Decimal(texto_preco)
+    except InvalidOperation:
+        raise ValueError(f"preço inválido: {valor('preco')!r}")
+    if not preco.is_finite() or preco < 0:
+        raise ValueError(f"preço inválido: {valor('preco')!r}")
+
+    try:
+        estoque = int(valor("estoque"))
+    except ValueError:
+        raise ValueError(f"estoque inválido: {valor('estoque')!r}")
+    if estoque < 0:
+        raise ValueError("estoque negativo")
+
+    codigo = valor("codigo") or None
+    if codigo is not None and len(codigo) > TAMANHO_MAXIMO_CODIGO:
+        raise ValueError(f"código com mais de {TAMANHO_MAXIMO_CODIGO} caracteres")
+    return codigo, nome, Dinheiro.de_reais(preco), estoque
+
+def ler_produtos(arquivo, separador=None):
+    """
+    Gera (numero_da_linha, registro, motivo, colunas) para cada linha de
+    dados: registro = (codigo, nome, preco, estoque) se válida; senão None
+    e o motivo.
+    'arquivo' é um arquivo texto aberto (newline="").
+    """
+    primeira = arquivo.readline()
+    if not primeira.strip():
+        raise DadosInvalidos("Arquivo vazio (esperado um cabeçalho).")
+    separador = separador or _separador(primeira)
+    indices = _mapear_cabecalho(next(csv.reader([primeira], delimiter=separador)))
+
+    # csv.reader conta linhas físicas (campo com quebra de linha conta 2).
+    leitor = csv.reader(arquivo, delimiter=separador)
+    for campos in leitor:
+        numero = leitor.line_num + 1
+        if not any(c.strip() for c in campos):
+            continue
+        try:
+            yield numero, _validar(campos, indices), None, campos
+        except ValueError as e:
+            yield numero, None, str(e), campos
+
+# ================================ Gravação ====================================
+
+def _contar_produtos(empresa_id):
+    with obter_conexao() as con:
+        return con.execute("SELECT COUNT(*) FROM produtos WHERE empresa_id = ?;",
+                           (empresa_id,)).fetchone()[0]
+
+def _gravar_lote(empresa_id, lote):
+    with transacao() as con:
+        con.executemany(SQL_UPSERT_PRODUTO, [(empresa_id, *registro) for registro in lote])
+
+def importar_produtos(empresa_id, arquivo, separador=None, lote=TAMANHO_LOTE,
+                      rejeitados=None, progresso=None):
+    """
+    Importa os produtos do CSV 'arquivo' (aberto em modo texto) para a empresa.
+    - rejeitados: arquivo texto aberto para gravar as linhas rejeitadas
+      (linha, motivo, colunas originais), ou None
+    - progresso(lidas): chamado a cada lote gravado
+    Retorna ResultadoImportacao.
+    """
+    with obter_conexao() as con:
+        if con.execute("SELECT 1 FROM empresas WHERE id = ?;", (empresa_id,)).fetchone() is None:
+            raise NaoEncontrado("Empresa não encontrada.")
+    if lote < 1:
+        raise DadosInvalidos("Tamanho do lote deve ser ao menos 1.")
+
+    saida_rejeitados = csv.writer(rejeitados) if rejeitados is not None else None
+    if saida_rejeitados is not None:
+        saida_rejeitados.writerow(["linha", "motivo", "dados"])
+
+    antes = _contar_produtos(empresa_id)
+    t0 = time.perf_counter()
+    lidas, n_rejeitadas, amostra, pendentes = 0, 0, [], []
+    try:
+        for numero, registro, motivo, campos in ler_produtos(arquivo, separador):
+            lidas += 1
+            if registro is None:
+                n_rejeitadas += 1
+                if len(amostra) < AMOSTRA_REJEICOES:
+                    amostra.append(Rejeicao(numero, motivo, campos))
+                if saida_rejeitados is not None:
+                    saida_rejeitados.writerow([numero, motivo, *campos])
+                continue
+            pendentes.append(registro)
+            if len(pendentes) >= lote:
+                _gravar_lote(empresa_id, pendentes)
+                pendentes = []
+                if progresso:
+                    progresso(lidas)
+        if pendentes:
+            _gravar_lote(empresa_id, pendentes)
+            if progresso:
+                progresso(lidas)
+    finally:
+        # Produtos novos e alterados sem id conhecido: o cache recomeça.
+        cache.catalogo.limpar()
+
+    segundos = time.perf_counter() - t0
+    inseridas = _contar_produtos(empresa_id) - antes
+    aceitas = lidas - n_rejeitadas
+    return ResultadoImportacao(lidas, inseridas, aceitas - inseridas, n_rejeitadas, segundos, amostra)
@@ -1,96 +1,63 @@
 # ibex/menus.py
 # ========= Utilitários básicos (limpar tela, pausar, leitura segura) =========
-try:
-    from utilitarios import limpar_tela, pausar, ler_int
-except Exception:
-    
-    import os
-    def limpar_tela():
-        os.system("cls" if os.name == "nt" else "clear")
-
-    def pausar(msg="\nPressione Enter para continuar..."):
-        input(msg)
-
-    def ler_int(prompt="Opção: "):
-        while True:
-            val = input(prompt).strip()
-            if val.isdigit():
-                return int(val)
-            print("Digite um número válido.")
-
-
-# --- Autenticação ---
-try:
-    from autenticacao import (
-        login_cliente, cadastro_cliente, logout_cliente,
-        login_empresa, cadastro_empresa, logout_empresa
-    )
-except Exception:
-    def login_cliente(): print("TODO: login_cliente()"); return None
-    def cadastro_cliente(): print("TODO: cadastro_cliente()"); return None
-    def logout_cliente(sessao): print("TODO: logout_cliente()")
-    def login_empresa(): print("TODO: login_empresa()"); return None
-    def cadastro_empresa(): print("TODO: cadastro_empresa()"); return None
-    def logout_empresa(sessao): print("TODO: logout_empresa()")
-
-# --- Produtos ---
-try:
-    from produtos import (
-        listar_produtos, cadastrar_produto, editar_produto, remover_produto
-    )
-except Exception:
-    def listar_produtos(): print("TODO: listar_produtos()")
-    def cadastrar_produto(empresa_id): print("TODO: cadastrar_produto()")
-    def editar_produto(empresa_id): print("TODO: editar_produto()")
-    def remover_produto(empresa_id): print("TODO: remover_produto()")
+from utilitarios import limpar_tela, pausar, ler_int
 
-
-try:
-    from carrinho import (
-        adicionar_ao_carrinho, remover_do_carrinho, ver_carrinho, finalizar_pedido
-    )
-except Exception:
-    def adicionar_ao_carrinho(cliente_id): print("TODO: adicionar_ao_carrinho()")
-    def remover_do_carrinho(cliente_id): print("TODO: remover_do_carrinho()")
-    def ver_carrinho(cliente_id): print("TODO: ver_carrinho()")
-    def finalizar_pedido(cliente_id):
-        print("TODO: finalizar_pedido() (versão fiel ao original)")
-
-try:
-    from pedidos import listar_pedidos_cliente, listar_pedidos_empresa
-except Exception:
-    def listar_pedidos_cliente(cliente_id): print("TODO: listar_pedidos_cliente()")
-    def listar_pedidos_empresa(empresa_id): print("TODO: listar_pedidos_empresa()")
-
-# --- Relatórios (Sistema) ---
-try:
-    from relatorio import relatorio_vendas, relatorio_estoque
-except Exception:
-    def relatorio_vendas(empresa_id): print("TODO: relatorio_vendas()")
-    def relatorio_estoque(empresa_id): print("TODO: relatorio_estoque()")
+# Os subsistemas (autenticação, produtos, carrinho, pedidos, relatórios,
+# sessões) são importados quando o menu que os usa é aberto: a partida até
+# o menu principal não carrega api/cache/sessões (ver benchmarks/bench_inicio.py).
+# Sem fallback: um erro de import aparece na hora, não vira um "TODO".
 
 # ============================== Estado de Sessão ==============================
-# Mantém quem está logado (cliente ou empresa). Use exatamente um por vez.
-SESSAO = {
-    "cliente_id": None,
-    "empresa_id": None,
-    "cliente_nome": None,  
-    "empresa_nome": None,  
-}
+# Token da sessão aberta neste console (cliente OU empresa, um por vez).
+# Quem está logado e até quando fica em sessoes.armazem.
+_token = None
+
+def _sessao_atual():
+    """Sessao do console, ou None se ninguém entrou ou se ela venceu."""
+    global _token
+    if _token is None:
+        return None
+    from sessoes import armazem
+    from api import SessaoInvalida
+
+    try:
+        return armazem.obter(_token)
+    except SessaoInvalida:
+        _token = None
+        return None
+
+def _entrar(sessao):
+    """Troca a sessão do console pela nova (força exclusividade)."""
+    global _token
+    if _token is not None:
+        from sessoes import armazem
+        armazem.encerrar(_token)
+    _token = sessao.token
+
+def _precisa(tipo):
+    sessao = _sessao_atual()
+    if sessao is None or sessao.tipo != tipo:
+        print(f"⚠ É necessário estar logado como {tipo.upper()} para essa ação.")
+        pausar()
+        return None
+    return sessao
 
 def _precisa_cliente():
-    if SESSAO["cliente_id"] is None:
-        print("⚠ É necessário estar logado como CLIENTE para essa ação.")
-        pausar()
-        return False
-    return True
+    """Sessao do cliente logado, ou None (com aviso)."""
+    return _precisa("cliente")
 
 def _precisa_empresa():
-    if SESSAO["empresa_id"] is None:
-        print("⚠ É necessário estar logado como EMPRESA para essa ação.")
-        pausar()
-        return False
-    return True
+    """Sessao da empresa logada, ou None (com aviso)."""
+    return _precisa("empresa")
+
+def _sair(tipo, logout, aviso):
+    global _token
+    sessao = _sessao_atual()
+    if sessao is not None and sessao.tipo == tipo:
+        logout(sessao)
+        _token = None
+    else:
+        print(aviso)
 
 # ================================ Menus =======================================
 
@@ -120,16 +87,22 @@ def menu_principal():
 
 
 def _mostra_status_sessao():
-    if SESSAO["cliente_id"]:
-        print(f"👤 Cliente logado: {SESSAO['cliente_nome'] or SESSAO['cliente_id']}")
-    elif SESSAO["empresa_id"]:
-        print(f"🏢 Empresa logada: {SESSAO['empresa_nome'] or SESSAO['empresa_id']}")
-    else:
+    sessao = _sessao_atual()
+    if sessao is None:
         print("🔓 Ninguém logado")
+    elif sessao.tipo == "cliente":
+        print(f"👤 Cliente logado: {sessao.nome or sessao.usuario_id}")
+    else:
+        print(f"🏢 Empresa logada: {sessao.nome or sessao.usuario_id}")
 
 # ------------------------------- Área do Cliente ------------------------------
 
 def menu_cliente():
+    from autenticacao import login_cliente, cadastro_cliente, logout_cliente
+    from produtos import listar_produtos
+    from carrinho import adicionar_ao_carrinho, remover_do_carrinho, ver_carrinho, finalizar_pedido
+    from pedidos import listar_pedidos_cliente
+
     while True:
         limpar_tela()
         print("============= Área do Cliente =============")
@@ -148,11 +121,9 @@ def menu_cliente():
         op = ler_int("\nEscolha: ")
 
         if op == 1:
-            
-            res = login_cliente()
-            if res:
-                SESSAO["cliente_id"], SESSAO["cliente_nome"] = res[0], (res[1] if len(res) > 1 else None)
-                SESSAO["empresa_id"], SESSAO["empresa_nome"] = None, None  # força exclusividade
+            sessao = login_cliente()
+            if sessao:
+                _entrar(sessao)
             pausar()
 
         elif op == 2:
@@ -164,35 +135,37 @@ def menu_cliente():
             pausar()
 
         elif op == 4:
-            if _precisa_cliente():
-                adicionar_ao_carrinho(SESSAO["cliente_id"])
+            sessao = _precisa_cliente()
+            if sessao:
+                adicionar_ao_carrinho(sessao.usuario_id)
                 pausar()
 
         elif op == 5:
-            if _precisa_cliente():
-                ver_carrinho(SESSAO["cliente_id"])
+            sessao = _precisa_cliente()
+            if sessao:
+                ver_carrinho(sessao.usuario_id)
                 pausar()
 
         elif op == 6:
-            if _precisa_cliente():
-                remover_do_carrinho(SESSAO["cliente_id"])
+            sessao = _precisa_cliente()
+            if sessao:
+                remover_do_carrinho(sessao.usuario_id)
                 pausar()
 
         elif op == 7:
-            if _precisa_cliente():
-                finalizar_pedido(SESSAO["cliente_id"])
+            sessao = _precisa_cliente()
+            if sessao:
+                finalizar_pedido(sessao.usuario_id)
                 pausar()
 
         elif op == 8:
-            if _precisa_cliente():
-                listar_pedidos_cliente(SESSAO["cliente_id"])
+            sessao = _precisa_cliente()
+            if sessao:
+                listar_pedidos_cliente(sessao.usuario_id)
                 pausar()
 
         elif op == 9:
-            if SESSAO["cliente_id"]:
-                logout_cliente(SESSAO)
-            else:
-                print("Nenhum cliente logado.")
+            _sair("cliente", logout_cliente, "Nenhum cliente logado.")
             pausar()
 
         elif op == 0:
@@ -204,6 +177,14 @@ def menu_cliente():
 # ------------------------------- Área da Empresa ------------------------------
 
 def menu_empresa():
+    from autenticacao import login_empresa, cadastro_empresa, logout_empresa
+    from produtos import (
+        cadastrar_produto, editar_produto, remover_produto,
+        importar_produtos_csv, ajustar_em_lote
+    )
+    from relatorio import relatorio_vendas, relatorio_estoque, relatorio_periodo
+    from pedidos import listar_pedidos_empresa
+
     while True:
         limpar_tela()
         print("============= Área da Empresa =============")
@@ -217,15 +198,17 @@ def menu_empresa():
         print("7. Relatório de Estoque")
         print("8. Pedidos da Minha Empresa")
         print("9. Logout da Empresa")
+        print("10. Importar Produtos (CSV)")
+        print("11. Ajustes em Lote (preço/estoque)")
+        print("12. Vendas por Período")
         print("0. Voltar")
 
         op = ler_int("\nEscolha: ")
 
         if op == 1:
-            res = login_empresa()
-            if res:
-                SESSAO["empresa_id"], SESSAO["empresa_nome"] = res[0], (res[1] if len(res) > 1 else None)
-                SESSAO["cliente_id"], SESSAO["cliente_nome"] = None, None  # força exclusividade
+            sessao = login_empresa()
+            if sessao:
+                _entrar(sessao)
             pausar()
 
         elif op == 2:
@@ -233,42 +216,60 @@ def menu_empresa():
             pausar()
 
         elif op == 3:
-            if _precisa_empresa():
-                cadastrar_produto(SESSAO["empresa_id"])
+            sessao = _precisa_empresa()
+            if sessao:
+                cadastrar_produto(sessao.usuario_id)
                 pausar()
 
         elif op == 4:
-            if _precisa_empresa():
-                editar_produto(SESSAO["empresa_id"])
+            sessao = _precisa_empresa()
+            if sessao:
+                editar_produto(sessao.usuario_id)
                 pausar()
 
         elif op == 5:
-            if _precisa_empresa():
-                remover_produto(SESSAO["empresa_id"])
+            sessao = _precisa_empresa()
+            if sessao:
+                remover_produto(sessao.usuario_id)
                 pausar()
 
         elif op == 6:
-            if _precisa_empresa():
-                relatorio_vendas(SESSAO["empresa_id"])
+            sessao = _precisa_empresa()
+            if sessao:
+                relatorio_vendas(sessao.usuario_id)
                 pausar()
 
         elif op == 7:
-            if _precisa_empresa():
-                relatorio_estoque(SESSAO["empresa_id"])
+            sessao = _precisa_empresa()
+            if sessao:
+                relatorio_estoque(sessao.usuario_id)
                 pausar()
 
         elif op == 8:
-            if _precisa_empresa():
-                listar_pedidos_empresa(SESSAO["empresa_id"])
+            sessao = _precisa_empresa()
+            if sessao:
+                listar_pedidos_empresa(sessao.usuario_id)
                 pausar()
 
         elif op == 9:
-            if SESSAO["empresa_id"]:
-                logout_empresa(SESSAO)
-            else:
-                print("Nenhuma empresa logada.")
+            _sair("empresa", logout_empresa, "Nenhuma empresa logada.")
             pausar()
 
+        elif op == 10:
+            sessao = _precisa_empresa()
+            if sessao:
+                importar_produtos_csv(sessao.usuario_id)
+
+        elif op == 11:
+            sessao = _precisa_empresa()
+            if sessao:
+                ajustar_em_lote(sessao.usuario_id)
+
+        elif op == 12:
+            sessao = _precisa_empresa()
+            if sessao:
+                relatorio_periodo(sessao.usuario_id)
+
         elif op == 0:
             break
         else:
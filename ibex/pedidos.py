@@ -1,6 +1,8 @@
 # ibex/pedidos.py
 
-from database.conexao import conectar
+from database.conexao import obter_conexao
+from codigos import normalizar_codigo
+from dinheiro import Dinheiro
 import os
 
 # ============================ utilitários locais ==============================
@@ -13,7 +15,7 @@ def _limpar():
 
 def _moeda(v):
     try:
-        return f"R$ {float(v):.2f}"
+        return f"R$ {v:.2f}"
     except:
         return f"R$ {v}"
 
@@ -24,93 +26,89 @@ def _input_nonempty(prompt):
             return s
         print("Campo obrigatório.")
 
-# ============================ garantias de tabelas ============================
-
-def _ensure_tables():
-    """
-    Garante que as tabelas mínimas existam (caso o módulo seja executado isolado).
-    Mantém em sincronia com carrinho.py e produtos.
-    """
-    con = conectar()
-    cur = con.cursor()
-
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS produtos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            empresa_id INTEGER,
-            nome TEXT NOT NULL,
-            preco REAL NOT NULL,
-            estoque INTEGER NOT NULL DEFAULT 0,
-            criado_em TEXT DEFAULT CURRENT_TIMESTAMP
-        );
-    """)
-
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS carrinho (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            cliente_id INTEGER NOT NULL,
-            produto_id INTEGER NOT NULL,
-            qtd INTEGER NOT NULL,
-            preco_unit REAL NOT NULL,
-            total_item REAL NOT NULL,
-            cep TEXT NOT NULL,
-            numero TEXT NOT NULL,
-            pedido_codigo TEXT NOT NULL,
-            criado_em TEXT DEFAULT CURRENT_TIMESTAMP
-        );
-    """)
-
-    con.commit()
-    con.close()
-
 # ============================== consultas comuns ==============================
+# SQL nomeado: os mesmos textos são conferidos por benchmarks/verificar_planos.py
+# (EXPLAIN QUERY PLAN), então qualquer consulta nova deve entrar em CONSULTAS.
+
+# Resumos leem o cabeçalho gravado no checkout (sem GROUP BY sobre os itens).
+SQL_RESUMO_PEDIDOS_CLIENTE = """
+    SELECT codigo, criado_em, total_itens, total_valor_centavos, cep, numero
+    FROM pedidos
+    WHERE cliente_id = ?
+    ORDER BY id DESC;
+"""
+
+SQL_DETALHES_PEDIDO_CLIENTE = """
+    SELECT
+        c.produto_id,
+        p.nome,
+        c.qtd,
+        c.preco_unit_centavos,
+        c.total_item_centavos
+    FROM pedidos pe
+    JOIN carrinho c ON c.pedido_id = pe.id
+    JOIN produtos p ON p.id = c.produto_id
+    WHERE pe.cliente_id = ? AND pe.codigo = ?
+    ORDER BY p.nome;
+"""
+
+SQL_RESUMO_PEDIDOS_EMPRESA = """
+    SELECT pe.codigo, pe.criado_em, pem.total_itens, pem.total_valor_centavos, pe.cep, pe.numero
+    FROM pedidos_empresas pem
+    JOIN pedidos pe ON pe.id = pem.pedido_id
+    WHERE pem.empresa_id = ?
+    ORDER BY pem.pedido_id DESC;
+"""
+
+SQL_DETALHES_PEDIDO_EMPRESA = """
+    SELECT
+        c.produto_id,
+        p.nome,
+        c.qtd,
+        c.preco_unit_centavos,
+        c.total_item_centavos
+    FROM pedidos pe
+    JOIN carrinho c ON c.pedido_id = pe.id
+    JOIN produtos p ON p.id = c.produto_id
+    WHERE p.empresa_id = ? AND pe.codigo = ?
+    ORDER BY p.nome;
+"""
+
+CONSULTAS = {
+    "resumo_pedidos_cliente": SQL_RESUMO_PEDIDOS_CLIENTE,
+    "detalhes_pedido_cliente": SQL_DETALHES_PEDIDO_CLIENTE,
+    "resumo_pedidos_empresa": SQL_RESUMO_PEDIDOS_EMPRESA,
+    "detalhes_pedido_empresa": SQL_DETALHES_PEDIDO_EMPRESA,
+}
+
+# Valores saem do banco em centavos (int) e daqui como Dinheiro.
+def _resumos(rows):
+    return [(codigo, criado_em, itens, Dinheiro(total), cep, numero)
+            for codigo, criado_em, itens, total, cep, numero in rows]
+
+def _itens(rows):
+    return [(pid, nome, qtd, Dinheiro(preco), Dinheiro(sub)) for pid, nome, qtd, preco, sub in rows]
 
 def _listar_resumo_pedidos_cliente(cliente_id):
     """
     Retorna lista de tuplas:
     (pedido_codigo, criado_em_mais_recente, total_itens, total_valor, cep, numero)
     """
-    con = conectar()
-    cur = con.cursor()
-    cur.execute("""
-        SELECT
-            c.pedido_codigo,
-            MAX(c.criado_em) AS criado_em,
-            SUM(c.qtd)        AS itens,
-            SUM(c.total_item) AS total,
-            MAX(c.cep)        AS cep,
-            MAX(c.numero)     AS numero
-        FROM carrinho c
-        WHERE c.cliente_id = ?
-        GROUP BY c.pedido_codigo
-        ORDER BY criado_em DESC;
-    """, (cliente_id,))
-    rows = cur.fetchall()
-    con.close()
-    return rows
+    with obter_conexao() as con:
+        return _resumos(con.execute(SQL_RESUMO_PEDIDOS_CLIENTE, (cliente_id,)))
 
 def _listar_detalhes_pedido_cliente(cliente_id, pedido_codigo):
     """
     Retorna itens do pedido do cliente:
     (produto_id, nome, qtd, preco_unit, total_item)
     """
-    con = conectar()
-    cur = con.cursor()
-    cur.execute("""
-        SELECT
-            c.produto_id,
-            p.nome,
-            c.qtd,
-            c.preco_unit,
-            c.total_item
-        FROM carrinho c
-        JOIN produtos p ON p.id = c.produto_id
-        WHERE c.cliente_id = ? AND c.pedido_codigo = ?
-        ORDER BY p.nome;
-    """, (cliente_id, pedido_codigo))
-    rows = cur.fetchall()
-    con.close()
-    return rows
+    with obter_conexao() as con:
+        rows = con.execute(SQL_DETALHES_PEDIDO_CLIENTE, (cliente_id, pedido_codigo)).fetchall()
+    if not rows:
+        # Pedido antigo: os itens podem ter ido para o arquivo (arquivo.py).
+        import arquivo
+        rows = arquivo.itens_pedido_cliente(cliente_id, pedido_codigo)
+    return _itens(rows)
 
 def _listar_resumo_pedidos_empresa(empresa_id):
     """
@@ -118,25 +116,8 @@ def _listar_resumo_pedidos_empresa(empresa_id):
     Retorna:
     (pedido_codigo, criado_em_mais_recente, total_itens_da_empresa, total_valor_da_empresa, cep, numero)
     """
-    con = conectar()
-    cur = con.cursor()
-    cur.execute("""
-        SELECT
-            c.pedido_codigo,
-            MAX(c.criado_em) AS criado_em,
-            SUM(c.qtd)        AS itens_empresa,
-            SUM(c.total_item) AS total_empresa,
-            MAX(c.cep)        AS cep,
-            MAX(c.numero)     AS numero
-        FROM carrinho c
-        JOIN produtos p ON p.id = c.produto_id
-        WHERE p.empresa_id = ?
-        GROUP BY c.pedido_codigo
-        ORDER BY criado_em DESC;
-    """, (empresa_id,))
-    rows = cur.fetchall()
-    con.close()
-    return rows
+    with obter_conexao() as con:
+        return _resumos(con.execute(SQL_RESUMO_PEDIDOS_EMPRESA, (empresa_id,)))
 
 def _listar_detalhes_pedido_empresa(empresa_id, pedido_codigo):
     """
@@ -144,28 +125,16 @@ def _listar_detalhes_pedido_empresa(empresa_id, pedido_codigo):
     Retorna:
     (produto_id, nome, qtd, preco_unit, total_item)
     """
-    con = conectar()
-    cur = con.cursor()
-    cur.execute("""
-        SELECT
-            c.produto_id,
-            p.nome,
-            c.qtd,
-            c.preco_unit,
-            c.total_item
-        FROM carrinho c
-        JOIN produtos p ON p.id = c.produto_id
-        WHERE p.empresa_id = ? AND c.pedido_codigo = ?
-        ORDER BY p.nome;
-    """, (empresa_id, pedido_codigo))
-    rows = cur.fetchall()
-    con.close()
-    return rows
+    with obter_conexao() as con:
+        rows = con.execute(SQL_DETALHES_PEDIDO_EMPRESA, (empresa_id, pedido_codigo)).fetchall()
+    if not rows:
+        import arquivo
+        rows = arquivo.itens_pedido_empresa(empresa_id, pedido_codigo)
+    return _itens(rows)
 
 # ================================ API: Cliente ================================
 
 def listar_pedidos_cliente(cliente_id: int):
-    _ensure_tables()
     _limpar()
     print("=== Meus Pedidos ===")
 
@@ -175,15 +144,15 @@ def listar_pedidos_cliente(cliente_id: int):
         _pausar()
         return
 
-    print(f"{'Pedido':<22} {'Data':<20} {'Itens':>7} {'Total':>14}  Endereço")
-    print("-" * 80)
+    print(f"{'Pedido':<28} {'Data':<20} {'Itens':>7} {'Total':>14}  Endereço")
+    print("-" * 86)
     for (codigo, criado_em, itens, total, cep, numero) in rows:
         end = f"CEP {cep}, Nº {numero}"
-        print(f"{codigo:<22} {criado_em:<20} {itens:>7} {(_moeda(total)):>14}  {end}")
+        print(f"{codigo:<28} {criado_em:<20} {itens:>7} {(_moeda(total)):>14}  {end}")
 
     # opção de ver detalhes
     print("\nDigite um código de pedido para ver detalhes, ou deixe vazio para voltar.")
-    escolha = input("Pedido: ").strip()
+    escolha = normalizar_codigo(input("Pedido: "))
     if not escolha:
         return
 
@@ -196,10 +165,10 @@ def listar_pedidos_cliente(cliente_id: int):
     _limpar()
     print(f"=== Detalhes do Pedido {escolha} ===")
     print(f"{'Produto ID':>10}  {'Nome':<30} {'Qtd':>5} {'Preço':>10} {'Subtotal':>12}")
-    total = 0.0
+    total = Dinheiro(0)
     for (pid, nome, qtd, preco, sub) in detalhes:
-        total += float(sub)
-        print(f"{pid:>10}  {nome:<30} {qtd:>5} {float(preco):>10.2f} {float(sub):>12.2f}")
+        total += sub
+        print(f"{pid:>10}  {nome:<30} {qtd:>5} {preco:>10.2f} {sub:>12.2f}")
     print("-" * 72)
     print(f"{'TOTAL:':>57} {total:>12.2f}")
     _pausar()
@@ -207,7 +176,6 @@ def listar_pedidos_cliente(cliente_id: int):
 # ================================ API: Empresa ================================
 
 def listar_pedidos_empresa(empresa_id: int):
-    _ensure_tables()
     _limpar()
     print("=== Pedidos da Minha Empresa ===")
 
@@ -217,14 +185,14 @@ def listar_pedidos_empresa(empresa_id: int):
         _pausar()
         return
 
-    print(f"{'Pedido':<22} {'Data':<20} {'Itens(Emp.)':>12} {'Total(Emp.)':>14}  Endereço")
-    print("-" * 86)
+    print(f"{'Pedido':<28} {'Data':<20} {'Itens(Emp.)':>12} {'Total(Emp.)':>14}  Endereço")
+    print("-" * 92)
     for (codigo, criado_em, itens_emp, total_emp, cep, numero) in rows:
         end = f"CEP {cep}, Nº {numero}"
-        print(f"{codigo:<22} {criado_em:<20} {itens_emp:>12} {(_moeda(total_emp)):>14}  {end}")
+        print(f"{codigo:<28} {criado_em:<20} {itens_emp:>12} {(_moeda(total_emp)):>14}  {end}")
 
     print("\nDigite um código de pedido para ver detalhes (da sua empresa), ou deixe vazio para voltar.")
-    escolha = input("Pedido: ").strip()
+    escolha = normalizar_codigo(input("Pedido: "))
     if not escolha:
         return
 
@@ -237,10 +205,10 @@ def listar_pedidos_empresa(empresa_id: int):
     _limpar()
     print(f"=== Detalhes do Pedido {escolha} (itens da empresa) ===")
     print(f"{'Produto ID':>10}  {'Nome':<30} {'Qtd':>5} {'Preço':>10} {'Subtotal':>12}")
-    total = 0.0
+    total = Dinheiro(0)
     for (pid, nome, qtd, preco, sub) in detalhes:
-        total += float(sub)
-        print(f"{pid:>10}  {nome:<30} {qtd:>5} {float(preco):>10.2f} {float(sub):>12.2f}")
+        total += sub
+        print(f"{pid:>10}  {nome:<30} {qtd:>5} {preco:>10.2f} {sub:>12.2f}")
     print("-" * 72)
     print(f"{'TOTAL (empresa):':>57} {total:>12.2f}")
     _pausar()
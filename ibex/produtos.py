@@ -1,6 +1,6 @@
 # ibex/produtos.py
 
-from database.conexao import conectar
+import api
 import os
 
 # ============================ utilitários locais ==============================
@@ -50,65 +50,87 @@ def _ler_texto(prompt):
             return s
         print("Campo obrigatório.")
 
-# ============================ garantias de tabelas ============================
-
-def _ensure_tables():
-    con = conectar()
-    cur = con.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS produtos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            empresa_id INTEGER,
-            nome TEXT NOT NULL,
-            preco REAL NOT NULL,
-            estoque INTEGER NOT NULL DEFAULT 0,
-            criado_em TEXT DEFAULT CURRENT_TIMESTAMP
-        );
-    """)
-    con.commit()
-    con.close()
-
 # =============================== listagens ====================================
 
-def listar_produtos(empresa_id=None):
+def _imprimir_produtos(itens):
+    print(f"{'ID':>4}  {'Nome':<30} {'Preço':>10} {'Estoque':>8}")
+    for prod in itens:
+        print(f"{prod.id:>4}  {prod.nome:<30} {prod.preco:>10.2f} {prod.estoque:>8}")
+
+def _perguntar_pagina(tem_proxima, tem_anterior):
+    """Retorna "P", "A" ou "" (seguir). Sem outras páginas, nem pergunta."""
+    opcoes = []
+    if tem_proxima:
+        opcoes.append("(P) próxima")
+    if tem_anterior:
+        opcoes.append("(A) anterior")
+    if not opcoes:
+        return ""
+    op = input(f"\n{' | '.join(opcoes)} | Enter para continuar: ").strip().upper()
+    if (op == "P" and tem_proxima) or (op == "A" and tem_anterior):
+        return op
+    return ""
+
+def navegar_produtos(empresa_id=None):
     """
-    Lista produtos no console.
-    - Se empresa_id for None: lista TODOS (visão do cliente).
-    - Se empresa_id tiver valor: lista APENAS os da empresa.
+    Mostra o catálogo página a página (api.pagina_produtos), com
+    próxima/anterior, até o usuário seguir com Enter.
+    Retorna os produtos da página em que parou (lista vazia se não há produtos).
     """
-    _ensure_tables()
-    _limpar()
-    print("=== Lista de Produtos ===")
+    pagina = api.pagina_produtos(empresa_id)
+    if not pagina.itens:
+        print("Nenhum produto encontrado.")
+        return []
 
-    con = conectar()
-    cur = con.cursor()
-    try:
-        if empresa_id is None:
-            cur.execute("SELECT id, nome, preco, estoque FROM produtos ORDER BY nome;")
+    while True:
+        _imprimir_produtos(pagina.itens)
+        op = _perguntar_pagina(pagina.proximo is not None, pagina.anterior is not None)
+        if op == "P":
+            pagina = api.pagina_produtos(empresa_id, apos=pagina.proximo)
+        elif op == "A":
+            pagina = api.pagina_produtos(empresa_id, antes=pagina.anterior)
         else:
-            cur.execute("""
-                SELECT id, nome, preco, estoque
-                FROM produtos
-                WHERE empresa_id = ?
-                ORDER BY nome;
-            """, (empresa_id,))
-        rows = cur.fetchall()
-    finally:
-        con.close()
+            return pagina.itens
+        print()
 
-    if not rows:
-        print("Nenhum produto encontrado.")
+def navegar_busca(termo, empresa_id=None):
+    """
+    Mostra o resultado de api.buscar_produtos (mais relevantes primeiro),
+    página a página. Retorna os produtos da página em que parou.
+    """
+    try:
+        pagina = api.buscar_produtos(termo, empresa_id)
+    except api.DadosInvalidos as e:
+        print(e)
+        return []
+    if not pagina.itens:
+        print(f"Nenhum produto encontrado para '{termo}'.")
         return []
 
-    print(f"{'ID':>4}  {'Nome':<30} {'Preço':>10} {'Estoque':>8}")
-    for pid, nome, preco, est in rows:
-        print(f"{pid:>4}  {nome:<30} {preco:>10.2f} {est:>8}")
-    return rows
+    while True:
+        _imprimir_produtos(pagina.itens)
+        op = _perguntar_pagina(pagina.tem_mais, pagina.pagina > 1)
+        if op == "P":
+            pagina = api.buscar_produtos(termo, empresa_id, pagina.pagina + 1)
+        elif op == "A":
+            pagina = api.buscar_produtos(termo, empresa_id, pagina.pagina - 1)
+        else:
+            return pagina.itens
+        print()
+
+def listar_produtos(empresa_id=None):
+    """
+    Lista produtos no console, em páginas.
+    - Se empresa_id for None: lista TODOS (visão do cliente).
+    - Se empresa_id tiver valor: lista APENAS os da empresa.
+    """
+    _limpar()
+    print("=== Lista de Produtos ===")
+    return navegar_produtos(empresa_id)
 
 # ================================ CRUD ========================================
 
 def cadastrar_produto(empresa_id: int):
-    _ensure_tables()
     _limpar()
     print("=== Cadastrar Produto ===")
 
@@ -116,23 +138,15 @@ def cadastrar_produto(empresa_id: int):
     preco = _ler_float("Preço (ex.: 19.90): ", minimo=0.0)
     estoque = _ler_int("Estoque inicial: ", minimo=0)
 
-    con = conectar()
-    cur = con.cursor()
     try:
-        cur.execute("""
-            INSERT INTO produtos (empresa_id, nome, preco, estoque)
-            VALUES (?, ?, ?, ?);
-        """, (empresa_id, nome, preco, estoque))
-        con.commit()
+        api.criar_produto(empresa_id, nome, preco, estoque)
         print("✅ Produto cadastrado com sucesso!")
     except Exception as e:
         print("Erro ao cadastrar produto:", e)
     finally:
-        con.close()
         _pausar()
 
 def editar_produto(empresa_id: int):
-    _ensure_tables()
     _limpar()
     print("=== Editar Produto ===")
     meus = listar_produtos(empresa_id)
@@ -143,62 +157,46 @@ def editar_produto(empresa_id: int):
     pid = _ler_int("\nID do produto para editar: ", minimo=1)
 
     # confere se pertence à empresa
-    con = conectar()
-    cur = con.cursor()
-    cur.execute("SELECT id, nome, preco, estoque FROM produtos WHERE id = ? AND empresa_id = ?;",
-                (pid, empresa_id))
-    row = cur.fetchone()
-    if not row:
-        con.close()
-        print("Produto não encontrado ou não pertence a esta empresa.")
+    try:
+        atual = api.obter_produto(pid, empresa_id)
+    except api.NaoEncontrado as e:
+        print(e)
         _pausar()
         return
 
-    _, nome_atual, preco_atual, est_atual = row
     print(f"\nDeixe vazio para manter o valor atual.")
-    novo_nome = input(f"Nome [{nome_atual}]: ").strip() or nome_atual
+    novo_nome = input(f"Nome [{atual.nome}]: ").strip() or None
 
     # preço
-    v = input(f"Preço [{preco_atual:.2f}]: ").strip()
-    if v == "":
-        novo_preco = preco_atual
-    else:
+    v = input(f"Preço [{atual.preco:.2f}]: ").strip()
+    novo_preco = None
+    if v != "":
         try:
             novo_preco = float(v.replace(",", "."))
         except:
             print("Preço inválido. Mantendo valor atual.")
-            novo_preco = preco_atual
 
     # estoque
-    v = input(f"Estoque [{est_atual}]: ").strip()
-    if v == "":
-        novo_estoque = est_atual
-    else:
+    v = input(f"Estoque [{atual.estoque}]: ").strip()
+    novo_estoque = None
+    if v != "":
         try:
             novo_estoque = int(v)
             if novo_estoque < 0:
                 print("Estoque não pode ser negativo. Mantendo valor atual.")
-                novo_estoque = est_atual
+                novo_estoque = None
         except:
             print("Estoque inválido. Mantendo valor atual.")
-            novo_estoque = est_atual
 
     try:
-        cur.execute("""
-            UPDATE produtos
-            SET nome = ?, preco = ?, estoque = ?
-            WHERE id = ? AND empresa_id = ?;
-        """, (novo_nome, novo_preco, novo_estoque, pid, empresa_id))
-        con.commit()
+        api.atualizar_produto(empresa_id, pid, novo_nome, novo_preco, novo_estoque)
         print("✅ Produto atualizado com sucesso!")
     except Exception as e:
         print("Erro ao atualizar produto:", e)
     finally:
-        con.close()
         _pausar()
 
 def remover_produto(empresa_id: int):
-    _ensure_tables()
     _limpar()
     print("=== Remover Produto ===")
     meus = listar_produtos(empresa_id)
@@ -208,31 +206,107 @@ def remover_produto(empresa_id: int):
 
     pid = _ler_int("\nID do produto para remover: ", minimo=1)
 
-    con = conectar()
-    cur = con.cursor()
     # Confere se pertence à empresa
-    cur.execute("SELECT nome FROM produtos WHERE id = ? AND empresa_id = ?;", (pid, empresa_id))
-    row = cur.fetchone()
-    if not row:
-        con.close()
-        print("Produto não encontrado ou não pertence a esta empresa.")
+    try:
+        prod = api.obter_produto(pid, empresa_id)
+    except api.NaoEncontrado as e:
+        print(e)
         _pausar()
         return
 
-    nome = row[0]
-    conf = input(f"Confirmar remoção de '{nome}' (S/N)? ").strip().upper()
+    conf = input(f"Confirmar remoção de '{prod.nome}' (S/N)? ").strip().upper()
     if conf != "S":
         print("Operação cancelada.")
-        con.close()
         _pausar()
         return
 
     try:
-        cur.execute("DELETE FROM produtos WHERE id = ? AND empresa_id = ?;", (pid, empresa_id))
-        con.commit()
+        api.excluir_produto(empresa_id, pid)
         print("✅ Produto removido com sucesso!")
     except Exception as e:
         print("Erro ao remover produto (verifique vínculos em pedidos):", e)
     finally:
-        con.close()
         _pausar()
+
+# ============================ importação em lote ==============================
+
+def importar_produtos_csv(empresa_id: int):
+    """Importa um CSV de produtos (ver importacao.py) para a empresa logada."""
+    from importacao import importar_produtos
+
+    _limpar()
+    print("=== Importar Produtos (CSV) ===")
+    print("Colunas: nome, preco, estoque e, opcional, codigo (SKU).")
+    print("Produtos com o mesmo código da empresa são atualizados.\n")
+    caminho = _ler_texto("Arquivo CSV: ")
+
+    try:
+        with open(caminho, encoding="utf-8-sig", newline="") as arquivo:
+            r = importar_produtos(empresa_id, arquivo)
+    except (OSError, api.ErroIbex) as e:
+        print("Erro ao importar:", e)
+        _pausar()
+        return
+
+    print(f"\n✅ {r.lidas} linha(s) lida(s): {r.inseridas} inserida(s), "
+          f"{r.atualizadas} atualizada(s), {r.rejeitadas} rejeitada(s).")
+    print(f"Tempo: {r.segundos:.2f} s ({r.linhas_por_segundo:,.0f} linhas/s)")
+    for rej in r.rejeicoes:
+        print(f"⚠ linha {rej.linha}: {rej.motivo}")
+    _pausar()
+
+# ============================== ajustes em lote ===============================
+
+def _mostrar_ajuste(r, campo):
+    print(f"\n{r.analisadas} analisada(s), {r.alteradas} alterada(s), {r.rejeitadas} rejeitada(s) "
+          f"em {r.segundos:.2f} s ({r.linhas_por_segundo:,.0f} linhas/s)")
+    for a in r.alteracoes:
+        print(f"{a.produto_id:>6}  {a.nome[:30]:<30} {campo}: {a.antes} -> {a.depois}")
+    if r.alteradas > len(r.alteracoes):
+        print(f"... e mais {r.alteradas - len(r.alteracoes)}")
+    for rej in r.rejeicoes:
+        print(f"⚠ linha {rej.linha}: {rej.motivo}")
+
+def ajustar_em_lote(empresa_id: int):
+    """Reajuste de preços ou inventário de estoque: mostra a prévia e confirma."""
+    import ajustes
+
+    _limpar()
+    print("=== Ajustes em Lote ===")
+    print("1. Reajustar preços (%)")
+    print("2. Estoque a partir de CSV (id, estoque)")
+    print("0. Voltar")
+    op = _ler_int("Escolha: ", 0, 2)
+    if op == 0:
+        return
+
+    if op == 1:
+        percentual = _ler_float("Percentual (ex.: 8 ou -5): ", minimo=-100)
+        termo = input("Só produtos com o nome (Enter = todos): ").strip() or None
+        campo = "preço"
+
+        def rodar(simular):
+            return ajustes.reajustar_precos(empresa_id, percentual=percentual, busca=termo,
+                                            simular=simular)
+    else:
+        caminho = _ler_texto("Arquivo CSV: ")
+        somar = input("Somar ao estoque atual em vez de substituir? (s/N): ").strip().lower() == "s"
+        campo = "estoque"
+
+        def rodar(simular):
+            with open(caminho, encoding="utf-8-sig", newline="") as arquivo:
+                return ajustes.ajustar_estoque(empresa_id, arquivo, somar=somar, simular=simular)
+
+    try:
+        previa = rodar(simular=True)
+        _mostrar_ajuste(previa, campo)
+        if previa.alteradas == 0:
+            print("\nNada a alterar.")
+        elif input("\nGravar essas alterações? (s/N): ").strip().lower() == "s":
+            r = rodar(simular=False)
+            print(f"\n✅ {r.alteradas} produto(s) alterado(s).")
+        else:
+            print("\nNada foi gravado.")
+    except (OSError, api.ErroIbex) as e:
+        print("Erro:", e)
+    _pausar()
@@ -0,0 +1,234 @@
+# ibex/provisionamento.py
+# -*- coding: utf-8 -*-
+
+"""
+Cadastro de clientes e empresas em lote (migração de bases existentes)
+- Recebe um fluxo de registros (qualquer iterável, ou um CSV) e grava em
+  lotes de TAMANHO_LOTE, uma transação por lote
+- Sem consulta prévia de email/CNPJ: cada lote é UM INSERT ... SELECT
+  sobre a lista em JSON com ON CONFLICT DO NOTHING RETURNING; o que não
+  voltou no RETURNING já existia (no banco ou antes no mesmo lote)
+- Registros inválidos (nome vazio, email sem '@', CNPJ sem 14 dígitos)
+  são rejeitados sem ir ao banco
+- O resultado traz inseridos, duplicados, rejeitados e registros/s
+
+Uso:
+    python main.py provisionar clientes clientes.csv --recusados recusados.csv
+    python main.py provisionar empresas empresas.csv
+"""
+
+import csv
+import json
+import time
+from typing import NamedTuple
+
+from database.conexao import transacao
+from api import DadosInvalidos, apenas_digitos, normalizar_email
+
+TAMANHO_LOTE = 5_000
+# Quantos duplicados/rejeitados ficam no resultado (o arquivo tem todos).
+AMOSTRA = 20
+
+# ================================ Tipos =======================================
+
+class NovoCliente(NamedTuple):
+    nome: str
+    email: str
+    senha: str
+
+class NovaEmpresa(NamedTuple):
+    razao_social: str
+    cnpj: str
+    email: str
+    senha: str
+
+class Recusado(NamedTuple):
+    numero: int         # posição no fluxo (no CSV, a linha)
+    motivo: str
+    registro: tuple
+
+class ResultadoProvisionamento(NamedTuple):
+    lidos: int
+    inseridos: int
+    duplicados: int
+    rejeitados: int
+    segundos: float
+    recusados: list     # amostra (até AMOSTRA) de duplicados e rejeitados
+
+    @property
+    def registros_por_segundo(self):
+        return self.lidos / self.segundos if self.segundos else 0.0
+
+# ============================== Consultas =====================================
+# O lote vai como um array JSON de arrays; json_each devolve na ordem do
+# array, então entre repetidos do mesmo lote fica o primeiro.
+# "WHERE true" separa o SELECT do ON CONFLICT (exigência da sintaxe).
+# json_extract em vez de "value ->> 0", que só existe no SQLite 3.38+.
+
+SQL_INSERIR_CLIENTES = """
+    INSERT INTO clientes (nome, email, senha)
+    SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]'), json_extract(value, '$[2]')
+    FROM json_each(?) WHERE true
+    ON CONFLICT DO NOTHING
+    RETURNING email;
+"""
+
+SQL_INSERIR_EMPRESAS = """
+    INSERT INTO empresas (razao_social, cnpj, email, senha)
+    SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]'),
+           json_extract(value, '$[2]'), json_extract(value, '$[3]')
+    FROM json_each(?) WHERE true
+    ON CONFLICT DO NOTHING
+    RETURNING cnpj, email;
+"""
+
+# ============================== Validação =====================================
+
+def _texto(valor, campo):
+    valor = (valor or "").strip()
+    if not valor:
+        raise ValueError(f"{campo} vazio")
+    return valor
+
+def _email(valor):
+    email = normalizar_email(valor or "")
+    if "@" not in email or email.startswith("@") or email.endswith("@"):
+        raise ValueError(f"email inválido: {valor!r}")
+    return email
+
+def _campos(registro, tipo):
+    if len(registro) != len(tipo._fields):
+        raise ValueError(f"esperados {len(tipo._fields)} campos, vieram {len(registro)}")
+    return registro
+
+def _cliente(registro):
+    nome, email, senha = _campos(registro, NovoCliente)
+    return NovoCliente(_texto(nome, "nome"), _email(email), _texto(senha, "senha"))
+
+def _empresa(registro):
+    razao_social, cnpj, email, senha = _campos(registro, NovaEmpresa)
+    digitos = apenas_digitos(cnpj)
+    if len(digitos) != 14:
+        raise ValueError(f"CNPJ inválido: {cnpj!r}")
+    return NovaEmpresa(_texto(razao_social, "razão social"), digitos, _email(email),
+                       _texto(senha, "senha"))
+
+# ================================ Gravação ====================================
+
+class _Tipo(NamedTuple):
+    validar: object     # registro -> NovoCliente/NovaEmpresa (ValueError)
+    sql: str
+    chave: object       # registro validado -> o que o RETURNING devolve
+    duplicado: str      # motivo
+
+_CLIENTES = _Tipo(_cliente, SQL_INSERIR_CLIENTES, lambda r: (r.email,),
+                  "email já cadastrado")
+_EMPRESAS = _Tipo(_empresa, SQL_INSERIR_EMPRESAS, lambda r: (r.cnpj, r.email),
+                  "CNPJ ou email já cadastrado")
+
+def _gravar_lote(tipo, lote):
+    """Grava o lote [(numero, registro)]; devolve os que não entraram."""
+    with transacao() as con:
+        inseridos = {tuple(row) for row in con.execute(tipo.sql, (json.dumps([r for _, r in lote]),))}
+    duplicados = []
+    for numero, registro in lote:
+        chave = tipo.chave(registro)
+        if chave in inseridos:
+            inseridos.discard(chave)    # uma repetição no lote é duplicada
+        else:
+            duplicados.append(Recusado(numero, tipo.duplicado, registro))
+    return duplicados
+
+def _provisionar(tipo, numerados, lote, recusados_saida, progresso):
+    if lote < 1:
+        raise DadosInvalidos("Tamanho do lote deve ser ao menos 1.")
+    saida = csv.writer(recusados_saida) if recusados_saida is not None else None
+    if saida is not None:
+        saida.writerow(["numero", "motivo", "dados"])
+
+    lidos = inseridos = duplicados = rejeitados = 0
+    amostra, pendentes = [], []
+
+    def recusar(recusado):
+        if len(amostra) < AMOSTRA:
+            amostra.append(recusado)
+        if saida is not None:
+            # Senha não vai para o relatório.
+            saida.writerow([recusado.numero, recusado.motivo, *recusado.registro[:-1]])
+
+    def gravar():
+        nonlocal inseridos, duplicados
+        repetidos = _gravar_lote(tipo, pendentes)
+        inseridos += len(pendentes) - len(repetidos)
+        duplicados += len(repetidos)
+        for recusado in repetidos:
+            recusar(recusado)
+        if progresso:
+            progresso(lidos)
+
+    t0 = time.perf_counter()
+    for numero, registro in numerados:
+        lidos += 1
+        try:
+            pendentes.append((numero, tipo.validar(registro)))
+        except ValueError as e:
+            rejeitados += 1
+            recusar(Recusado(numero, str(e), tuple(registro)))
+            continue
+        if len(pendentes) >= lote:
+            gravar()
+            pendentes = []
+    if pendentes:
+        gravar()
+    return ResultadoProvisionamento(lidos, inseridos, duplicados, rejeitados,
+                                    time.perf_counter() - t0, amostra)
+
+# ================================= Entrada ====================================
+
+def provisionar_clientes(registros, lote=TAMANHO_LOTE, recusados=None, progresso=None):
+    """
+    Cadastra clientes de um iterável de (nome, email, senha).
+    - recusados: arquivo texto aberto para o CSV de duplicados/rejeitados
+      (sem a senha), ou None
+    - progresso(lidos): chamado a cada lote gravado
+    Retorna ResultadoProvisionamento.
+    """
+    return _provisionar(_CLIENTES, enumerate(registros, 1), lote, recusados, progresso)
+
+def provisionar_empresas(registros, lote=TAMANHO_LOTE, recusados=None, progresso=None):
+    """Como provisionar_clientes, com (razao_social, cnpj, email, senha)."""
+    return _provisionar(_EMPRESAS, enumerate(registros, 1), lote, recusados, progresso)
+
+# Colunas do CSV (cabeçalho obrigatório, nesta ou em outra ordem).
+COLUNAS = {
+    "clientes": NovoCliente._fields,
+    "empresas": NovaEmpresa._fields,
+}
+
+def ler_csv(arquivo, tabela, separador=None):
+    """
+    Gera (numero_da_linha, registro) do CSV 'arquivo' (aberto com
+    newline=""), com os campos na ordem de COLUNAS[tabela].
+    """
+    primeira = arquivo.readline()
+    if not primeira.strip():
+        raise DadosInvalidos("Arquivo vazio (esperado um cabeçalho).")
+    separador = separador or (";" if primeira.count(";") > primeira.count(",") else ",")
+    cabecalho = [c.strip().lower() for c in next(csv.reader([primeira], delimiter=separador))]
+    faltando = [c for c in COLUNAS[tabela] if c not in cabecalho]
+    if faltando:
+        raise DadosInvalidos(f"Cabeçalho sem a(s) coluna(s): {', '.join(faltando)}.")
+    indices = [cabecalho.index(c) for c in COLUNAS[tabela]]
+
+    leitor = csv.reader(arquivo, delimiter=separador)
+    for campos in leitor:
+        if not any(c.strip() for c in campos):
+            continue
+        yield leitor.line_num + 1, tuple(campos[i] if i < len(campos) else "" for i in indices)
+
+def provisionar_csv(tabela, arquivo, separador=None, lote=TAMANHO_LOTE, recusados=None, progresso=None):
+    """Cadastra 'clientes' ou 'empresas' a partir de um CSV; ver ler_csv."""
+    tipo = {"clientes": _CLIENTES, "empresas": _EMPRESAS}.get(tabela)
+    if tipo is None:
+        raise DadosInvalidos(f"Tabela inválida: {tabela}")
+    return _provisionar(tipo, ler_csv(arquivo, tabela, separador), lote, recusados, progresso)
@@ -5,12 +5,21 @@
 Relatórios do Ibex (Empresa)
 - relatorio_vendas(empresa_id): consolida itens vendidos por produto, receita e quantidade
 - relatorio_estoque(empresa_id): mostra estoque atual e valor total estocado (preco*estoque)
+- relatorio_periodo(empresa_id): receita por dia/semana/mês e produtos mais
+  vendidos numa faixa de datas (vendas_dia, mantida por agregados.py)
+- Valores em centavos no banco; as linhas trazem Dinheiro (dinheiro.py)
+- Dados sem terminal (para exportação e outros programas):
+  linhas_estoque(), resumo_vendas(), linhas_vendas() -> linhas tipadas, em streaming
+  linhas_periodo(), top_produtos() -> idem, para uma faixa de datas
 - Coerente com os schemas:
-  produtos(id, empresa_id, nome, preco, estoque, criado_em)
-  carrinho(..., produto_id, qtd, preco_unit, total_item, pedido_codigo, criado_em)
+  produtos(id, empresa_id, nome, preco_centavos, estoque, criado_em)
+  carrinho(..., produto_id, qtd, preco_unit_centavos, total_item_centavos, pedido_codigo, criado_em)
+  vendas_produto / vendas_empresa / vendas_dia (totais mantidos por agregados.py)
 """
 
-from database.conexao import conectar
+from database.conexao import conectar, obter_conexao, pool
+from dinheiro import Dinheiro
+from typing import NamedTuple
 import os
 
 # ============================ utilitários locais ==============================
@@ -23,41 +32,159 @@ def _limpar():
 
 def _moeda(v):
     try:
-        return f"R$ {float(v):.2f}"
+        return f"R$ {v:.2f}"
     except:
         return f"R$ {v}"
 
-# ============================ garantias de tabelas ============================
-
-def _ensure_tables():
-    con = conectar()
-    cur = con.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS produtos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            empresa_id INTEGER,
-            nome TEXT NOT NULL,
-            preco REAL NOT NULL,
-            estoque INTEGER NOT NULL DEFAULT 0,
-            criado_em TEXT DEFAULT CURRENT_TIMESTAMP
-        );
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS carrinho (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            cliente_id INTEGER NOT NULL,
-            produto_id INTEGER NOT NULL,
-            qtd INTEGER NOT NULL,
-            preco_unit REAL NOT NULL,
-            total_item REAL NOT NULL,
-            cep TEXT NOT NULL,
-            numero TEXT NOT NULL,
-            pedido_codigo TEXT NOT NULL,
-            criado_em TEXT DEFAULT CURRENT_TIMESTAMP
-        );
-    """)
-    con.commit()
-    con.close()
+# ============================== consultas nomeadas ============================
+# Conferidas por benchmarks/verificar_planos.py (EXPLAIN QUERY PLAN).
+
+SQL_ESTOQUE = """
+    SELECT id, nome, preco_centavos, estoque, (preco_centavos * estoque) AS valor_total_centavos
+    FROM produtos
+    WHERE empresa_id = ?
+    ORDER BY nome;
+"""
+
+# Vendas leem os totais mantidos no checkout (agregados.py), não 'carrinho'.
+SQL_VENDAS_RESUMO = """
+    SELECT total_pedidos, receita_total_centavos
+    FROM vendas_empresa
+    WHERE empresa_id = ?;
+"""
+
+SQL_VENDAS_POR_PRODUTO = """
+    SELECT p.id, p.nome, v.qtd_total, v.receita_centavos
+    FROM vendas_produto v
+    JOIN produtos p ON p.id = v.produto_id
+    WHERE v.empresa_id = ?
+    ORDER BY v.receita_centavos DESC, p.nome ASC;
+"""
+
+# Por período: faixa de dias em idx_vendas_dia_periodo (empresa_id, dia),
+# no máximo uma linha por produto e dia. Semana começa na segunda-feira;
+# cada grupo sai com a data do seu primeiro dia.
+SQL_VENDAS_PERIODO = """
+    SELECT CASE ?
+               WHEN 'semana' THEN date(dia, '-6 days', 'weekday 1')
+               WHEN 'mes' THEN date(dia, 'start of month')
+               ELSE dia
+           END AS inicio,
+           SUM(qtd), SUM(receita_centavos)
+    FROM vendas_dia
+    WHERE empresa_id = ? AND dia BETWEEN ? AND ?
+    GROUP BY inicio
+    ORDER BY inicio;
+"""
+
+# INDEXED BY: sem ele o planejador prefere a PK (GROUP BY já ordenado), que
+# lê todos os dias da empresa em vez de só a faixa pedida.
+SQL_TOP_PRODUTOS_PERIODO = """
+    SELECT p.id, p.nome, SUM(v.qtd), SUM(v.receita_centavos) AS receita
+    FROM vendas_dia v INDEXED BY idx_vendas_dia_periodo
+    JOIN produtos p ON p.id = v.produto_id
+    WHERE v.empresa_id = ? AND v.dia BETWEEN ? AND ?
+    GROUP BY v.produto_id
+    ORDER BY receita DESC, p.nome ASC
+    LIMIT ?;
+"""
+
+CONSULTAS = {
+    "estoque": SQL_ESTOQUE,
+    "vendas_resumo": SQL_VENDAS_RESUMO,
+    "vendas_por_produto": SQL_VENDAS_POR_PRODUTO,
+    "vendas_periodo": SQL_VENDAS_PERIODO,
+    "top_produtos_periodo": SQL_TOP_PRODUTOS_PERIODO,
+}
+
+# Agrupamentos aceitos por linhas_periodo().
+GRANULARIDADES = ("dia", "semana", "mes")
+TOP_PADRAO = 10
+
+# ============================== linhas tipadas ================================
+
+# Quantas linhas buscar do SQLite por vez ao percorrer um relatório.
+TAMANHO_LOTE = 500
+
+class LinhaEstoque(NamedTuple):
+    id: int
+    nome: str
+    preco: Dinheiro
+    estoque: int
+    valor_total: Dinheiro
+
+class LinhaVenda(NamedTuple):
+    id: int
+    nome: str
+    qtd_total: int
+    receita: Dinheiro
+
+class ResumoVendas(NamedTuple):
+    total_pedidos: int
+    receita_total: Dinheiro
+
+class LinhaPeriodo(NamedTuple):
+    inicio: str     # "AAAA-MM-DD": o dia, a segunda-feira da semana ou o dia 1 do mês
+    qtd_total: int
+    receita: Dinheiro
+
+def _linha_estoque(row):
+    pid, nome, preco, estoque, valor_total = row
+    return LinhaEstoque(pid, nome, Dinheiro(preco), estoque, Dinheiro(valor_total))
+
+def _linha_venda(row):
+    pid, nome, qtd_total, receita = row
+    return LinhaVenda(pid, nome, qtd_total, Dinheiro(receita))
+
+def _linha_periodo(row):
+    inicio, qtd_total, receita = row
+    return LinhaPeriodo(inicio, qtd_total, Dinheiro(receita))
+
+def _percorrer(sql, params, montar, lote):
+    """
+    Gera montar(linha) para as linhas de 'sql', buscando 'lote' linhas por vez.
+    Usa uma conexão própria, fechada ao fim (ou no close() do gerador): o
+    gerador parado entre dois lotes não prende a conexão do pool da thread
+    nem a leitura aberta nela.
+    """
+    con = conectar(pool().caminho)
+    try:
+        cur = con.execute(sql, params)
+        while True:
+            bloco = cur.fetchmany(lote)
+            if not bloco:
+                return
+            for row in bloco:
+                yield montar(row)
+    finally:
+        con.close()
+
+def linhas_estoque(empresa_id: int, lote=TAMANHO_LOTE):
+    """Gera LinhaEstoque para cada produto da empresa, em ordem de nome."""
+    return _percorrer(SQL_ESTOQUE, (empresa_id,), _linha_estoque, lote)
+
+def resumo_vendas(empresa_id: int) -> ResumoVendas:
+    """Total de pedidos com itens da empresa e receita total."""
+    with obter_conexao() as con:
+        row = con.execute(SQL_VENDAS_RESUMO, (empresa_id,)).fetchone()
+    return ResumoVendas(row[0], Dinheiro(row[1])) if row else ResumoVendas(0, Dinheiro(0))
+
+def linhas_vendas(empresa_id: int, lote=TAMANHO_LOTE):
+    """Gera LinhaVenda (qtd e receita por produto), da maior receita para a menor."""
+    return _percorrer(SQL_VENDAS_POR_PRODUTO, (empresa_id,), _linha_venda, lote)
+
+def linhas_periodo(empresa_id: int, inicio: str, fim: str, granularidade="dia", lote=TAMANHO_LOTE):
+    """
+    Gera LinhaPeriodo (qtd e receita) por dia, semana ou mês entre 'inicio'
+    e 'fim' ("AAAA-MM-DD", inclusive), em ordem de data. Períodos sem venda
+    não aparecem. Datas já validadas (ver api.vendas_por_periodo).
+    """
+    return _percorrer(SQL_VENDAS_PERIODO, (granularidade, empresa_id, inicio, fim), _linha_periodo, lote)
+
+def top_produtos(empresa_id: int, inicio: str, fim: str, limite=TOP_PADRAO):
+    """LinhaVenda dos 'limite' produtos de maior receita entre 'inicio' e 'fim'."""
+    with obter_conexao() as con:
+        return [_linha_venda(r) for r in con.execute(SQL_TOP_PRODUTOS_PERIODO, (empresa_id, inicio, fim, limite))]
 
 # ================================ Relatórios ==================================
 
@@ -67,37 +194,27 @@ def relatorio_estoque(empresa_id: int):
     - Lista produtos com (id, nome, estoque, preço, valor_total_item)
     - Soma quantidade total em estoque e valor total em R$
     """
-    _ensure_tables()
     _limpar()
     print("=== Relatório de Estoque ===")
 
-    con = conectar()
-    cur = con.cursor()
-    cur.execute("""
-        SELECT id, nome, preco, estoque, (preco * estoque) AS valor_total
-        FROM produtos
-        WHERE empresa_id = ?
-        ORDER BY nome;
-    """, (empresa_id,))
-    rows = cur.fetchall()
-
-    if not rows:
-        con.close()
+    vazio = True
+    total_qtd = 0
+    total_val = Dinheiro(0)
+    for pid, nome, preco, est, vtot in linhas_estoque(empresa_id):
+        if vazio:
+            print(f"{'ID':>4}  {'Nome':<30} {'Preço':>10} {'Estoque':>8} {'Val.Est.':>12}")
+            vazio = False
+        total_qtd += est
+        total_val += vtot
+        print(f"{pid:>4}  {nome:<30} {preco:>10.2f} {est:>8} {vtot:>12.2f}")
+
+    if vazio:
         print("Nenhum produto cadastrado para esta empresa.")
         _pausar()
         return
 
-    print(f"{'ID':>4}  {'Nome':<30} {'Preço':>10} {'Estoque':>8} {'Val.Est.':>12}")
-    total_qtd = 0
-    total_val = 0.0
-    for pid, nome, preco, est, vtot in rows:
-        total_qtd += int(est)
-        total_val += float(vtot)
-        print(f"{pid:>4}  {nome:<30} {preco:>10.2f} {est:>8} {float(vtot):>12.2f}")
-
     print("-" * 72)
     print(f"{'TOTAL (itens):':>44} {total_qtd:>8} {(' ' * 4)} {'TOTAL (R$):':>12} {total_val:>12.2f}")
-    con.close()
     _pausar()
 
 def relatorio_vendas(empresa_id: int):
@@ -107,59 +224,66 @@ def relatorio_vendas(empresa_id: int):
     - Itens vendidos por produto (qtd e receita)
     - Receita total
     """
-    _ensure_tables()
     _limpar()
     print("=== Relatório de Vendas ===")
 
-    con = conectar()
-    cur = con.cursor()
-
-    # total de pedidos únicos que têm itens da empresa
-    cur.execute("""
-        SELECT COUNT(DISTINCT c.pedido_codigo)
-        FROM carrinho c
-        JOIN produtos p ON p.id = c.produto_id
-        WHERE p.empresa_id = ?;
-    """, (empresa_id,))
-    total_pedidos = cur.fetchone()[0] or 0
-
-    # agregação por produto
-    cur.execute("""
-        SELECT
-            p.id,
-            p.nome,
-            SUM(c.qtd)        AS qtd_total,
-            SUM(c.total_item) AS receita
-        FROM carrinho c
-        JOIN produtos p ON p.id = c.produto_id
-        WHERE p.empresa_id = ?
-        GROUP BY p.id, p.nome
-        ORDER BY receita DESC, p.nome ASC;
-    """, (empresa_id,))
-    por_produto = cur.fetchall()
-
-    # receita total
-    cur.execute("""
-        SELECT SUM(c.total_item)
-        FROM carrinho c
-        JOIN produtos p ON p.id = c.produto_id
-        WHERE p.empresa_id = ?;
-    """, (empresa_id,))
-    receita_total = cur.fetchone()[0] or 0.0
-
-    con.close()
+    total_pedidos, receita_total = resumo_vendas(empresa_id)
 
     print(f"Pedidos (com itens da empresa): {total_pedidos}")
     print("\nVendas por Produto:")
-    if not por_produto:
+    vazio = True
+    for pid, nome, qtd, receita in linhas_vendas(empresa_id):
+        if vazio:
+            print(f"{'ID':>4}  {'Nome':<30} {'Qtd Vendida':>12} {'Receita':>14}")
+            vazio = False
+        print(f"{pid:>4}  {nome:<30} {int(qtd):>12} {_moeda(receita):>14}")
+
+    if vazio:
         print("Ainda não há vendas registradas para esta empresa.")
         _pausar()
         return
 
-    print(f"{'ID':>4}  {'Nome':<30} {'Qtd Vendida':>12} {'Receita':>14}")
-    for pid, nome, qtd, receita in por_produto:
-        print(f"{pid:>4}  {nome:<30} {int(qtd):>12} {_moeda(receita):>14}")
-
     print("-" * 68)
     print(f"{'RECEITA TOTAL:':>48} {_moeda(receita_total):>14}")
     _pausar()
+
+def relatorio_periodo(empresa_id: int):
+    """
+    Vendas da empresa numa faixa de datas:
+    - Receita e quantidade por dia, semana ou mês
+    - Produtos mais vendidos no período
+    """
+    from api import ErroIbex, vendas_por_periodo
+
+    _limpar()
+    print("=== Vendas por Período ===")
+    inicio = input("Data inicial (AAAA-MM-DD): ").strip()
+    fim = input("Data final (AAAA-MM-DD): ").strip()
+    escolha = input("Agrupar por (1) dia, (2) semana ou (3) mês [2]: ").strip() or "2"
+    granularidade = {"1": "dia", "2": "semana", "3": "mes"}.get(escolha, "semana")
+
+    try:
+        periodos, top = vendas_por_periodo(empresa_id, inicio, fim, granularidade)
+    except ErroIbex as e:
+        print(f"Erro: {e}")
+        _pausar()
+        return
+
+    if not periodos:
+        print("Nenhuma venda no período.")
+        _pausar()
+        return
+
+    print(f"\n{'Início':<12} {'Qtd Vendida':>12} {'Receita':>14}")
+    total = Dinheiro(0)
+    for ini, qtd, receita in periodos:
+        total += receita
+        print(f"{ini:<12} {qtd:>12} {_moeda(receita):>14}")
+    print("-" * 40)
+    print(f"{'RECEITA NO PERÍODO:':>25} {_moeda(total):>14}")
+
+    print(f"\nMais vendidos ({inicio} a {fim}):")
+    print(f"{'ID':>4}  {'Nome':<30} {'Qtd Vendida':>12} {'Receita':>14}")
+    for pid, nome, qtd, receita in top:
+        print(f"{pid:>4}  {nome:<30} {int(qtd):>12} {_moeda(receita):>14}")
+    _pausar()
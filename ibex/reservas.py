@@ -0,0 +1,161 @@
+# ibex/reservas.py
+# -*- coding: utf-8 -*-
+
+"""
+Reservas de estoque com prazo (tabela 'reservas', migração 11)
+- Pôr um produto no carrinho reserva a quantidade do carrinho por
+  IBEX_RESERVA_TTL segundos (padrão 15 min); cada nova adição renova o
+  prazo daquele item. Sem estoque livre, a adição falha na hora, não no
+  checkout depois do endereço
+- Livre para um cliente = estoque - reservas válidas dos OUTROS clientes;
+  reserva vencida deixa de contar no mesmo instante (o filtro é por
+  expira_em), sem esperar a varredura
+- No checkout a baixa de estoque desconta as reservas dos outros e as do
+  cliente viram venda (saem da tabela)
+- Varredura: as vencidas saem em lotes pelo índice de expira_em, no
+  máximo a cada INTERVALO_VARREDURA s por processo (na própria reserva) ou
+  com "python main.py reservas varrer"
+- IBEX_RESERVA_TTL=0 desliga as reservas: volta a valer só o estoque
+"""
+
+import os
+import time
+
+from database.conexao import obter_conexao, transacao
+
+TTL_PADRAO = 15 * 60
+# Intervalo mínimo (s) entre duas varreduras automáticas neste processo.
+INTERVALO_VARREDURA = 60
+# Reservas vencidas apagadas por comando DELETE.
+LOTE_VARREDURA = 1_000
+
+# ============================== Consultas =====================================
+# Reservas válidas de outros clientes: SEARCH em idx_reservas_produto
+# (produto_id, expira_em), somando qtd no próprio índice.
+
+SQL_RESERVAR = """
+    INSERT INTO reservas (cliente_id, produto_id, qtd, expira_em)
+    SELECT ?, p.id, ?, ?
+    FROM produtos p
+    WHERE p.id = ?
+      AND p.estoque - (SELECT COALESCE(SUM(r.qtd), 0) FROM reservas r
+                       WHERE r.produto_id = p.id AND r.expira_em > ? AND r.cliente_id <> ?) >= ?
+    ON CONFLICT (cliente_id, produto_id) DO UPDATE SET
+        qtd = excluded.qtd,
+        expira_em = excluded.expira_em;
+"""
+
+SQL_DISPONIVEL = """
+    SELECT p.estoque - (SELECT COALESCE(SUM(r.qtd), 0) FROM reservas r
+                        WHERE r.produto_id = p.id AND r.expira_em > ? AND r.cliente_id <> ?)
+    FROM produtos p
+    WHERE p.id = ?;
+"""
+
+# Baixa do checkout: só se o estoque livre para o cliente cobrir a quantidade.
+SQL_BAIXAR_ESTOQUE = """
+    UPDATE produtos SET estoque = estoque - ?
+    WHERE id = ?
+      AND estoque - (SELECT COALESCE(SUM(r.qtd), 0) FROM reservas r
+                     WHERE r.produto_id = produtos.id AND r.expira_em > ? AND r.cliente_id <> ?) >= ?;
+"""
+
+SQL_ALTERAR = """
+    UPDATE reservas SET qtd = ? WHERE cliente_id = ? AND produto_id = ?;
+"""
+
+SQL_LIBERAR_ITEM = """
+    DELETE FROM reservas WHERE cliente_id = ? AND produto_id = ?;
+"""
+
+SQL_LIBERAR_CLIENTE = """
+    DELETE FROM reservas WHERE cliente_id = ?;
+"""
+
+# DELETE ... LIMIT não vem compilado no SQLite padrão: o lote sai pela chave.
+SQL_VARRER = """
+    DELETE FROM reservas
+    WHERE (cliente_id, produto_id) IN (
+        SELECT cliente_id, produto_id FROM reservas WHERE expira_em <= ? LIMIT ?
+    );
+"""
+
+CONSULTAS = {
+    "reservar": SQL_RESERVAR,
+    "disponivel": SQL_DISPONIVEL,
+    "baixar_estoque": SQL_BAIXAR_ESTOQUE,
+    "alterar": SQL_ALTERAR,
+    "liberar_item": SQL_LIBERAR_ITEM,
+    "liberar_cliente": SQL_LIBERAR_CLIENTE,
+    "varrer": SQL_VARRER,
+}
+
+ttl = float(os.environ.get("IBEX_RESERVA_TTL", TTL_PADRAO))
+_ultima_varredura = 0.0
+
+def ativo():
+    return ttl > 0
+
+# ========================= Dentro da transação do chamador ====================
+
+def reservar(con, cliente_id, produto_id, qtd, agora=None):
+    """
+    Reserva 'qtd' (a quantidade total do item no carrinho, não o acréscimo)
+    e renova o prazo. False se o estoque livre não cobre: nada muda.
+    """
+    agora = time.time() if agora is None else agora
+    if agora - _ultima_varredura >= INTERVALO_VARREDURA:
+        varrer_vencidas(con, agora)
+    cur = con.execute(SQL_RESERVAR, (cliente_id, qtd, agora + ttl, produto_id, agora, cliente_id, qtd))
+    return cur.rowcount > 0
+
+def disponivel(con, cliente_id, produto_id, agora=None):
+    """Estoque livre para o cliente (0 se o produto não existe mais)."""
+    agora = time.time() if agora is None else agora
+    row = con.execute(SQL_DISPONIVEL, (agora, cliente_id, produto_id)).fetchone()
+    return max(row[0], 0) if row else 0
+
+def baixar_estoque(con, cliente_id, produto_id, qtd, agora):
+    """Baixa condicional do checkout. False se faltou estoque livre."""
+    cur = con.execute(SQL_BAIXAR_ESTOQUE, (qtd, produto_id, agora, cliente_id, qtd))
+    return cur.rowcount > 0
+
+def ajustar(con, cliente_id, produto_id, qtd):
+    """Item diminuiu no carrinho: reduz a reserva (0 = libera). Mantém o prazo."""
+    if qtd > 0:
+        con.execute(SQL_ALTERAR, (qtd, cliente_id, produto_id))
+    else:
+        con.execute(SQL_LIBERAR_ITEM, (cliente_id, produto_id))
+
+def liberar_cliente(con, cliente_id):
+    """Checkout gravado: as reservas do cliente viraram venda."""
+    con.execute(SQL_LIBERAR_CLIENTE, (cliente_id,))
+
+def varrer_vencidas(con, agora=None, lote=LOTE_VARREDURA):
+    """Apaga até 'lote' reservas vencidas. Devolve quantas saíram."""
+    global _ultima_varredura
+    agora = time.time() if agora is None else agora
+    _ultima_varredura = agora
+    return con.execute(SQL_VARRER, (agora, lote)).rowcount
+
+# ================================ Manutenção ==================================
+
+def varrer(lote=LOTE_VARREDURA):
+    """Apaga todas as reservas vencidas, um lote por transação. Devolve o total."""
+    total = 0
+    while True:
+        with transacao() as con:
+            n = varrer_vencidas(con, lote=lote)
+        total += n
+        if n < lote:
+            return total
+
+def resumo():
+    """(reservas válidas, unidades reservadas, vencidas ainda na tabela)."""
+    agora = time.time()
+    with obter_conexao() as con:
+        validas, unidades = con.execute("""
+            SELECT COUNT(*), COALESCE(SUM(qtd), 0) FROM reservas WHERE expira_em > ?;
+        """, (agora,)).fetchone()
+        vencidas = con.execute("SELECT COUNT(*) FROM reservas WHERE expira_em <= ?;", (agora,)).fetchone()[0]
+    return validas, unidades, vencidas
@@ -0,0 +1,346 @@
+# ibex/servidor.py
+# -*- coding: utf-8 -*-
+
+"""
+Servidor HTTP/JSON do Ibex (só biblioteca padrão)
+- python main.py serve [--host 127.0.0.1] [--porta 8000]
+- Uma thread por requisição (ThreadingHTTPServer); as threads dividem o
+  pool de conexões de database.conexao, então o banco é o mesmo dos menus
+- Toda regra de negócio vem de api.py; aqui só há rotas e JSON
+- Rotas de /clientes/{id} e /empresas/{id} exigem o token de uma sessão
+  desse usuário (sessoes.py) em "Authorization: Bearer <token>":
+  sem token ou vencido -> 401; de outro usuário -> 403
+
+Rotas:
+    POST   /sessoes                           {"tipo": "cliente", "email": "...", "senha": "..."}
+    DELETE /sessoes                           (encerra a sessão do token)
+    GET    /produtos[?empresa_id=N&tamanho=20&apos=CURSOR|antes=CURSOR]
+    GET    /produtos/busca?q=cimento[&empresa_id=N&pagina=1&tamanho=20]
+    GET    /produtos/{id}
+    GET    /clientes/{id}/carrinho
+    POST   /clientes/{id}/carrinho            {"produto_id": 1, "qtd": 2}
+    DELETE /clientes/{id}/carrinho/{produto}[?qtd=N]
+    POST   /clientes/{id}/pedidos             {"cep": "...", "numero": "..."}
+    GET    /clientes/{id}/pedidos
+    GET    /clientes/{id}/pedidos/{codigo}
+    GET    /empresas/{id}/pedidos
+    GET    /empresas/{id}/pedidos/{codigo}
+    GET    /empresas/{id}/relatorios/estoque
+    GET    /empresas/{id}/relatorios/vendas
+    GET    /empresas/{id}/relatorios/periodo?inicio=2025-01-01&fim=2025-12-31[&por=dia|semana|mes&top=10]
+    GET    /estatisticas/cache
+"""
+
+import json
+import re
+import sqlite3
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import api
+import cache
+from dinheiro import Dinheiro
+from sessoes import armazem as sessoes, entrar_cliente, entrar_empresa
+
+# Corpo máximo aceito num POST (bytes).
+TAMANHO_MAXIMO_CORPO = 64 * 1024
+# Content-Length aceito: só dígitos (sem sinal, "_" ou espaço no meio).
+_DIGITOS = re.compile(r"[0-9]+")
+# Faixa de INTEGER do SQLite.
+_MIN_INTEIRO, _MAX_INTEIRO = -2**63, 2**63 - 1
+
+# ============================== Conversões ====================================
+
+def _json(valor):
+    """NamedTuple -> dict (recursivo), para json.dumps. Dinheiro sai em reais."""
+    if hasattr(valor, "_asdict"):
+        return {k: _json(v) for k, v in valor._asdict().items()}
+    if isinstance(valor, (list, tuple)):
+        return [_json(v) for v in valor]
+    if isinstance(valor, Dinheiro):
+        return float(valor)
+    return valor
+
+def _inteiro_param(consulta, nome):
+    valores = consulta.get(nome)
+    if not valores:
+        return None
+    try:
+        valor = int(valores[0])
+    except ValueError:
+        raise api.DadosInvalidos(f"Parâmetro '{nome}' deve ser inteiro.")
+    if not _MIN_INTEIRO <= valor <= _MAX_INTEIRO:
+        # O SQLite só guarda inteiros de 64 bits (OverflowError no bind).
+        raise api.DadosInvalidos(f"Parâmetro '{nome}' fora do intervalo aceito.")
+    return valor
+
+def _texto_param(consulta, nome):
+    valores = consulta.get(nome)
+    return valores[0] if valores else None
+
+# Exceção da api -> status HTTP.
+_STATUS_ERRO = [
+    (api.DadosInvalidos, HTTPStatus.BAD_REQUEST),
+    (api.CredenciaisInvalidas, HTTPStatus.UNAUTHORIZED),
+    (api.AcessoNegado, HTTPStatus.FORBIDDEN),
+    (api.NaoEncontrado, HTTPStatus.NOT_FOUND),
+    (api.JaExiste, HTTPStatus.CONFLICT),
+    (api.CarrinhoVazio, HTTPStatus.CONFLICT),
+    (api.EstoqueInsuficiente, HTTPStatus.CONFLICT),
+]
+
+def _corpo_erro(erro):
+    corpo = {"erro": type(erro).__name__, "mensagem": str(erro)}
+    if isinstance(erro, api.EstoqueInsuficiente):
+        corpo["itens"] = _json(erro.itens)
+    return corpo
+
+# ================================= Rotas ======================================
+# Cada rota recebe (corpo, consulta, *grupos_da_url) e devolve (status, dados).
+
+def _entrar(corpo, consulta):
+    entrar = {"cliente": entrar_cliente, "empresa": entrar_empresa}.get(corpo.get("tipo"))
+    if entrar is None:
+        raise api.DadosInvalidos("Campo 'tipo' deve ser 'cliente' ou 'empresa'.")
+    return HTTPStatus.CREATED, entrar(corpo.get("email") or "", corpo.get("senha"))
+
+def _sair(corpo, consulta, token):
+    sessoes.encerrar(token)
+    return HTTPStatus.OK, {"encerrada": True}
+
+def _produtos(corpo, consulta):
+    # Paginado: 'proximo'/'anterior' da resposta vão em ?apos=/?antes=.
+    return HTTPStatus.OK, api.pagina_produtos(
+        _inteiro_param(consulta, "empresa_id"),
+        apos=_texto_param(consulta, "apos"),
+        antes=_texto_param(consulta, "antes"),
+        tamanho=min(_inteiro_param(consulta, "tamanho") or api.TAMANHO_PAGINA, 200),
+    )
+
+def _busca(corpo, consulta):
+    return HTTPStatus.OK, api.buscar_produtos(
+        _texto_param(consulta, "q"),
+        _inteiro_param(consulta, "empresa_id"),
+        pagina=_inteiro_param(consulta, "pagina") or 1,
+        tamanho=min(_inteiro_param(consulta, "tamanho") or api.TAMANHO_PAGINA, 200),
+    )
+
+def _produto(corpo, consulta, produto_id):
+    return HTTPStatus.OK, api.obter_produto(int(produto_id))
+
+def _carrinho(corpo, consulta, cliente_id):
+    return HTTPStatus.OK, api.consultar_carrinho(int(cliente_id))
+
+def _adicionar(corpo, consulta, cliente_id):
+    prod, total = api.adicionar_item(int(cliente_id), corpo.get("produto_id"), corpo.get("qtd"))
+    return HTTPStatus.OK, {"produto": _json(prod), "qtd_no_carrinho": total}
+
+def _remover(corpo, consulta, cliente_id, produto_id):
+    restante = api.remover_item(int(cliente_id), int(produto_id), _inteiro_param(consulta, "qtd"))
+    return HTTPStatus.OK, {"produto_id": int(produto_id), "qtd_no_carrinho": restante}
+
+def _fechar(corpo, consulta, cliente_id):
+    return HTTPStatus.CREATED, api.fechar_pedido(int(cliente_id), corpo.get("cep"), corpo.get("numero"))
+
+def _pedidos_cliente(corpo, consulta, cliente_id):
+    return HTTPStatus.OK, api.pedidos_do_cliente(int(cliente_id))
+
+def _pedido_cliente(corpo, consulta, cliente_id, codigo):
+    return HTTPStatus.OK, api.itens_do_pedido_cliente(int(cliente_id), codigo)
+
+def _pedidos_empresa(corpo, consulta, empresa_id):
+    return HTTPStatus.OK, api.pedidos_da_empresa(int(empresa_id))
+
+def _pedido_empresa(corpo, consulta, empresa_id, codigo):
+    return HTTPStatus.OK, api.itens_do_pedido_empresa(int(empresa_id), codigo)
+
+def _relatorio_estoque(corpo, consulta, empresa_id):
+    return HTTPStatus.OK, list(api.linhas_estoque(int(empresa_id)))
+
+def _relatorio_vendas(corpo, consulta, empresa_id):
+    empresa_id = int(empresa_id)
+    return HTTPStatus.OK, {"resumo": _json(api.resumo_vendas(empresa_id)),
+                           "produtos": _json(list(api.linhas_vendas(empresa_id)))}
+
+def _relatorio_periodo(corpo, consulta, empresa_id):
+    periodos, top = api.vendas_por_periodo(
+        int(empresa_id),
+        _texto_param(consulta, "inicio"),
+        _texto_param(consulta, "fim"),
+        _texto_param(consulta, "por") or "dia",
+        min(_inteiro_param(consulta, "top") or api.TOP_PADRAO, 100),
+    )
+    return HTTPStatus.OK, {"periodos": _json(periodos), "produtos": _json(top)}
+
+def _estatisticas_cache(corpo, consulta):
+    return HTTPStatus.OK, cache.estatisticas()
+
+# (método, caminho, função, sessão exigida). Sessão "cliente"/"empresa":
+# o primeiro grupo da URL é o id que o token precisa ter; "token": qualquer
+# token, passado à função no lugar dos grupos. Ids da URL têm até 18
+# dígitos (cabem no INTEGER do SQLite; maiores não existem -> 404).
+ROTAS = [
+    ("POST", r"/sessoes", _entrar, None),
+    ("DELETE", r"/sessoes", _sair, "token"),
+    ("GET", r"/produtos", _produtos, None),
+    ("GET", r"/produtos/busca", _busca, None),
+    ("GET", r"/produtos/(\d{1,18})", _produto, None),
+    ("GET", r"/clientes/(\d{1,18})/carrinho", _carrinho, "cliente"),
+    ("POST", r"/clientes/(\d{1,18})/carrinho", _adicionar, "cliente"),
+    ("DELETE", r"/clientes/(\d{1,18})/carrinho/(\d{1,18})", _remover, "cliente"),
+    ("POST", r"/clientes/(\d{1,18})/pedidos", _fechar, "cliente"),
+    ("GET", r"/clientes/(\d{1,18})/pedidos", _pedidos_cliente, "cliente"),
+    ("GET", r"/clientes/(\d{1,18})/pedidos/([\w-]+)", _pedido_cliente, "cliente"),
+    ("GET", r"/empresas/(\d{1,18})/pedidos", _pedidos_empresa, "empresa"),
+    ("GET", r"/empresas/(\d{1,18})/pedidos/([\w-]+)", _pedido_empresa, "empresa"),
+    ("GET", r"/empresas/(\d{1,18})/relatorios/estoque", _relatorio_estoque, "empresa"),
+    ("GET", r"/empresas/(\d{1,18})/relatorios/vendas", _relatorio_vendas, "empresa"),
+    ("GET", r"/empresas/(\d{1,18})/relatorios/periodo", _relatorio_periodo, "empresa"),
+    ("GET", r"/estatisticas/cache", _estatisticas_cache, None),
+]
+_ROTAS = [(metodo, re.compile(padrao + r"/?"), funcao, sessao)
+          for metodo, padrao, funcao, sessao in ROTAS]
+
+def _resolver(metodo, caminho):
+    """Devolve (funcao, grupos, sessão exigida) ou (None, status de erro, None)."""
+    caminho_existe = False
+    for m, padrao, funcao, sessao in _ROTAS:
+        achou = padrao.fullmatch(caminho)
+        if not achou:
+            continue
+        if m == metodo:
+            return funcao, achou.groups(), sessao
+        caminho_existe = True
+    return None, (HTTPStatus.METHOD_NOT_ALLOWED if caminho_existe else HTTPStatus.NOT_FOUND), None
+
+def _token(cabecalhos):
+    """Token de "Authorization: Bearer <token>", ou None."""
+    tipo, _, token = (cabecalhos.get("Authorization") or "").partition(" ")
+    return (token.strip() or None) if tipo.lower() == "bearer" else None
+
+# ================================ Handler =====================================
+
+class ManipuladorIbex(BaseHTTPRequestHandler):
+    # HTTP/1.1: mantém a conexão aberta entre requisições (keep-alive).
+    protocol_version = "HTTP/1.1"
+    server_version = "Ibex/1.0"
+    # Cabeçalho e corpo saem em dois write(): com Nagle ligado o segundo
+    # espera o ACK atrasado do cliente (~40 ms por resposta em keep-alive).
+    disable_nagle_algorithm = True
+    # Silencia o log de cada requisição (ver --verboso em comandos.py).
+    verboso = False
+
+    def log_message(self, formato, *args):
+        if self.verboso:
+            super().log_message(formato, *args)
+
+    def _responder(self, status, dados):
+        corpo = json.dumps(_json(dados), ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _tamanho_corpo(self):
+        """Content-Length (0 se ausente); DadosInvalidos se não for inteiro >= 0."""
+        valor = (self.headers.get("Content-Length") or "0").strip()
+        if not _DIGITOS.fullmatch(valor):
+            # Sem tamanho confiável não dá para achar o fim do corpo.
+            self.close_connection = True
+            raise api.DadosInvalidos("Cabeçalho Content-Length inválido.")
+        return int(valor)
+
+    def _ler_corpo(self, tamanho):
+        if tamanho > TAMANHO_MAXIMO_CORPO:
+            # O corpo não será lido: a conexão não pode ser reaproveitada.
+            self.close_connection = True
+            raise api.DadosInvalidos("Corpo da requisição grande demais.")
+        if tamanho == 0:
+            return {}
+        try:
+            corpo = json.loads(self.rfile.read(tamanho))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise api.DadosInvalidos("Corpo da requisição não é JSON válido.")
+        if not isinstance(corpo, dict):
+            raise api.DadosInvalidos("Corpo da requisição deve ser um objeto JSON.")
+        return corpo
+
+    def _despachar(self, metodo):
+        url = urlsplit(self.path)
+        funcao, extra, exigida = _resolver(metodo, url.path)
+        try:
+            tamanho = self._tamanho_corpo()
+        except api.DadosInvalidos as e:
+            self._responder(HTTPStatus.BAD_REQUEST, _corpo_erro(e))
+            return
+        if funcao is None:
+            # Descarta um eventual corpo para não corromper a próxima
+            # requisição; grande demais não é lido e a conexão fecha.
+            if tamanho > TAMANHO_MAXIMO_CORPO:
+                self.close_connection = True
+            else:
+                self.rfile.read(tamanho)
+            self._responder(extra, {"erro": extra.phrase, "mensagem": url.path})
+            return
+        try:
+            corpo = self._ler_corpo(tamanho)
+            token = _token(self.headers)
+            if exigida == "token":
+                sessoes.obter(token)
+                extra = (token,)
+            elif exigida is not None:
+                sessoes.autorizar(token, exigida, extra[0])
+            status, dados = funcao(corpo, parse_qs(url.query), *extra)
+        except api.ErroIbex as e:
+            status = next(s for tipo, s in _STATUS_ERRO if isinstance(e, tipo))
+            self._responder(status, _corpo_erro(e))
+            return
+        except Exception as e:
+            if isinstance(e, sqlite3.OperationalError) and ("locked" in str(e) or "busy" in str(e)):
+                # Banco ocupado além do timeout: o cliente pode tentar de novo.
+                self.send_response(HTTPStatus.SERVICE_UNAVAILABLE)
+                self.send_header("Retry-After", "1")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            # Erro inesperado: registra e responde 500 sem derrubar a conexão.
+            self.log_error("%s: %s", type(e).__name__, e)
+            self._responder(HTTPStatus.INTERNAL_SERVER_ERROR,
+                            {"erro": "ErroInterno", "mensagem": "Erro interno no servidor."})
+            return
+        self._responder(status, dados)
+
+    def do_GET(self):
+        self._despachar("GET")
+
+    def do_POST(self):
+        self._despachar("POST")
+
+    def do_DELETE(self):
+        self._despachar("DELETE")
+
+# ================================ Servidor ====================================
+
+class ServidorIbex(ThreadingHTTPServer):
+    daemon_threads = True
+    # Fila de conexões pendentes maior que o padrão (5) para picos de clientes.
+    request_queue_size = 128
+
+def criar_servidor(host="127.0.0.1", porta=8000, verboso=False):
+    """Cria (sem iniciar) o servidor; porta 0 = porta livre escolhida pelo SO."""
+    manipulador = type("Manipulador", (ManipuladorIbex,), {"verboso": verboso})
+    return ServidorIbex((host, porta), manipulador)
+
+def servir(host="127.0.0.1", porta=8000, verboso=False):
+    """Atende requisições até Ctrl+C."""
+    servidor = criar_servidor(host, porta, verboso)
+    h, p = servidor.server_address[:2]
+    print(f"🧱 Ibex servindo em http://{h}:{p}/  (Ctrl+C para parar)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\nEncerrando servidor...")
+    finally:
+        servidor.server_close()
@@ -0,0 +1,208 @@
+# ibex/sessoes.py
+# -*- coding: utf-8 -*-
+
+"""
+Sessões de login (cliente ou empresa) identificadas por token
+- Token opaco (secrets.token_urlsafe, 256 bits): não carrega id nem nome
+- Índice em memória token -> Sessao: conferir uma sessão é um acesso a
+  dict, sem consulta de credenciais
+- Validade de IBEX_SESSAO_TTL segundos (padrão 8 h), renovada pelo uso:
+  passada metade do prazo, a próxima consulta estende a sessão
+- Vencidas saem na consulta e numa varredura a cada sessão criada; o
+  dict fica na ordem de vencimento, então a varredura só olha o começo
+- IBEX_SESSOES_PERSISTIR=1 grava as sessões na tabela 'sessoes'
+  (migração 9, só o SHA-256 do token): sobrevivem a reinício e valem em
+  todos os processos do mesmo banco. Sem ela, ficam só neste processo
+- Com persistência, a linha do banco manda: cada processo relê a sessão
+  no máximo a cada INTERVALO_CONFERENCIA s, e uma renovação que não acha
+  a linha derruba a sessão. Logout ou revogação (DELETE da linha) em
+  outro processo vale aqui em até INTERVALO_CONFERENCIA s
+- menus.py guarda o token da sessão do console; servidor.py recebe o
+  token em "Authorization: Bearer ..." (POST /sessoes para entrar)
+"""
+
+import hashlib
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from database.conexao import obter_conexao, transacao
+import api
+from api import AcessoNegado, DadosInvalidos, SessaoInvalida
+from carrinho_memoria import armazem as carrinhos
+
+TTL_PADRAO = 8 * 3600
+TIPOS = ("cliente", "empresa")
+# Intervalo mínimo (s) entre duas limpezas da tabela 'sessoes'.
+INTERVALO_LIMPEZA_BANCO = 60
+# Com persistência: idade máxima (s) da cópia em memória antes de reler o banco.
+INTERVALO_CONFERENCIA = 5
+
+class Sessao(NamedTuple):
+    token: str
+    tipo: str           # "cliente" ou "empresa"
+    usuario_id: int
+    nome: str
+    expira_em: float    # time.time()
+
+def _hash(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+class ArmazemSessoes:
+    """Sessões ativas deste processo (e, se persistir=True, do banco)."""
+
+    def __init__(self, ttl=TTL_PADRAO, persistir=False):
+        self.ttl = ttl
+        self.persistir = persistir
+        # token -> Sessao, da que vence primeiro para a que vence por último.
+        self._dados = OrderedDict()
+        # token -> time.monotonic() da última leitura da linha em 'sessoes'
+        self._conferidas = {}
+        self._lock = threading.Lock()
+        self._ultima_limpeza_banco = 0.0
+
+    # ------------------------------------------------------------ entrada
+
+    def criar(self, tipo, usuario_id, nome=None):
+        """Abre uma sessão para o usuário e devolve a Sessao (com o token)."""
+        if tipo not in TIPOS:
+            raise DadosInvalidos(f"Tipo de sessão inválido: {tipo}")
+        agora = time.time()
+        sessao = Sessao(secrets.token_urlsafe(32), tipo, int(usuario_id), nome, agora + self.ttl)
+        if self.persistir:
+            with transacao() as con:
+                con.execute("""
+                    INSERT INTO sessoes (token_hash, tipo, usuario_id, nome, expira_em)
+                    VALUES (?, ?, ?, ?, ?);
+                """, (_hash(sessao.token), tipo, sessao.usuario_id, nome, sessao.expira_em))
+        with self._lock:
+            self._varrer(agora)
+            self._dados[sessao.token] = sessao
+            self._conferidas[sessao.token] = time.monotonic()
+        if self.persistir and agora - self._ultima_limpeza_banco >= INTERVALO_LIMPEZA_BANCO:
+            self._limpar_banco(agora)
+        return sessao
+
+    def encerrar(self, token):
+        """
+        Fecha a sessão (logout). Token desconhecido é ignorado. O carrinho
+        de um cliente é gravado e sai da memória (carrinho_memoria.py).
+        """
+        self._descartar(token)
+        if self.persistir and token:
+            with transacao() as con:
+                con.execute("DELETE FROM sessoes WHERE token_hash = ?;", (_hash(token),))
+
+    # ------------------------------------------------------------ consulta
+
+    def obter(self, token):
+        """Sessao do token; SessaoInvalida se não existe ou venceu."""
+        if not token:
+            raise SessaoInvalida("Sessão não informada. Faça login.")
+        agora = time.time()
+        with self._lock:
+            sessao = self._dados.get(token)
+            conferida = self._conferidas.get(token, 0.0)
+        if self.persistir and (sessao is None or time.monotonic() - conferida >= INTERVALO_CONFERENCIA):
+            # Aberta, renovada ou encerrada por outro processo: vale o banco.
+            em_memoria, sessao = sessao, self._carregar(token)
+            if sessao is None and em_memoria is not None:
+                self._descartar(token)
+        if sessao is None or sessao.expira_em <= agora:
+            if sessao is not None:
+                self.encerrar(token)
+            raise SessaoInvalida("Sessão expirada ou inválida. Faça login novamente.")
+        if sessao.expira_em - agora < self.ttl / 2:
+            sessao = self._renovar(sessao, agora)
+        return sessao
+
+    def autorizar(self, token, tipo, usuario_id=None):
+        """
+        Sessao do token se for do 'tipo' pedido (e do 'usuario_id', se
+        informado); senão SessaoInvalida ou AcessoNegado.
+        """
+        sessao = self.obter(token)
+        if sessao.tipo != tipo:
+            raise AcessoNegado(f"Esta ação exige login de {tipo}.")
+        if usuario_id is not None and sessao.usuario_id != int(usuario_id):
+            raise AcessoNegado("A sessão não pertence a este usuário.")
+        return sessao
+
+    # ------------------------------------------------------------ internos
+
+    def _renovar(self, sessao, agora):
+        sessao = sessao._replace(expira_em=agora + self.ttl)
+        if self.persistir:
+            with transacao() as con:
+                alteradas = con.execute("UPDATE sessoes SET expira_em = ? WHERE token_hash = ?;",
+                                        (sessao.expira_em, _hash(sessao.token))).rowcount
+            if alteradas == 0:
+                # Encerrada em outro processo: não ressuscita a sessão.
+                self._descartar(sessao.token)
+                raise SessaoInvalida("Sessão expirada ou inválida. Faça login novamente.")
+        with self._lock:
+            if sessao.token in self._dados:
+                self._dados[sessao.token] = sessao
+                self._dados.move_to_end(sessao.token)
+        return sessao
+
+    def _descartar(self, token):
+        """Tira a sessão da memória deste processo (o carrinho do cliente é gravado)."""
+        with self._lock:
+            sessao = self._dados.pop(token, None)
+            self._conferidas.pop(token, None)
+        if sessao is not None and sessao.tipo == "cliente":
+            carrinhos.liberar(sessao.usuario_id)
+
+    def _carregar(self, token):
+        # Sessão aberta por outro processo (ou antes de um reinício).
+        with obter_conexao() as con:
+            row = con.execute("""
+                SELECT tipo, usuario_id, nome, expira_em FROM sessoes WHERE token_hash = ?;
+            """, (_hash(token),)).fetchone()
+        if row is None:
+            return None
+        sessao = Sessao(token, *row)
+        with self._lock:
+            # Entra no fim mesmo vencendo antes de outras: a varredura pode
+            # demorar a achá-la, mas obter() confere o prazo de todo jeito.
+            self._dados[token] = sessao
+            self._dados.move_to_end(token)
+            self._conferidas[token] = time.monotonic()
+        return sessao
+
+    def _varrer(self, agora):
+        while self._dados:
+            token, sessao = next(iter(self._dados.items()))
+            if sessao.expira_em > agora:
+                break
+            del self._dados[token]
+            self._conferidas.pop(token, None)
+
+    def _limpar_banco(self, agora):
+        self._ultima_limpeza_banco = agora
+        with transacao() as con:
+            con.execute("DELETE FROM sessoes WHERE expira_em <= ?;", (agora,))
+
+    def ativas(self):
+        """Quantidade de sessões em memória (inclui vencidas ainda não varridas)."""
+        with self._lock:
+            return len(self._dados)
+
+armazem = ArmazemSessoes(int(os.environ.get("IBEX_SESSAO_TTL", TTL_PADRAO)),
+                         os.environ.get("IBEX_SESSOES_PERSISTIR") == "1")
+
+# ================================ Login =======================================
+
+def entrar_cliente(email, senha):
+    """Confere as credenciais do cliente e abre uma sessão."""
+    cliente_id, nome = api.autenticar_cliente(email, senha)
+    return armazem.criar("cliente", cliente_id, nome)
+
+def entrar_empresa(email, senha):
+    """Confere as credenciais da empresa e abre uma sessão."""
+    empresa_id, razao_social = api.autenticar_empresa(email, senha)
+    return armazem.criar("empresa", empresa_id, razao_social)
@@ -1,11 +1,27 @@
+import os
+import sys
 
-from ibex.menus import menu_principal
+# Os módulos do pacote usam imports planos (ex.: "from database.conexao import ...").
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "ibex"))
 
-def main():
+from database.esquema import inicializar_banco
+
+def main(argv=None):
     """
     Função principal do sistema Ibex.
-    Exibe a tela inicial e redireciona para o menu principal.
+    Prepara o banco (migrações), exibe a tela inicial e redireciona para o menu principal.
+    Com argumentos (ex.: "python main.py agregados verificar"), executa o comando
+    correspondente de comandos.py sem abrir os menus.
     """
+    argv = sys.argv[1:] if argv is None else argv
+    inicializar_banco()
+
+    if argv:
+        from comandos import executar
+        return executar(argv)
+
+    from menus import menu_principal
+
     print("===================================")
     print("      🧱 IBEX - Materiais de Construção")
     print("===================================")
@@ -15,4 +31,4 @@ def main():
     menu_principal()
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())